@@ -0,0 +1,34 @@
+"""Add ocpp_transaction_id_seq for block-allocated transaction ids
+
+Revision ID: 10430d52d068
+Revises: 3ac7884d5522
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '10430d52d068'
+down_revision = '3ac7884d5522'
+branch_labels = None
+depends_on = None
+
+BLOCK_SIZE = 100
+MAX_TRANSACTION_ID = 2147483647
+
+
+def upgrade() -> None:
+    # Existing ids were derived from the clock, so start above the highest one
+    max_id = op.get_bind().execute(sa.text("SELECT COALESCE(MAX(transaction_id), 0) FROM charging_sessions")).scalar()
+    if max_id + BLOCK_SIZE > MAX_TRANSACTION_ID:
+        raise RuntimeError(f"No room for new transaction ids above existing id {max_id}")
+    op.execute(
+        f"CREATE SEQUENCE ocpp_transaction_id_seq "
+        f"INCREMENT BY {BLOCK_SIZE} MINVALUE 1 MAXVALUE {MAX_TRANSACTION_ID} START WITH {max_id + 1} NO CYCLE"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP SEQUENCE IF EXISTS ocpp_transaction_id_seq")
@@ -0,0 +1,149 @@
+"""Compact meter reading storage: numeric values, series dictionary, per-session archives
+
+Revision ID: 4e7b5ea10d16
+Revises: 9f699105cf5d
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+import sys
+from array import array
+from datetime import datetime, timedelta
+from itertools import accumulate
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e7b5ea10d16'
+down_revision = '9f699105cf5d'
+branch_labels = None
+depends_on = None
+
+# What float() accepts, minus nan/inf; anything else was already skipped on read
+NUMERIC = r"^\s*[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?\s*$"
+
+
+def _create_readings(compact: bool) -> None:
+    if compact:
+        columns = "timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL, value DOUBLE PRECISION NOT NULL, series_id SMALLINT NOT NULL REFERENCES meter_series (id)"
+    else:
+        columns = (
+            "timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL, measurand VARCHAR NOT NULL, value VARCHAR NOT NULL, "
+            "unit VARCHAR, phase VARCHAR, context VARCHAR"
+        )
+    op.execute(f"""
+        CREATE TABLE meter_readings (
+            id INTEGER NOT NULL DEFAULT nextval('meter_readings_id_seq'),
+            transaction_id INTEGER NOT NULL REFERENCES charging_sessions (transaction_id),
+            {columns},
+            PRIMARY KEY (id)
+        )
+    """)
+
+
+def _set_aside(old_name: str) -> None:
+    op.execute("ALTER SEQUENCE meter_readings_id_seq OWNED BY NONE")
+    op.execute(f"ALTER TABLE meter_readings RENAME TO {old_name}")
+    op.execute(f"ALTER TABLE {old_name} RENAME CONSTRAINT meter_readings_pkey TO {old_name}_pkey")
+    op.execute(f"ALTER INDEX ix_meter_readings_id RENAME TO ix_{old_name}_id")
+    op.execute(f"ALTER INDEX ix_meter_readings_transaction_id_timestamp RENAME TO ix_{old_name}_transaction_id_timestamp")
+
+
+def _take_over(old_name: str) -> None:
+    op.create_index('ix_meter_readings_id', 'meter_readings', ['id'])
+    op.create_index('ix_meter_readings_transaction_id_timestamp', 'meter_readings', ['transaction_id', 'timestamp', 'id'])
+    op.execute("ALTER SEQUENCE meter_readings_id_seq OWNED BY meter_readings.id")
+    op.execute(f"DROP TABLE {old_name}")
+    op.execute("ANALYZE meter_readings")
+
+
+def upgrade() -> None:
+    op.create_table('meter_series',
+    sa.Column('id', sa.SmallInteger(), nullable=False),
+    sa.Column('measurand', sa.String(), nullable=False),
+    sa.Column('unit', sa.String(), nullable=True),
+    sa.Column('phase', sa.String(), nullable=True),
+    sa.Column('context', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ux_meter_series_key', 'meter_series', ['measurand', 'unit', 'phase', 'context'], unique=True, postgresql_nulls_not_distinct=True)
+    op.execute("""
+        INSERT INTO meter_series (measurand, unit, phase, context)
+        SELECT DISTINCT measurand, unit, phase, context FROM meter_readings
+    """)
+
+    _set_aside("meter_readings_text")
+    _create_readings(compact=True)
+    op.execute(f"""
+        INSERT INTO meter_readings (id, transaction_id, timestamp, value, series_id)
+        SELECT r.id, r.transaction_id, r.timestamp, r.value::double precision, s.id
+        FROM meter_readings_text r
+        JOIN meter_series s
+          ON s.measurand = r.measurand
+         AND s.unit IS NOT DISTINCT FROM r.unit
+         AND s.phase IS NOT DISTINCT FROM r.phase
+         AND s.context IS NOT DISTINCT FROM r.context
+        WHERE r.value ~ '{NUMERIC}'
+    """)
+    _take_over("meter_readings_text")
+
+    op.create_table('meter_reading_archives',
+    sa.Column('transaction_id', sa.Integer(), nullable=False),
+    sa.Column('series_id', sa.SmallInteger(), nullable=False),
+    sa.Column('sample_count', sa.Integer(), nullable=False),
+    sa.Column('first_timestamp', sa.DateTime(), nullable=False),
+    sa.Column('last_timestamp', sa.DateTime(), nullable=False),
+    sa.Column('timestamp_data', sa.LargeBinary(), nullable=False),
+    sa.Column('value_data', sa.LargeBinary(), nullable=False),
+    sa.ForeignKeyConstraint(['transaction_id'], ['charging_sessions.transaction_id'], ),
+    sa.ForeignKeyConstraint(['series_id'], ['meter_series.id'], ),
+    sa.PrimaryKeyConstraint('transaction_id', 'series_id')
+    )
+
+
+def _unpack(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def downgrade() -> None:
+    # Archived sessions are unpacked in Python below, which needs the data
+    if context.is_offline_mode():
+        raise NotImplementedError("Downgrading 4e7b5ea10d16 unpacks archived readings and needs a live database")
+
+    _set_aside("meter_readings_compact")
+    _create_readings(compact=False)
+    op.execute("""
+        INSERT INTO meter_readings (id, transaction_id, timestamp, measurand, value, unit, phase, context)
+        SELECT r.id, r.transaction_id, r.timestamp, s.measurand, r.value::text, s.unit, s.phase, s.context
+        FROM meter_readings_compact r JOIN meter_series s ON s.id = r.series_id
+    """)
+    _take_over("meter_readings_compact")
+
+    # Archived sessions go back to one row per value (see app/services/meter_store.py for the encoding)
+    bind = op.get_bind()
+    epoch = datetime(1970, 1, 1)
+    archives = bind.execute(sa.text("""
+        SELECT a.transaction_id, s.measurand, s.unit, s.phase, s.context, a.timestamp_data, a.value_data
+        FROM meter_reading_archives a JOIN meter_series s ON s.id = a.series_id
+    """))
+    insert = sa.text("""
+        INSERT INTO meter_readings (transaction_id, timestamp, measurand, value, unit, phase, context)
+        VALUES (:transaction_id, :timestamp, :measurand, :value, :unit, :phase, :context)
+    """)
+    for transaction_id, measurand, unit, phase, sample_context, timestamp_data, value_data in archives.all():
+        micros = accumulate(_unpack("q", bytes(timestamp_data)))
+        bind.execute(insert, [
+            {
+                "transaction_id": transaction_id, "timestamp": epoch + timedelta(microseconds=m),
+                "measurand": measurand, "value": repr(v), "unit": unit, "phase": phase, "context": sample_context,
+            }
+            for m, v in zip(micros, _unpack("d", bytes(value_data)))
+        ])
+
+    op.drop_table('meter_reading_archives')
+    op.drop_index('ux_meter_series_key', table_name='meter_series')
+    op.drop_table('meter_series')
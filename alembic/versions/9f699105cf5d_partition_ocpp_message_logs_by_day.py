@@ -0,0 +1,90 @@
+"""Partition ocpp_message_logs by day
+
+Revision ID: 9f699105cf5d
+Revises: d77cc994a938
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+from datetime import datetime, timedelta, timezone
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9f699105cf5d'
+down_revision = 'd77cc994a938'
+branch_labels = None
+depends_on = None
+
+# Same naming as app/services/log_partitions.py, which takes over from here
+PARTITION_PREFIX = "ocpp_message_logs_p"
+PARTITIONS_AHEAD_DAYS = 7
+
+COLUMNS = "id, station_id, message_type, action, direction, payload, timestamp"
+
+
+def _create_table(partitioned: bool) -> None:
+    op.execute(f"""
+        CREATE TABLE ocpp_message_logs (
+            id INTEGER NOT NULL DEFAULT nextval('ocpp_message_logs_id_seq'),
+            station_id VARCHAR NOT NULL REFERENCES charging_stations (id),
+            message_type VARCHAR NOT NULL,
+            action VARCHAR NOT NULL,
+            direction VARCHAR NOT NULL,
+            payload JSON,
+            timestamp TIMESTAMP WITHOUT TIME ZONE {"NOT NULL" if partitioned else ""},
+            PRIMARY KEY ({"id, timestamp" if partitioned else "id"})
+        ) {"PARTITION BY RANGE (timestamp)" if partitioned else ""}
+    """)
+    op.create_index('ix_ocpp_message_logs_id', 'ocpp_message_logs', ['id'])
+    op.create_index('ix_ocpp_message_logs_station_id_timestamp', 'ocpp_message_logs', ['station_id', 'timestamp', 'id'])
+
+
+def _set_aside(old_name: str) -> None:
+    # The id sequence outlives the old table; index and key names must be free for the new one
+    op.execute("ALTER SEQUENCE ocpp_message_logs_id_seq OWNED BY NONE")
+    op.execute(f"ALTER TABLE ocpp_message_logs RENAME TO {old_name}")
+    op.execute(f"ALTER TABLE {old_name} RENAME CONSTRAINT ocpp_message_logs_pkey TO {old_name}_pkey")
+    op.execute(f"ALTER INDEX ix_ocpp_message_logs_id RENAME TO ix_{old_name}_id")
+    op.execute(f"ALTER INDEX ix_ocpp_message_logs_station_id_timestamp RENAME TO ix_{old_name}_station_id_timestamp")
+
+
+def _take_over(old_name: str) -> None:
+    op.execute("ALTER SEQUENCE ocpp_message_logs_id_seq OWNED BY ocpp_message_logs.id")
+    op.execute(f"DROP TABLE {old_name} CASCADE")
+    op.execute("ANALYZE ocpp_message_logs")
+
+
+def upgrade() -> None:
+    _set_aside("ocpp_message_logs_unpartitioned")
+    _create_table(partitioned=True)
+    op.execute("CREATE TABLE ocpp_message_logs_default PARTITION OF ocpp_message_logs DEFAULT")
+
+    # One partition per day that has rows, plus the days ahead the maintenance job would create
+    # Offline (--sql) there is no data to look at; older rows then stay in the default partition
+    today = datetime.now(timezone.utc).date()
+    days = set()
+    if not context.is_offline_mode():
+        days.update(op.get_bind().execute(sa.text(
+            "SELECT DISTINCT timestamp::date FROM ocpp_message_logs_unpartitioned WHERE timestamp IS NOT NULL"
+        )).scalars())
+    days.update(today + timedelta(days=offset) for offset in range(PARTITIONS_AHEAD_DAYS + 1))
+    for day in sorted(days):
+        op.execute(
+            f"CREATE TABLE {PARTITION_PREFIX}{day:%Y%m%d} PARTITION OF ocpp_message_logs "
+            f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+        )
+
+    op.execute(f"""
+        INSERT INTO ocpp_message_logs ({COLUMNS})
+        SELECT id, station_id, message_type, action, direction, payload, COALESCE(timestamp, now() AT TIME ZONE 'UTC')
+        FROM ocpp_message_logs_unpartitioned
+    """)
+    _take_over("ocpp_message_logs_unpartitioned")
+
+
+def downgrade() -> None:
+    _set_aside("ocpp_message_logs_partitioned")
+    _create_table(partitioned=False)
+    op.execute(f"INSERT INTO ocpp_message_logs ({COLUMNS}) SELECT {COLUMNS} FROM ocpp_message_logs_partitioned")
+    _take_over("ocpp_message_logs_partitioned")
@@ -0,0 +1,55 @@
+"""Add daily energy rollups per station and per renter
+
+Revision ID: b6d2c91f3a47
+Revises: 4e7b5ea10d16
+Create Date: 2026-10-16 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d2c91f3a47'
+down_revision = '4e7b5ea10d16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('energy_rollups_station_daily',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('station_id', sa.String(), nullable=False),
+    sa.Column('energy_kwh', sa.Float(), nullable=False),
+    sa.Column('session_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'station_id')
+    )
+    op.create_table('energy_rollups_renter_daily',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('renter_id', sa.Integer(), nullable=False),
+    sa.Column('energy_kwh', sa.Float(), nullable=False),
+    sa.Column('session_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'renter_id')
+    )
+
+    # Backfill from closed sessions, by start day; same grouping as EnergyRollupService.rebuild()
+    op.execute("""
+        INSERT INTO energy_rollups_station_daily (day, station_id, energy_kwh, session_count)
+        SELECT date(s.start_time), s.station_id, coalesce(sum(s.total_energy_kwh), 0), count(*)
+        FROM charging_sessions s
+        WHERE s.end_time IS NOT NULL
+        GROUP BY date(s.start_time), s.station_id
+    """)
+    op.execute("""
+        INSERT INTO energy_rollups_renter_daily (day, renter_id, energy_kwh, session_count)
+        SELECT date(s.start_time), t.renter_id, coalesce(sum(s.total_energy_kwh), 0), count(*)
+        FROM charging_sessions s
+        JOIN authorization_tokens t ON t.token = s.token_id
+        WHERE s.end_time IS NOT NULL AND t.renter_id IS NOT NULL
+        GROUP BY date(s.start_time), t.renter_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('energy_rollups_renter_daily')
+    op.drop_table('energy_rollups_station_daily')
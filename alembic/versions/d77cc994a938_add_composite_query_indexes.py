@@ -0,0 +1,59 @@
+"""Add composite and partial indexes for the hot read paths
+
+Revision ID: d77cc994a938
+Revises: 10430d52d068
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd77cc994a938'
+down_revision = '10430d52d068'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_ocpp_message_logs_station_id_timestamp", "ocpp_message_logs", ["station_id", "timestamp", "id"], None),
+    ("ix_meter_readings_transaction_id_timestamp", "meter_readings", ["transaction_id", "timestamp", "id"], None),
+    ("ix_charging_sessions_station_id_start_time", "charging_sessions", ["station_id", "start_time"], None),
+    ("ix_charging_sessions_open", "charging_sessions", ["station_id", "start_time"], "end_time IS NULL"),
+    ("ix_charging_sessions_invoice_id_start_time", "charging_sessions", ["invoice_id", "start_time"], None),
+    ("ix_station_connectors_station_id_status", "station_connectors", ["station_id", "status"], None),
+]
+
+
+def _is_invalid(name: str) -> bool:
+    # A CREATE INDEX CONCURRENTLY that failed part-way leaves an INVALID index the planner never uses
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return False
+    return bind.execute(sa.text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND NOT i.indisvalid"
+    ), {"name": name}).first() is not None
+
+
+def upgrade() -> None:
+    # The log and reading tables take writes constantly; build without blocking them
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            if _is_invalid(name):
+                # Left over from an interrupted run; if_not_exists would keep it for good
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+            op.create_index(
+                name, table, columns,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+    for table in sorted({table for _, table, _, _ in INDEXES}):
+        op.execute(f"ANALYZE {table}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
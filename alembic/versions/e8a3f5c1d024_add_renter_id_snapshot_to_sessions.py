@@ -0,0 +1,33 @@
+"""Keep the renter a session was rolled up under on the session
+
+Revision ID: e8a3f5c1d024
+Revises: b6d2c91f3a47
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a3f5c1d024'
+down_revision = 'b6d2c91f3a47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('charging_sessions', sa.Column('renter_id_snapshot', sa.Integer(), nullable=True))
+
+    # Closed sessions get their token's current renter, the one the energy_rollups_renter_daily backfill used
+    op.execute("""
+        UPDATE charging_sessions
+        SET renter_id_snapshot = (
+            SELECT t.renter_id FROM authorization_tokens t WHERE t.token = charging_sessions.token_id
+        )
+        WHERE end_time IS NOT NULL AND token_id IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('charging_sessions', 'renter_id_snapshot')
@@ -5,6 +5,52 @@ class Settings:
     DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://user:password@db/onetime")
     # RabbitMQ keys removed
 
+    # Database connection pool and the worker threads that run blocking DB calls
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_THREADPOOL_SIZE = int(os.getenv("DB_THREADPOOL_SIZE", "8")) # 0 runs DB calls inline on the event loop
+
+    # Send OCPP responses before logging, last_seen and MeterValues persistence run
+    OCPP_RESPOND_FIRST = os.getenv("OCPP_RESPOND_FIRST", "true").lower() == "true"
+
+    # OCPP message log write-behind pipeline
+    LOG_QUEUE_MAX_SIZE = int(os.getenv("LOG_QUEUE_MAX_SIZE", "10000"))
+    LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "500"))
+    LOG_FLUSH_INTERVAL_SECONDS = float(os.getenv("LOG_FLUSH_INTERVAL_SECONDS", "1.0"))
+    LOG_OVERFLOW_POLICY = os.getenv("LOG_OVERFLOW_POLICY", "drop_oldest") # block, drop_oldest or sample
+    LOG_SAMPLE_RATE = int(os.getenv("LOG_SAMPLE_RATE", "10")) # Keep 1 of N messages while the queue is full
+
+    # OCPP message log daily partitions
+    LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "90")) # Older partitions are dropped; 0 keeps everything
+    LOG_PARTITIONS_AHEAD_DAYS = int(os.getenv("LOG_PARTITIONS_AHEAD_DAYS", "7"))
+
+    # Coalesced last_seen / heartbeat tracking
+    LAST_SEEN_FLUSH_INTERVAL_SECONDS = float(os.getenv("LAST_SEEN_FLUSH_INTERVAL_SECONDS", "5.0"))
+
+    # Authorization token cache
+    TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+    TOKEN_NEGATIVE_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_NEGATIVE_CACHE_TTL_SECONDS", "60"))
+    UNKNOWN_TOKEN_FLUSH_INTERVAL_SECONDS = float(os.getenv("UNKNOWN_TOKEN_FLUSH_INTERVAL_SECONDS", "5.0"))
+
+    # MeterValues ingestion
+    METER_COALESCE_INTERVAL_SECONDS = float(os.getenv("METER_COALESCE_INTERVAL_SECONDS", "0")) # 0 writes each frame immediately
+    METER_BATCH_MAX_ROWS = int(os.getenv("METER_BATCH_MAX_ROWS", "5000"))
+    METER_ARCHIVE_AFTER_HOURS = float(os.getenv("METER_ARCHIVE_AFTER_HOURS", "24")) # Pack readings of sessions closed this long ago; 0 disables
+    METER_ARCHIVE_BATCH_SESSIONS = int(os.getenv("METER_ARCHIVE_BATCH_SESSIONS", "500"))
+    READINGS_MAX_POINTS = int(os.getenv("READINGS_MAX_POINTS", "500")) # Per series in the session chart, unless full resolution is requested
+
+    # Invoice generation: renters invoiced per transaction, then PDFs rendered
+    BILLING_BATCH_RENTERS = int(os.getenv("BILLING_BATCH_RENTERS", "500"))
+    INVOICE_RENDER_WORKERS = int(os.getenv("INVOICE_RENDER_WORKERS", "2")) # Worker processes; 0 renders inline on the event loop
+    INVOICE_RENDER_IDLE_SECONDS = float(os.getenv("INVOICE_RENDER_IDLE_SECONDS", "60")) # Stop the workers after this long without renders
+    INVOICE_JOB_WORKERS = int(os.getenv("INVOICE_JOB_WORKERS", "2")) # Invoice generation jobs processed at the same time
+    INVOICE_JOB_HISTORY = int(os.getenv("INVOICE_JOB_HISTORY", "200")) # Finished jobs kept for status queries
+
+    # Live dashboard feed (SSE)
+    LIVE_FEED_MAX_PENDING = int(os.getenv("LIVE_FEED_MAX_PENDING", "5000")) # Per subscriber; beyond this it gets a fresh snapshot
+    LIVE_FEED_MIN_INTERVAL_SECONDS = float(os.getenv("LIVE_FEED_MIN_INTERVAL_SECONDS", "0.5"))
+    LIVE_FEED_KEEPALIVE_SECONDS = float(os.getenv("LIVE_FEED_KEEPALIVE_SECONDS", "15"))
+
 settings = Settings()
 
 logging.basicConfig(level=logging.INFO)
@@ -1,13 +1,49 @@
+import asyncio
+import functools
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.config import settings
 
-engine = create_engine(settings.DATABASE_URL)
+engine = create_engine(
+    settings.DATABASE_URL,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Dedicated worker threads for blocking SQLAlchemy/psycopg2 calls made from
+# async code (OCPP handlers, background flushers), so one slow query never
+# stalls the event loop that serves every charger's WebSocket.
+_db_executor = (
+    ThreadPoolExecutor(max_workers=settings.DB_THREADPOOL_SIZE, thread_name_prefix="db")
+    if settings.DB_THREADPOOL_SIZE > 0
+    else None
+)
+
+async def run_db(fn, *args, **kwargs):
+    """Run a blocking DB function on the DB thread pool and await its result."""
+    if _db_executor is None:
+        return fn(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, functools.partial(fn, *args, **kwargs))
+
+@contextmanager
+def session_scope(db: Session = None):
+    """The caller's session if it passed one, else a new one that is closed on exit."""
+    if db is not None:
+        yield db
+        return
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
 def get_db():
     db = SessionLocal()
     try:
@@ -3,6 +3,7 @@ from fastapi import WebSocket
 from app.config import logger
 
 from app.services.station_service import station_service
+from app.services.events import event_bus, Events
 
 class ConnectionRegistry:
     _instance = None
@@ -18,12 +19,14 @@ class ConnectionRegistry:
         self.active_connections[charger_id] = websocket
         logger.info(f"Charger {charger_id} connected. Total: {len(self.active_connections)}")
         await station_service.set_station_online(charger_id)
+        event_bus.emit(Events.STATION_CONNECTED, charger_id=charger_id)
 
     async def disconnect(self, charger_id: str):
         if charger_id in self.active_connections:
             del self.active_connections[charger_id]
             logger.info(f"Charger {charger_id} disconnected. Total: {len(self.active_connections)}")
         await station_service.set_station_offline(charger_id)
+        event_bus.emit(Events.STATION_DISCONNECTED, charger_id=charger_id)
 
     def get_connection(self, charger_id: str) -> WebSocket:
         return self.active_connections.get(charger_id)
@@ -1,26 +1,33 @@
 import json
+import time
 from datetime import datetime, timezone
 from ocpp.v16 import ChargePoint as v16ChargePoint
 from ocpp.v16 import call
 from ocpp.v16 import call_result
 from ocpp.v16.enums import Action, RegistrationStatus
-from ocpp.routing import on
+from ocpp.routing import on, after
 from app.config import settings, logger
 from app.services.events import event_bus, Events
 from app.services.station_service import station_service
 from app.services.authorization_service import authorization_service
 from app.services.transactions import transaction_service
 from app.services.logging_service import logging_service
+from app.services.background_tasks import background_tasks
+from app.services.latency_histogram import response_latency
 
 class ChargePoint(v16ChargePoint):
+
+    # (action, perf_counter at receipt) of the CALL currently being answered
+    _pending_response = None
     
     async def route_message(self, raw_msg):
+        received_at = time.perf_counter()
+        action = "Unknown"
+        payload = {}
+        type_str = "UNKNOWN"
         try:
             msg = json.loads(raw_msg)
             msg_type = msg[0]
-            action = "Unknown"
-            payload = {}
-            type_str = "UNKNOWN"
             
             if msg_type == 2: # CALL
                 type_str = "CALL"
@@ -34,7 +41,21 @@ class ChargePoint(v16ChargePoint):
                 type_str = "CALLERROR"
                 action = "Error"
                 payload = {"code": msg[2], "description": msg[3], "details": msg[4]}
-                
+        except Exception as e:
+            logger.error(f"Error parsing incoming message: {e}")
+
+        # Logging and last_seen never change the response, so by default they don't delay it
+        if settings.OCPP_RESPOND_FIRST:
+            background_tasks.spawn(self._record_incoming(type_str, action, payload), name=f"record-incoming-{self.id}")
+        else:
+            await self._record_incoming(type_str, action, payload)
+
+        if type_str == "CALL":
+            self._pending_response = (action, received_at)
+        await super().route_message(raw_msg)
+
+    async def _record_incoming(self, type_str: str, action: str, payload):
+        try:
             await logging_service.log_message(
                 station_id=self.id,
                 direction="Incoming",
@@ -47,8 +68,16 @@ class ChargePoint(v16ChargePoint):
             await station_service.update_last_seen(self.id)
         except Exception as e:
             logger.error(f"Error logging incoming message: {e}")
-            
-        await super().route_message(raw_msg)
+
+    async def _send(self, message):
+        pending = self._pending_response
+        # CALLRESULT / CALLERROR answering the CALL being routed (outgoing CALLs start with "[2")
+        if pending is not None and message[1:2] in ("3", "4"):
+            self._pending_response = None
+            await super()._send(message)
+            response_latency.record(pending[0], time.perf_counter() - pending[1])
+            return
+        await super()._send(message)
 
     async def call(self, payload, suppress=False):
         try:
@@ -97,18 +126,41 @@ class ChargePoint(v16ChargePoint):
     @on(Action.meter_values)
     async def on_meter_values(self, connector_id: int = None, transaction_id: int = None, **kwargs):
         logger.info(f"Received MeterValues from {self.id}")
-        
-        # Async background processing
-        await transaction_service.handle_meter_values(
+        event_bus.emit(
+            Events.METER_VALUES,
             charger_id=self.id,
-            payload={
-                "connector_id": connector_id,
-                "transaction_id": transaction_id,
-                "meter_value": kwargs.get("meter_value")
-            }
+            connector_id=connector_id,
+            transaction_id=transaction_id,
+            meter_value=kwargs.get("meter_value")
         )
         
+        if not settings.OCPP_RESPOND_FIRST:
+            await transaction_service.handle_meter_values(
+                charger_id=self.id,
+                payload={
+                    "connector_id": connector_id,
+                    "transaction_id": transaction_id,
+                    "meter_value": kwargs.get("meter_value")
+                }
+            )
+        
         return call_result.MeterValues()
+
+    @after(Action.meter_values)
+    def after_meter_values(self, connector_id: int = None, transaction_id: int = None, **kwargs):
+        # Runs once the CALLRESULT has been sent
+        if settings.OCPP_RESPOND_FIRST:
+            background_tasks.spawn(
+                transaction_service.handle_meter_values(
+                    charger_id=self.id,
+                    payload={
+                        "connector_id": connector_id,
+                        "transaction_id": transaction_id,
+                        "meter_value": kwargs.get("meter_value")
+                    }
+                ),
+                name=f"meter-values-{self.id}"
+            )
         
     @on(Action.authorize)
     async def on_authorize(self, id_tag: str, **kwargs):
@@ -137,6 +189,14 @@ class ChargePoint(v16ChargePoint):
             timestamp=timestamp,
             **kwargs
         )
+        if response.get("transaction_id"):
+            event_bus.emit(
+                Events.TRANSACTION_STARTED,
+                charger_id=self.id,
+                connector_id=connector_id,
+                transaction_id=response["transaction_id"],
+                meter_start=meter_start
+            )
         return call_result.StartTransaction(
             transaction_id=response.get("transaction_id", 0),
             id_tag_info=response.get("id_tag_info")
@@ -152,6 +212,7 @@ class ChargePoint(v16ChargePoint):
             transaction_id=transaction_id,
             **kwargs
         )
+        event_bus.emit(Events.TRANSACTION_STOPPED, charger_id=self.id, transaction_id=transaction_id)
         return call_result.StopTransaction(
             id_tag_info=response.get("id_tag_info")
         )
@@ -166,6 +227,13 @@ class ChargePoint(v16ChargePoint):
             error_code=error_code,
             **kwargs
         )
+        event_bus.emit(
+            Events.STATUS_NOTIFICATION,
+            charger_id=self.id,
+            connector_id=connector_id,
+            status=status,
+            error_code=error_code
+        )
         return call_result.StatusNotification()
 
     @on(Action.data_transfer)
@@ -9,13 +9,11 @@ from app.routers import auth, admin
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from sqlalchemy.orm import Session
 from datetime import datetime, timezone
 import asyncio
 
-from app.database import SessionLocal
-from app.models import Renter, BillingPeriodicity
-from app.services.billing_service import get_billing_settings, calculate_and_generate_invoice
+from app.models import BillingPeriodicity
+from app.services.billing_service import load_billing_settings
 from app.services.station_service import station_service
 
 app = FastAPI(title="Onetime Backend", version="2.0.0")
@@ -23,10 +21,11 @@ app = FastAPI(title="Onetime Backend", version="2.0.0")
 scheduler = AsyncIOScheduler()
 
 async def auto_billing_job():
+    from app.database import run_db
+    from app.services.invoice_jobs import invoice_jobs
     logger.info("Running automatic billing background job...")
-    db: Session = SessionLocal()
     try:
-        settings = get_billing_settings(db)
+        settings = await run_db(load_billing_settings)
         today = datetime.now(timezone.utc)
         
         # Check if today is the end of a period
@@ -42,20 +41,28 @@ async def auto_billing_job():
             is_end_of_period = True
             
         if is_end_of_period:
-            renters = db.query(Renter).filter(Renter.is_active == True).all()
-            for renter in renters:
-                try:
-                    invoice = calculate_and_generate_invoice(db, renter, today)
-                    if invoice:
-                        logger.info(f"Automatically generated invoice {invoice.id} for renter {renter.name}")
-                except Exception as e:
-                    logger.error(f"Failed to generate automatic invoice for renter {renter.name}: {e}")
+            job = invoice_jobs.submit(today)
+            logger.info(f"Queued automatic billing run as invoice job {job.id}")
         else:
             logger.info("Today is not the end of a configured billing period. No invoices generated.")
     except Exception as e:
         logger.error(f"Error in automatic billing job: {e}")
-    finally:
-        db.close()
+
+async def log_partition_job():
+    from app.database import run_db
+    from app.services.log_partitions import log_partitions
+    try:
+        await run_db(log_partitions.maintain)
+    except Exception as e:
+        logger.error(f"Error in OCPP log partition maintenance: {e}")
+
+async def meter_archive_job():
+    from app.database import run_db
+    from app.services.meter_store import meter_store
+    try:
+        await run_db(meter_store.archive_closed)
+    except Exception as e:
+        logger.error(f"Error archiving meter readings: {e}")
 
 @app.get("/health")
 async def health_check():
@@ -68,6 +75,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 app.add_middleware(DualModeAuthMiddleware)
 
@@ -76,14 +84,76 @@ async def startup():
     logger.info("Starting Onetime Backend (Monolith)...")
     logger.info("Event listeners registered via imports.")
     
+    from app.database import run_db
+    from app.services.station_cache import station_cache
+    try:
+        await run_db(station_cache.warm)
+    except Exception as e:
+        logger.error(f"Failed to warm station cache, falling back to lazy loading: {e}")
+
+    from app.services.fleet_state import fleet_state
+    try:
+        await run_db(fleet_state.rebuild)
+    except Exception as e:
+        logger.error(f"Failed to build the fleet read model, charger endpoints will query the DB: {e}")
+
     from app.services.watchdog import watchdog
     watchdog.start()
+
+    from app.services.logging_service import logging_service
+    logging_service.start()
+
+    from app.services.last_seen_tracker import last_seen_tracker
+    last_seen_tracker.start()
+
+    from app.services.token_cache import token_cache
+    token_cache.start()
+
+    from app.services.meter_ingest import meter_reading_writer
+    meter_reading_writer.start()
+
+    from app.services.invoice_jobs import invoice_jobs
+    invoice_jobs.start()
     
+    # Make sure today's OCPP log partition exists before the first frames arrive
+    await log_partition_job()
+
     # Schedule the auto_billing_job to run every day at 00:01
     scheduler.add_job(auto_billing_job, CronTrigger(hour=0, minute=1))
+    # Create upcoming OCPP log partitions and drop expired ones (times are UTC, like the partitions)
+    scheduler.add_job(log_partition_job, CronTrigger(hour=0, minute=15, timezone="UTC"))
+    # Pack the readings of long-closed sessions into per-series arrays
+    scheduler.add_job(meter_archive_job, CronTrigger(minute=30))
     scheduler.start()
     logger.info("APScheduler started.")
 
+@app.on_event("shutdown")
+async def shutdown():
+    logger.info("Shutting down Onetime Backend...")
+
+    from app.services.background_tasks import background_tasks
+    # Let respond-first side effects finish before their pipelines are flushed
+    await background_tasks.drain()
+
+    from app.services.logging_service import logging_service
+    # Flush buffered OCPP logs before the process exits
+    await logging_service.stop()
+
+    from app.services.last_seen_tracker import last_seen_tracker
+    await last_seen_tracker.stop()
+
+    from app.services.token_cache import token_cache
+    await token_cache.stop()
+
+    from app.services.meter_ingest import meter_reading_writer
+    await meter_reading_writer.stop()
+
+    from app.services.invoice_jobs import invoice_jobs
+    await invoice_jobs.stop()
+
+    from app.services.invoice_renderer import invoice_renderer
+    invoice_renderer.shutdown()
+
 # Routes
 app.include_router(auth.router)
 app.include_router(admin.router)
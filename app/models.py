@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float, Enum, JSON
+from sqlalchemy import Column, Integer, SmallInteger, String, Boolean, Date, DateTime, ForeignKey, Float, Enum, JSON, LargeBinary, Sequence, Index, text, DDL, event
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 import enum
@@ -114,8 +114,30 @@ class AuthorizationToken(Base):
     sessions = relationship("ChargingSession", back_populates="token_rel")
 
 
+# OCPP 1.6 transaction ids are int32. The sequence hands out the first id of a
+# block; the process allocates the rest of the block in memory.
+TRANSACTION_ID_BLOCK_SIZE = 100
+TRANSACTION_ID_MAX = 2147483647
+transaction_id_seq = Sequence(
+    "ocpp_transaction_id_seq",
+    increment=TRANSACTION_ID_BLOCK_SIZE,
+    maxvalue=TRANSACTION_ID_MAX,
+    metadata=Base.metadata,
+)
+
 class ChargingSession(Base):
     __tablename__ = "charging_sessions"
+    __table_args__ = (
+        # Session history per charger, newest first
+        Index("ix_charging_sessions_station_id_start_time", "station_id", "start_time"),
+        # Open sessions only; stays small however long the history gets
+        Index(
+            "ix_charging_sessions_open", "station_id", "start_time",
+            postgresql_where=text("end_time IS NULL"), sqlite_where=text("end_time IS NULL"),
+        ),
+        # Invoice line items, and unbilled sessions (invoice_id IS NULL) up to a date
+        Index("ix_charging_sessions_invoice_id_start_time", "invoice_id", "start_time"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     transaction_id = Column(Integer, unique=True, nullable=False, index=True)
@@ -133,6 +155,8 @@ class ChargingSession(Base):
     token_snapshot = Column(String, nullable=True)
     renter_name_snapshot = Column(String, nullable=True)
     renter_email_snapshot = Column(String, nullable=True)
+    # Renter the session's energy is rolled up under, fixed when it stops
+    renter_id_snapshot = Column(Integer, nullable=True)
 
     # Billing relation
     invoice_id = Column(Integer, ForeignKey("invoices.id", ondelete="SET NULL"), nullable=True)
@@ -140,12 +164,16 @@ class ChargingSession(Base):
     station = relationship("ChargingStation", back_populates="sessions")
     token_rel = relationship("AuthorizationToken", back_populates="sessions")
     meter_readings = relationship("MeterReading", back_populates="session", cascade="all, delete-orphan")
+    meter_archives = relationship("MeterReadingArchive", back_populates="session", cascade="all, delete-orphan")
     invoice = relationship("Invoice", back_populates="sessions")
     prepaid_transactions = relationship("PrepaidTransaction", back_populates="session")
 
 
 class StationConnector(Base):
     __tablename__ = "station_connectors"
+    __table_args__ = (
+        Index("ix_station_connectors_station_id_status", "station_id", "status"),
+    )
 
     station_id = Column(String, ForeignKey("charging_stations.id"), primary_key=True)
     connector_id = Column(Integer, primary_key=True)
@@ -156,19 +184,59 @@ class StationConnector(Base):
     station = relationship("ChargingStation", back_populates="connectors")
 
 
+class MeterSeries(Base):
+    """Dictionary of the (measurand, unit, phase, context) combinations readings refer to."""
+    __tablename__ = "meter_series"
+    __table_args__ = (
+        Index(
+            "ux_meter_series_key", "measurand", "unit", "phase", "context",
+            unique=True, postgresql_nulls_not_distinct=True,
+        ),
+    )
+
+    # SQLite only autoincrements an INTEGER primary key
+    id = Column(SmallInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    measurand = Column(String, nullable=False)
+    unit = Column(String, nullable=True)
+    phase = Column(String, nullable=True)
+    context = Column(String, nullable=True)
+
+
 class MeterReading(Base):
     __tablename__ = "meter_readings"
+    __table_args__ = (
+        # Readings of a session in time order; id breaks ties for "latest reading"
+        Index("ix_meter_readings_transaction_id_timestamp", "transaction_id", "timestamp", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     transaction_id = Column(Integer, ForeignKey("charging_sessions.transaction_id"), nullable=False)
     timestamp = Column(DateTime, nullable=False)
-    measurand = Column(String, nullable=False)
-    value = Column(String, nullable=False)
-    unit = Column(String, nullable=True)
-    phase = Column(String, nullable=True)
-    context = Column(String, nullable=True)
+    value = Column(Float, nullable=False)
+    # Last, so the 2-byte id doesn't pad the 8-byte columns
+    series_id = Column(SmallInteger, ForeignKey("meter_series.id"), nullable=False)
 
     session = relationship("ChargingSession", back_populates="meter_readings")
+    series = relationship("MeterSeries")
+
+
+class MeterReadingArchive(Base):
+    """
+    All readings of one series of a closed session, packed into two arrays
+    (see app/services/meter_store.py for the encoding).
+    """
+    __tablename__ = "meter_reading_archives"
+
+    transaction_id = Column(Integer, ForeignKey("charging_sessions.transaction_id"), primary_key=True)
+    series_id = Column(SmallInteger, ForeignKey("meter_series.id"), primary_key=True)
+    sample_count = Column(Integer, nullable=False)
+    first_timestamp = Column(DateTime, nullable=False)
+    last_timestamp = Column(DateTime, nullable=False)
+    timestamp_data = Column(LargeBinary, nullable=False)
+    value_data = Column(LargeBinary, nullable=False)
+
+    session = relationship("ChargingSession", back_populates="meter_archives")
+    series = relationship("MeterSeries")
 
 
 class StationConfiguration(Base):
@@ -198,17 +266,31 @@ class BootLog(Base):
 
 class OcppMessageLog(Base):
     __tablename__ = "ocpp_message_logs"
-
-    id = Column(Integer, primary_key=True, index=True)
+    __table_args__ = (
+        # Keyset pagination over a charger's log: (timestamp, id) within station_id
+        Index("ix_ocpp_message_logs_station_id_timestamp", "station_id", "timestamp", "id"),
+        # Daily range partitions, managed by app/services/log_partitions.py
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     station_id = Column(String, ForeignKey("charging_stations.id"), nullable=False)
     message_type = Column(String, nullable=False) # e.g. CALL, CALLRESULT, CALLERROR
     action = Column(String, nullable=False) # e.g. BootNotification
     direction = Column(String, nullable=False) # Incoming, Outgoing
     payload = Column(JSON, nullable=True) # The JSON payload
-    timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    # Partition key, so part of the primary key
+    timestamp = Column(DateTime, primary_key=True, default=lambda: datetime.now(timezone.utc))
 
     station = relationship("ChargingStation", back_populates="ocpp_logs")
 
+# Rows outside every daily partition land here instead of failing the insert
+event.listen(
+    OcppMessageLog.__table__,
+    "after_create",
+    DDL("CREATE TABLE ocpp_message_logs_default PARTITION OF ocpp_message_logs DEFAULT").execute_if(dialect="postgresql"),
+)
+
 
 class RelaySettings(Base):
     __tablename__ = "relay_settings"
@@ -288,3 +370,21 @@ class PrepaidTransaction(Base):
     renter = relationship("Renter", back_populates="prepaid_transactions")
     session = relationship("ChargingSession", back_populates="prepaid_transactions")
 
+
+# Daily energy aggregates, maintained on StopTransaction (app/services/energy_rollups.py).
+# No foreign keys: like the session snapshots, history outlives deleted stations and renters.
+class EnergyRollupStationDaily(Base):
+    __tablename__ = "energy_rollups_station_daily"
+
+    day = Column(Date, primary_key=True)
+    station_id = Column(String, primary_key=True)
+    energy_kwh = Column(Float, nullable=False, default=0.0)
+    session_count = Column(Integer, nullable=False, default=0)
+
+class EnergyRollupRenterDaily(Base):
+    __tablename__ = "energy_rollups_renter_daily"
+
+    day = Column(Date, primary_key=True)
+    renter_id = Column(Integer, primary_key=True)
+    energy_kwh = Column(Float, nullable=False, default=0.0)
+    session_count = Column(Integer, nullable=False, default=0)
@@ -1,14 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.database import SessionLocal
 from app.models import ChargingStation, ChargingStationStatus, ChargingSession
 from pydantic import BaseModel
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
 
 from app.gateway.connection_manager import manager
 from ocpp.v16.enums import RemoteStartStopStatus
-from app.config import logger
+from app.config import settings, logger
+from app.services.last_seen_tracker import last_seen_tracker
+from app.services.station_cache import station_cache
+from app.services.token_cache import token_cache
+from app.services.dashboard_service import dashboard_service
+from app.services.fleet_state import fleet_state, naive_utc
+from app.services.live_feed import live_feed
+from app.services.ocpp_log_query import ocpp_log_query, OcppLogFilter, InvalidCursor
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
@@ -20,6 +28,7 @@ from app.schemas import (
     SessionLogItem, 
     OcppLogItem, 
     MeterReadingItem,
+    EnergyUsageItem,
     ActiveSessionRef
 )
 
@@ -32,65 +41,22 @@ def get_db():
 
 @router.get("/chargers", response_model=List[ChargerDashboardItem])
 def get_chargers(db: Session = Depends(get_db)):
-    chargers = db.query(ChargingStation).all()
-    result = []
-    
-    for c in chargers:
-        # Get Connectors
-        connectors_data = [
-            ConnectorStatus(connector_id=conn.connector_id, status=conn.status)
-            for conn in c.connectors
-        ]
-        
-        # Get Active Session (if any)
-        active_sess_model = (
-            db.query(ChargingSession)
-            .filter(ChargingSession.station_id == c.id, ChargingSession.end_time.is_(None))
-            .first()
-        )
-        
-        active_sess_data = None
-        if active_sess_model:
-            # Join with Token -> Renter to get name? 
-            renter_name = "Unknown"
-            if active_sess_model.renter_name_snapshot:
-                renter_name = active_sess_model.renter_name_snapshot
-            elif active_sess_model.token_rel and active_sess_model.token_rel.renter:
-                renter_name = active_sess_model.token_rel.renter.name
-            
-            # Calculate energy consumed so far
-            current_energy = 0
-            if active_sess_model.meter_readings:
-                # Naive: last reading - start. Real world is more complex.
-                last_reading = active_sess_model.meter_readings[-1]
-                try:
-                    current_energy = int(float(last_reading.value)) - active_sess_model.meter_start
-                except:
-                    pass
-
-            active_sess_data = ActiveSessionRef(
-                transaction_id=active_sess_model.transaction_id,
-                renter_name=renter_name,
-                energy_consumed=current_energy
-            )
-            
-        # Get Parking Spot Label
-        spot_label = c.parking_spot.label if c.parking_spot else None
-
-        result.append(ChargerDashboardItem(
-            id=c.id,
-            vendor=c.vendor,
-            model=c.model,
-            is_online=c.is_online,
-            last_seen=c.last_seen,
-            kiosk_mode=c.kiosk_mode or False,
-            parking_spot_label=spot_label,
-            parking_spot_id=c.parking_spot.id if c.parking_spot else None,
-            connectors=connectors_data,
-            active_session=active_sess_data
-        ))
-        
-    return result
+    if fleet_state.ready:
+        return fleet_state.dashboard_items()
+    return dashboard_service.get_chargers(db)
+
+@router.get("/chargers/stream")
+async def stream_chargers(request: Request):
+    """
+    Server-Sent Events feed of the charger overview: a `snapshot` event with
+    the same items as GET /chargers, then `deltas` events with coalesced
+    online, connector status, session and live energy changes.
+    """
+    return StreamingResponse(
+        live_feed.stream(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/system-info")
 def get_system_info():
@@ -108,12 +74,30 @@ def get_system_info():
     
     return {"ip_address": local_ip}
 
+@router.get("/metrics")
+def get_metrics():
+    from app.services.logging_service import logging_service
+    from app.services.background_tasks import background_tasks
+    from app.services.latency_histogram import response_latency
+    return {
+        "ocpp_log": logging_service.get_stats(),
+        "background_tasks": background_tasks.get_stats(),
+        "live_feed": live_feed.get_stats(),
+        "ocpp_response_latency": response_latency.snapshot()
+    }
+
 # --- Charger Details ---
 
 
 
 @router.get("/chargers/{charger_id}", response_model=ChargerDetail)
 def get_charger_detail(charger_id: str, db: Session = Depends(get_db)):
+    if fleet_state.ready:
+        detail = fleet_state.detail(charger_id)
+        if detail is None:
+            raise HTTPException(status_code=404, detail="Charger not found")
+        return detail
+
     c = db.query(ChargingStation).filter(ChargingStation.id == charger_id).first()
     if not c:
         raise HTTPException(status_code=404, detail="Charger not found")
@@ -151,8 +135,8 @@ def get_charger_detail(charger_id: str, db: Session = Depends(get_db)):
         firmware_version=c.firmware_version,
         is_online=c.is_online,
         kiosk_mode=c.kiosk_mode or False,
-        last_heartbeat=c.last_heartbeat,
-        last_seen=c.last_seen,
+        last_heartbeat=last_seen_tracker.get_last_heartbeat(c.id) or c.last_heartbeat,
+        last_seen=last_seen_tracker.get_last_seen(c.id) or c.last_seen,
         parking_spot_label=spot_label,
         connectors=connectors_data
     )
@@ -202,30 +186,49 @@ def get_charger_sessions(charger_id: str, db: Session = Depends(get_db)):
 
 
 
-@router.get("/chargers/{charger_id}/logs", response_model=List[OcppLogItem])
-def get_charger_logs(charger_id: str, date: Optional[str] = None, db: Session = Depends(get_db)):
-    # Import here to avoid circular dependencies if any, 
-    # though models are in same file usually.
-    from app.models import OcppMessageLog
-    
-    query = db.query(OcppMessageLog).filter(OcppMessageLog.station_id == charger_id)
-    
+def _log_filter(charger_id: str, date: Optional[str], since: Optional[datetime], until: Optional[datetime],
+                action: Optional[str], direction: Optional[str], message_type: Optional[str]) -> OcppLogFilter:
     if date:
         try:
-            target_date = datetime.strptime(date, "%Y-%m-%d").date()
-            start_datetime = datetime.combine(target_date, datetime.min.time())
-            end_datetime = datetime.combine(target_date, datetime.max.time())
-            query = query.filter(
-                OcppMessageLog.timestamp >= start_datetime,
-                OcppMessageLog.timestamp <= end_datetime
-            ).order_by(OcppMessageLog.timestamp.desc())
+            since, until = OcppLogFilter.day_range(date)
         except ValueError:
-            query = query.order_by(OcppMessageLog.timestamp.desc()).limit(100)
-    else:
-        query = query.order_by(OcppMessageLog.timestamp.desc()).limit(100)
-        
-    logs = query.all()
-    
+            # Unparseable dates have always meant "no date filter"
+            pass
+    return OcppLogFilter(
+        station_id=charger_id,
+        action=action,
+        direction=direction,
+        message_type=message_type,
+        since=naive_utc(since),
+        until=naive_utc(until),
+    )
+
+@router.get("/chargers/{charger_id}/logs", response_model=List[OcppLogItem])
+def get_charger_logs(
+    charger_id: str,
+    response: Response,
+    date: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    action: Optional[str] = None,
+    direction: Optional[str] = None,
+    message_type: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Newest first, one page at a time. When more rows match, the
+    X-Next-Cursor header carries the cursor for the next page.
+    """
+    filters = _log_filter(charger_id, date, since, until, action, direction, message_type)
+    try:
+        logs, next_cursor = ocpp_log_query.page(db, filters, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
     return [
         OcppLogItem(
             id=l.id,
@@ -238,6 +241,30 @@ def get_charger_logs(charger_id: str, date: Optional[str] = None, db: Session =
         for l in logs
     ]
 
+@router.get("/chargers/{charger_id}/logs/export")
+def export_charger_logs(
+    charger_id: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    date: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    action: Optional[str] = None,
+    direction: Optional[str] = None,
+    message_type: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """Every matching row, oldest first, streamed as NDJSON or CSV."""
+    filters = _log_filter(charger_id, date, since, until, action, direction, message_type)
+    if format == "csv":
+        body, media_type = ocpp_log_query.export_csv(db, filters), "text/csv"
+    else:
+        body, media_type = ocpp_log_query.export_ndjson(db, filters), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{charger_id}-ocpp-logs.{format}"'},
+    )
+
 @router.put("/chargers/{charger_id}", response_model=ChargerDetail)
 def update_charger(charger_id: str, charger: ChargerUpdate, db: Session = Depends(get_db)):
     db_charger = db.query(ChargingStation).filter(ChargingStation.id == charger_id).first()
@@ -253,6 +280,7 @@ def update_charger(charger_id: str, charger: ChargerUpdate, db: Session = Depend
         
     # Handle Parking Spot Linking
     # Note: ParkingSpot holds the FK charging_station_id
+    relinked_station_id = None
     if charger.parking_spot_id is not None:
         from app.models import ParkingSpot
         # 1. Clear any existing link for this charger on OTHER spots (since 1:1)
@@ -273,11 +301,16 @@ def update_charger(charger_id: str, charger: ChargerUpdate, db: Session = Depend
         if target_spot:
              # Ensure this spot doesn't already have another charger?
              # Or just overwrite. Overwriting is usually preferred in admin UI.
+             relinked_station_id = target_spot.charging_station_id
              target_spot.charging_station_id = charger_id
     
     # If we wanted to allow unlinking via this endpoint, we'd need a specific value logic since this is a PATCH-like update where None means missing.
     
     db.commit()
+    station_cache.invalidate(charger_id)
+    fleet_state.refresh_station(db, charger_id)
+    if relinked_station_id and relinked_station_id != charger_id:
+        fleet_state.refresh_station(db, relinked_station_id)
     db.refresh(db_charger)
     
     # Construct response manually or re-query to get relationships populated
@@ -295,8 +328,8 @@ def update_charger(charger_id: str, charger: ChargerUpdate, db: Session = Depend
         firmware_version=db_charger.firmware_version,
         is_online=db_charger.is_online,
         kiosk_mode=db_charger.kiosk_mode or False,
-        last_heartbeat=db_charger.last_heartbeat,
-        last_seen=db_charger.last_seen,
+        last_heartbeat=last_seen_tracker.get_last_heartbeat(db_charger.id) or db_charger.last_heartbeat,
+        last_seen=last_seen_tracker.get_last_seen(db_charger.id) or db_charger.last_seen,
         parking_spot_label=db_charger.parking_spot.label if db_charger.parking_spot else None,
         parking_spot_id=db_charger.parking_spot.id if db_charger.parking_spot else None,
         connectors=connectors_data
@@ -318,6 +351,9 @@ def delete_charger(charger_id: str, db: Session = Depends(get_db)):
         
     db.delete(db_charger)
     db.commit()
+    station_cache.invalidate(charger_id)
+    fleet_state.remove_station(charger_id)
+    last_seen_tracker.forget(charger_id)
     return {"message": "Charger deleted"}
 
 class RemoteStopRequest(BaseModel):
@@ -351,32 +387,61 @@ async def remote_stop_session(charger_id: str, req: RemoteStopRequest, db: Sessi
 
 
 @router.get("/sessions/{transaction_id}/readings", response_model=List[MeterReadingItem])
-def get_session_readings(transaction_id: int, db: Session = Depends(get_db)):
-    from app.models import MeterReading
-    
-    readings = (
-        db.query(MeterReading)
-        .filter(MeterReading.transaction_id == transaction_id)
-        .order_by(MeterReading.timestamp.asc())
-        .all()
-    )
-    
-    clean_readings = []
-    for r in readings:
-        try:
-            val = float(r.value)
-            clean_readings.append(MeterReadingItem(
-                timestamp=r.timestamp,
-                value=val,
-                unit=r.unit,
-                measurand=r.measurand,
-                phase=r.phase,
-                context=r.context
-            ))
-        except:
-            pass
-            
-    return clean_readings
+def get_session_readings(
+    transaction_id: int,
+    max_points: int = Query(settings.READINGS_MAX_POINTS, ge=4, le=100000),
+    measurand: Optional[str] = None,
+    phase: Optional[str] = None,
+    full: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    Readings of a session in time order, at most max_points per series:
+    longer series are reduced to the minimum and maximum of each stretch,
+    so peaks survive. full=true returns every stored reading instead.
+    """
+    from app.services.meter_store import meter_store
+
+    readings = []
+    for series in meter_store.series(db, transaction_id):
+        if (measurand and series.measurand != measurand) or (phase and series.phase != phase):
+            continue
+        if not full:
+            series = series.downsampled(max_points)
+        readings.extend(
+            {
+                "timestamp": timestamp, "value": value, "unit": series.unit,
+                "measurand": series.measurand, "phase": series.phase, "context": series.context,
+            }
+            for timestamp, value in zip(series.timestamps(), series.values)
+        )
+    readings.sort(key=lambda reading: reading["timestamp"])
+    return readings
+
+# Energy reports
+
+@router.get("/reports/energy", response_model=List[EnergyUsageItem])
+def get_energy_report(
+    start: date,
+    end: date,
+    group_by: str = "total",
+    station_id: Optional[str] = None,
+    renter_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Energy and session counts for sessions started between start and end
+    (inclusive, UTC days), from the daily rollups. group_by is total, day,
+    station or renter; filter by station_id or renter_id, not both.
+    """
+    from app.services.energy_rollups import energy_rollups
+
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    try:
+        return energy_rollups.usage(db, start, end, group_by, station_id=station_id, renter_id=renter_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 # --- User Management Endpoints ---
@@ -479,6 +544,9 @@ def update_renter(renter_id: int, renter: RenterUpdate, db: Session = Depends(ge
         db_renter.is_active = renter.is_active
 
     db.commit()
+    if renter.name is not None:
+        # Sessions without a renter name snapshot show the current name
+        fleet_state.refresh_sessions(db)
     db.refresh(db_renter)
     return db_renter
 
@@ -494,8 +562,10 @@ def delete_renter(renter_id: int, db: Session = Depends(get_db)):
         spot.renter_id = None
         
     # 2. Unlink Auth Tokens
+    unlinked_tokens = []
     for token in db_renter.authorization_tokens:
         token.renter_id = None
+        unlinked_tokens.append(token.token)
 
     try:
         db.delete(db_renter)
@@ -504,6 +574,10 @@ def delete_renter(renter_id: int, db: Session = Depends(get_db)):
         db.rollback()
         # Log error in real app
         raise HTTPException(status_code=400, detail="Cannot delete renter due to dependencies or DB error")
+
+    for token in unlinked_tokens:
+        token_cache.invalidate(token)
+    fleet_state.refresh_sessions(db)
         
     return {"message": "Renter deleted"}
 
@@ -531,6 +605,8 @@ def create_parking_spot(spot: ParkingSpotCreate, db: Session = Depends(get_db)):
     )
     db.add(new_spot)
     db.commit()
+    if new_spot.charging_station_id:
+        fleet_state.refresh_station(db, new_spot.charging_station_id)
     db.refresh(new_spot)
     return new_spot
 
@@ -540,6 +616,7 @@ def update_parking_spot(spot_id: int, spot: ParkingSpotUpdate, db: Session = Dep
     if not db_spot:
         raise HTTPException(status_code=404, detail="Parking spot not found")
 
+    previous_station_id = db_spot.charging_station_id
     if spot.label is not None:
         db_spot.label = spot.label
     if spot.floor_level is not None:
@@ -566,6 +643,8 @@ def update_parking_spot(spot_id: int, spot: ParkingSpotUpdate, db: Session = Dep
     # We will stick to simple updates for now.
 
     db.commit()
+    for station_id in {previous_station_id, db_spot.charging_station_id} - {None}:
+        fleet_state.refresh_station(db, station_id)
     db.refresh(db_spot)
     return db_spot
 
@@ -575,12 +654,15 @@ def delete_parking_spot(spot_id: int, db: Session = Depends(get_db)):
     if not db_spot:
         raise HTTPException(status_code=404, detail="Parking spot not found")
 
+    station_id = db_spot.charging_station_id
     try:
         db.delete(db_spot)
         db.commit()
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail="Cannot delete parking spot due to DB reference or constraint.")
+    if station_id:
+        fleet_state.refresh_station(db, station_id)
 
     return {"message": "Parking spot deleted"}
 
@@ -614,6 +696,7 @@ def create_auth_token(token_data: AuthorizationTokenCreate, db: Session = Depend
     )
     db.add(new_token)
     db.commit()
+    token_cache.invalidate(token_data.token)
     db.refresh(new_token)
     return new_token
 
@@ -646,6 +729,10 @@ def update_auth_token(token: str, token_data: AuthorizationTokenUpdate, db: Sess
         db_token.expiry_date = token_data.expiry_date
 
     db.commit()
+    # Takes effect on the next Authorize, e.g. blocking a tag
+    token_cache.invalidate(token)
+    if token_data.renter_id is not None:
+        fleet_state.refresh_sessions(db)
     db.refresh(db_token)
     return db_token
 
@@ -665,5 +752,7 @@ def delete_auth_token(token: str, db: Session = Depends(get_db)):
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail="Cannot delete token")
+    token_cache.invalidate(token)
+    fleet_state.refresh_sessions(db)
         
     return {"message": "Token deleted"}
@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import date, datetime
 from pydantic import BaseModel
 from typing import List, Optional
+import asyncio
 import os
 
-from app.database import SessionLocal
+from app.config import logger
+from app.database import SessionLocal, run_db
 from app.models import BillingSettings, Invoice, Renter, BillingPeriodicity, BillingMode, ChargingSession, PrepaidTransaction, PrepaidTransactionType
-from app.services.billing_service import get_billing_settings, calculate_and_generate_invoice
-from fastapi.responses import FileResponse
+from app.services.billing_service import get_billing_settings
+from app.services.invoice_files import invoice_files, media_type, not_modified, validators
+from app.services.invoice_jobs import invoice_jobs
+from app.services.billing_settings_cache import billing_settings_cache
+from app.services.prepaid_engine import prepaid_engine
+from fastapi.responses import FileResponse, StreamingResponse
 
 def get_db():
     db = SessionLocal()
@@ -71,6 +77,23 @@ class GenerateInvoiceRequest(BaseModel):
     renter_id: int
     end_date: datetime
 
+class GenerateAllInvoicesRequest(BaseModel):
+    end_date: datetime
+
+class InvoiceJobSchema(BaseModel):
+    id: str
+    status: str # queued, invoicing, rendering, done or failed
+    renter_id: Optional[int] # None for every active renter
+    end_date: datetime
+    invoice_id: Optional[int] # The first (for a single renter: the) invoice created
+    invoice_ids: List[int]
+    invoices_created: int
+    invoices_rendered: int
+    error: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
 
 @router.get("/settings", response_model=BillingSettingsSchema)
 def api_get_billing_settings(db: Session = Depends(get_db)):
@@ -95,6 +118,8 @@ def api_update_billing_settings(settings_data: BillingSettingsSchema, db: Sessio
     settings.billing_mode = settings_data.billing_mode
     db.commit()
     db.refresh(settings)
+    # Hot paths read the in-memory snapshot, swap it only once the row is committed
+    billing_settings_cache.publish(settings)
     return settings
 
 # --- Prepaid Endpoints ---
@@ -136,6 +161,7 @@ def top_up_renter_prepaid(renter_id: int, req: TopUpRequest, db: Session = Depen
     )
     db.add(new_tx)
     db.commit()
+    prepaid_engine.set_balance(renter.id, renter.prepaid_balance_kwh)
     
     return {"message": "Top-up successful", "new_balance_kwh": renter.prepaid_balance_kwh}
 
@@ -170,22 +196,50 @@ def list_invoices(db: Session = Depends(get_db)):
         ))
     return result
 
-@router.post("/invoices/generate")
-def generate_manual_invoice(req: GenerateInvoiceRequest, db: Session = Depends(get_db)):
-    print(f"API received req.renter_id: {req.renter_id}, type {type(req.renter_id)}")
-    print(f"API using db session id: {id(db)}")
-    renter = db.query(Renter).filter(Renter.id == req.renter_id).first()
-    print(f"API found renter: {renter}")
-    if not renter:
+def _job_out(job) -> "InvoiceJobSchema":
+    return InvoiceJobSchema(
+        id=job.id,
+        status=job.status,
+        renter_id=job.renter_id,
+        end_date=job.period_end,
+        invoice_id=job.invoice_ids[0] if job.invoice_ids else None,
+        invoice_ids=job.invoice_ids,
+        invoices_created=len(job.invoice_ids),
+        invoices_rendered=job.rendered,
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+    )
+
+def _check_billable(db: Session, renter_id: Optional[int]):
+    if renter_id is not None and not db.query(Renter.id).filter(Renter.id == renter_id).first():
         raise HTTPException(status_code=404, detail="Renter not found")
-    
-    try:
-        invoice = calculate_and_generate_invoice(db, renter, req.end_date)
-        if not invoice:
-            return {"message": "No unbilled sessions found for this renter in the given period.", "invoice_id": None}
-        return {"message": "Invoice generated successfully", "invoice_id": invoice.id}
-    except ValueError as e:
-         raise HTTPException(status_code=400, detail=str(e))
+    if billing_settings_cache.get(db) is None:
+        raise HTTPException(status_code=400, detail="Billing settings not configured")
+
+@router.post("/invoices/generate", response_model=InvoiceJobSchema, status_code=202)
+async def generate_manual_invoice(req: GenerateInvoiceRequest, db: Session = Depends(get_db)):
+    """Queue an invoice for one renter; poll GET /jobs/{id} for the result."""
+    await run_db(_check_billable, db, req.renter_id)
+    return _job_out(invoice_jobs.submit(req.end_date, req.renter_id))
+
+@router.post("/invoices/generate-all", response_model=InvoiceJobSchema, status_code=202)
+async def generate_all_invoices(req: GenerateAllInvoicesRequest, db: Session = Depends(get_db)):
+    """Queue invoices for every active renter, as the automatic billing run does."""
+    await run_db(_check_billable, db, None)
+    return _job_out(invoice_jobs.submit(req.end_date))
+
+@router.get("/jobs", response_model=List[InvoiceJobSchema])
+def list_invoice_jobs():
+    return [_job_out(job) for job in invoice_jobs.jobs()]
+
+@router.get("/jobs/{job_id}", response_model=InvoiceJobSchema)
+def get_invoice_job(job_id: str):
+    job = invoice_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_out(job)
 
 @router.get("/invoices/{invoice_id}/details", response_model=InvoiceDetailsSchema)
 def get_invoice_details(invoice_id: int, db: Session = Depends(get_db)):
@@ -240,21 +294,43 @@ def mark_invoice_paid(invoice_id: int, db: Session = Depends(get_db)):
     db.commit()
     return {"message": f"Invoice marked as {'paid' if invoice.is_paid else 'unpaid'}", "is_paid": invoice.is_paid}
 
+@router.get("/invoices/export")
+async def export_invoices(start: date, end: date, db: Session = Depends(get_db)):
+    """The files of every invoice whose period ends in [start, end], as a ZIP streamed while it is built."""
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    invoice_ids = await invoice_files.invoice_ids(start, end, db)
+    return StreamingResponse(
+        invoice_files.archive(invoice_ids, db),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="invoices_{start}_{end}.zip"'},
+    )
+
 @router.get("/invoices/{invoice_id}/pdf")
-def get_invoice_pdf(invoice_id: int, db: Session = Depends(get_db)):
-    invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
-    if not invoice:
+async def get_invoice_pdf(invoice_id: int, request: Request, db: Session = Depends(get_db)):
+    """
+    The invoice PDF, rendered again if the file is gone. Carries a strong
+    ETag and Last-Modified: conditional requests get 304, Range requests
+    (with If-Range) get the requested bytes.
+    """
+    try:
+        file_path = await invoice_files.ensure(invoice_id, db)
+    except Exception as e:
+        logger.error(f"Failed to regenerate the file of invoice {invoice_id}: {e}")
+        raise HTTPException(status_code=500, detail="Invoice file could not be generated")
+    if file_path is None:
         raise HTTPException(status_code=404, detail="Invoice not found")
-    
-    if not invoice.file_path or not os.path.exists(invoice.file_path):
-        raise HTTPException(status_code=404, detail="PDF not found on disk")
-    
-    # Check if the path ends with .pdf, if not send the svg
-    media_type = "application/pdf" if invoice.file_path.endswith(".pdf") else "image/svg+xml"
-    filename = os.path.basename(invoice.file_path)
+
+    stat = await asyncio.to_thread(os.stat, file_path)
+    etag = await asyncio.to_thread(invoice_files.etag, file_path, stat)
+    headers = validators(etag, stat)
+    if not_modified(request.headers, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
 
     return FileResponse(
-        path=invoice.file_path,
-        media_type=media_type,
-        filename=filename
+        path=file_path,
+        media_type=media_type(file_path),
+        filename=os.path.basename(file_path),
+        headers=headers,
+        stat_result=stat,
     )
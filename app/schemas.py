@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from typing import List, Optional, Any, Dict
-from datetime import datetime
+from datetime import date, datetime
 from app.models import ChargingStationStatus
 
 # --- Auth Schemas ---
@@ -83,8 +83,17 @@ class MeterReadingItem(BaseModel):
     value: float
     unit: str | None
     measurand: str | None
+    phase: str | None = None
     context: str | None
 
+class EnergyUsageItem(BaseModel):
+    energy_kwh: float
+    session_count: int
+    day: date | None = None
+    station_id: str | None = None
+    renter_id: int | None = None
+    renter_name: str | None = None
+
 
 # --- User Management Schemas ---
 
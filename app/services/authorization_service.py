@@ -1,12 +1,17 @@
 from datetime import datetime, timezone
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
-from app.models import AuthorizationToken, AuthorizationStatus, ChargingStation
+from app.database import SessionLocal, run_db
+from app.models import AuthorizationToken, AuthorizationStatus
 from app.config import logger
+from app.services.station_cache import station_cache
+from app.services.token_cache import token_cache, TokenInfo
 
 class AuthorizationService:
     
     async def authorize(self, id_tag: str, charger_id: str = None, **kwargs):
+        return await run_db(self._authorize, id_tag, charger_id)
+
+    def _authorize(self, id_tag: str, charger_id: str = None):
         """
         Check if the token exists and is active.
         """
@@ -14,8 +19,8 @@ class AuthorizationService:
         try:
             # Check Kiosk Mode
             if charger_id:
-                station = db.query(ChargingStation).filter(ChargingStation.id == charger_id).first()
-                if station and getattr(station, "kiosk_mode", False):
+                station = station_cache.get(charger_id, db)
+                if station and station.kiosk_mode:
                     logger.info(f"Kiosk mode is enabled for station {charger_id}. Approving {id_tag} automatically.")
                     return {
                         "id_tag_info": {
@@ -25,17 +30,19 @@ class AuthorizationService:
                         }
                     }
 
-            token = db.query(AuthorizationToken).filter(AuthorizationToken.token == id_tag).first()
-            
+            hit, token = token_cache.lookup(id_tag)
+            if not hit:
+                generation = token_cache.generation
+                db_token = db.query(AuthorizationToken).filter(AuthorizationToken.token == id_tag).first()
+                token = TokenInfo.from_model(db_token) if db_token else None
+                token_cache.store(id_tag, token, generation)
+
+                if not token:
+                    logger.warning(f"Unknown token: {id_tag}. Saving as Unknown.")
+                    # Persisted in batches by the token cache flusher
+                    token_cache.record_unknown(id_tag)
+
             if not token:
-                logger.warning(f"Unknown token: {id_tag}. Saving as Unknown.")
-                new_token = AuthorizationToken(
-                    token=id_tag,
-                    status=AuthorizationStatus.Unknown,
-                    description="Auto-created unknown token"
-                )
-                db.add(new_token)
-                db.commit()
                 return {"id_tag_info": {"status": "Invalid"}}
             
             if token.status != AuthorizationStatus.Accepted:
@@ -0,0 +1,54 @@
+import asyncio
+from typing import Coroutine, Set
+from app.config import logger
+
+class BackgroundTaskSupervisor:
+    """
+    Runs side effects that must not delay an OCPP response (logging,
+    last_seen, MeterValues persistence) as tracked asyncio tasks.
+
+    Tasks are strongly referenced until they finish, failures are logged
+    and counted instead of vanishing with the task, and shutdown waits for
+    the outstanding work to drain.
+    """
+
+    def __init__(self):
+        self._tasks: Set[asyncio.Task] = set()
+        self._spawned = 0
+        self._failed = 0
+
+    def spawn(self, coro: Coroutine, name: str = None) -> asyncio.Task:
+        task = asyncio.create_task(coro, name=name)
+        self._tasks.add(task)
+        self._spawned += 1
+        task.add_done_callback(self._on_done)
+        return task
+
+    def _on_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None:
+            self._failed += 1
+            logger.error(f"Background task {task.get_name()} failed: {exc!r}")
+
+    async def drain(self, timeout: float = 10.0):
+        """Wait for outstanding tasks; cancel whatever is still running after the timeout."""
+        if not self._tasks:
+            return
+        pending = set(self._tasks)
+        done, still_running = await asyncio.wait(pending, timeout=timeout)
+        for task in still_running:
+            task.cancel()
+        if still_running:
+            logger.warning(f"BackgroundTaskSupervisor: Cancelled {len(still_running)} tasks still running at shutdown.")
+
+    def get_stats(self) -> dict:
+        return {
+            "running": len(self._tasks),
+            "spawned": self._spawned,
+            "failed": self._failed,
+        }
+
+background_tasks = BackgroundTaskSupervisor()
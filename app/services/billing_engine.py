@@ -0,0 +1,126 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+from app.config import settings as app_settings, logger
+from app.models import AuthorizationToken, ChargingSession, Invoice, Renter
+
+@dataclass
+class RenterBill:
+    renter_id: int
+    total_kwh: float
+    period_start: datetime
+    session_ids: Tuple[int, ...]
+
+class BillingError(Exception):
+    pass
+
+class BillingEngine:
+    """
+    Bills many renters at once, set-based.
+
+    One grouped query finds every renter's unbilled energy, earliest session
+    and session ids. Invoices are then inserted in bulk and their sessions
+    linked with one UPDATE per batch, each batch in its own transaction.
+    PDFs are not rendered here: the money part of a run stays a handful of
+    statements however many renters there are, and rendering follows as a
+    separate stage (see BillingRun).
+    """
+
+    def __init__(self, batch_size: int = app_settings.BILLING_BATCH_RENTERS):
+        self.batch_size = batch_size
+
+    @staticmethod
+    def _session_ids(db: Session):
+        if db.bind.dialect.name == "postgresql":
+            return func.array_agg(ChargingSession.id)
+        return func.group_concat(ChargingSession.id)
+
+    def unbilled(self, db: Session, period_end: datetime, renter_ids: Optional[Iterable[int]] = None) -> List[RenterBill]:
+        """
+        Unbilled sessions with energy that started up to period_end, per renter
+        (by the session's token). Without renter_ids: every active renter.
+        """
+        query = (
+            select(
+                AuthorizationToken.renter_id,
+                func.sum(ChargingSession.total_energy_kwh),
+                func.min(ChargingSession.start_time),
+                self._session_ids(db),
+            )
+            .join(AuthorizationToken, AuthorizationToken.token == ChargingSession.token_id)
+            .where(
+                ChargingSession.invoice_id.is_(None),
+                ChargingSession.start_time <= period_end,
+                ChargingSession.total_energy_kwh > 0,
+            )
+            .group_by(AuthorizationToken.renter_id)
+            .order_by(AuthorizationToken.renter_id)
+        )
+        if renter_ids is None:
+            query = query.join(Renter, Renter.id == AuthorizationToken.renter_id).where(Renter.is_active == True)
+        else:
+            query = query.where(AuthorizationToken.renter_id.in_(list(renter_ids)))
+
+        bills = []
+        for renter_id, total_kwh, period_start, session_ids in db.execute(query):
+            if isinstance(session_ids, str): # SQLite's group_concat
+                session_ids = [int(i) for i in session_ids.split(",")]
+            bills.append(RenterBill(renter_id, total_kwh, period_start, tuple(session_ids)))
+        return bills
+
+    def _invoice_batch(self, db: Session, bills: List[RenterBill], period_end: datetime, price_per_kwh: float) -> List[int]:
+        rows = [
+            {
+                "renter_id": bill.renter_id, "period_start": bill.period_start, "period_end": period_end,
+                "amount_due": bill.total_kwh * price_per_kwh, "is_paid": False,
+            }
+            for bill in bills if bill.total_kwh * price_per_kwh > 0
+        ]
+        if not rows:
+            return []
+        invoice_ids = list(db.scalars(insert(Invoice).returning(Invoice.id, sort_by_parameter_order=True), rows))
+
+        session_ids = [session_id for bill in bills for session_id in bill.session_ids]
+        linked = db.execute(
+            update(ChargingSession)
+            .values(invoice_id=Invoice.id)
+            .where(
+                ChargingSession.id.in_(session_ids),
+                ChargingSession.invoice_id.is_(None),
+                AuthorizationToken.token == ChargingSession.token_id,
+                Invoice.renter_id == AuthorizationToken.renter_id,
+                Invoice.id.in_(invoice_ids),
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if linked != len(session_ids):
+            # A session was billed, or its token reassigned, since unbilled() read it
+            db.rollback()
+            raise BillingError(f"Linked {linked} of {len(session_ids)} sessions; batch rolled back")
+        db.commit()
+        return invoice_ids
+
+    def bill(self, db: Session, period_end: datetime, settings, renter_ids: Optional[Iterable[int]] = None) -> List[int]:
+        """
+        Create the invoices for everything unbilled up to period_end and link
+        the sessions; returns the new invoice ids. In a run over all renters a
+        batch that fails is rolled back on its own and the next one goes ahead.
+        """
+        if not settings:
+            raise ValueError("Billing settings not configured")
+        bills = [bill for bill in self.unbilled(db, period_end, renter_ids) if bill.total_kwh]
+
+        invoice_ids = []
+        for offset in range(0, len(bills), self.batch_size):
+            batch = bills[offset:offset + self.batch_size]
+            try:
+                invoice_ids.extend(self._invoice_batch(db, batch, period_end, settings.price_per_kwh))
+            except BillingError as e:
+                if renter_ids is not None:
+                    raise
+                logger.error(f"Billing batch of renters {batch[0].renter_id}..{batch[-1].renter_id} failed: {e}")
+        return invoice_ids
+
+billing_engine = BillingEngine()
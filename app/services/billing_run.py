@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional
+from sqlalchemy.orm import Session
+from app.config import logger
+from app.database import run_db, session_scope
+from app.services.billing_engine import billing_engine
+from app.services.billing_service import InvoiceDocument, invoice_documents, store_invoice_file
+from app.services.invoice_renderer import InvoiceRenderer, invoice_renderer
+
+class BillingRun:
+    """
+    A billing run, in two stages.
+
+    First the billing engine invoices the renters set-based on the DB thread
+    pool; that settles the money side in a few statements. Then each new
+    invoice's PDF is rendered by the invoice renderer processes and its path
+    stored. At most `concurrency` renders are in flight, enough to keep
+    every worker busy. Nothing blocking runs on the event loop.
+    """
+
+    def __init__(self, renderer: InvoiceRenderer = invoice_renderer, concurrency: Optional[int] = None):
+        self.renderer = renderer
+        # Enough to load and store the next invoices while every worker renders
+        self.concurrency = concurrency or max(1, renderer.workers * 2)
+
+    @staticmethod
+    def _invoice(period_end: datetime, settings, renter_ids: Optional[List[int]] = None, db: Session = None) -> List[int]:
+        with session_scope(db) as db:
+            return billing_engine.bill(db, period_end, settings, renter_ids)
+
+    async def _render(self, document: InvoiceDocument, db: Session = None) -> bool:
+        try:
+            file_path = await self.renderer.render(document)
+            await run_db(store_invoice_file, document.invoice_id, file_path, db)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to render invoice {document.invoice_id} for renter {document.renter_name}: {e}")
+            return False
+
+    async def render(
+        self, invoice_ids: List[int], settings, db: Session = None,
+        on_rendered: Optional[Callable[[int], None]] = None,
+    ) -> int:
+        """Render and store the PDFs of the given invoices; returns how many succeeded."""
+        documents = await run_db(invoice_documents, invoice_ids, settings, db)
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def render(document: InvoiceDocument) -> bool:
+            async with slots:
+                rendered = await self._render(document, db)
+            if rendered and on_rendered:
+                on_rendered(document.invoice_id)
+            return rendered
+
+        return sum(await asyncio.gather(*(render(document) for document in documents)))
+
+    async def run(
+        self, period_end: datetime, settings, renter_ids: Optional[Iterable[int]] = None, db: Session = None,
+        on_invoiced: Optional[Callable[[List[int]], None]] = None,
+        on_rendered: Optional[Callable[[int], None]] = None,
+    ) -> List[int]:
+        """
+        Invoice the given renters (every active one by default) up to
+        period_end, then render the PDFs; returns the new invoice ids.
+        """
+        renter_ids = list(renter_ids) if renter_ids is not None else None
+        invoice_ids = await run_db(self._invoice, period_end, settings, renter_ids, db)
+        logger.info(f"Billing run created {len(invoice_ids)} invoices up to {period_end:%Y-%m-%d}")
+        if on_invoiced:
+            on_invoiced(invoice_ids)
+        if invoice_ids:
+            rendered = await self.render(invoice_ids, settings, db, on_rendered)
+            logger.info(f"Billing run rendered {rendered} of {len(invoice_ids)} invoice PDFs")
+        return invoice_ids
+
+billing_run = BillingRun()
@@ -1,10 +1,17 @@
 import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from io import BytesIO, StringIO
 from datetime import datetime, date
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session, joinedload, selectinload
 
-from app.models import BillingSettings, Invoice, ChargingSession, Renter, BillingPeriodicity
+from app.config import logger
+from app.database import session_scope
+from app.models import BillingSettings, Invoice, Renter, BillingPeriodicity
+from app.services.billing_settings_cache import billing_settings_cache
+from app.services.billing_engine import billing_engine
 from qrbill.bill import QRBill
 
 INVOICES_DIR = os.getenv("INVOICES_DIR", "/data/invoices")
@@ -13,173 +20,231 @@ def ensure_invoices_dir():
     if not os.path.exists(INVOICES_DIR):
         os.makedirs(INVOICES_DIR, exist_ok=True)
 
+@dataclass(frozen=True)
+class InvoiceDocument:
+    """
+    What goes on an invoice PDF, as plain values: no ORM objects, so it can
+    be rendered in a worker process without a DB session.
+    """
+    invoice_id: int
+    renter_name: str
+    period_start: datetime
+    period_end: datetime
+    amount_due: float
+    sessions: Tuple[Tuple[datetime, Optional[datetime], float], ...] # start, end, kWh
+    company_name: str
+    iban: str
+    address: str
+    price_per_kwh: float
+
+    @classmethod
+    def from_invoice(cls, invoice: Invoice, settings) -> "InvoiceDocument":
+        return cls(
+            invoice_id=invoice.id,
+            renter_name=invoice.renter.name,
+            period_start=invoice.period_start,
+            period_end=invoice.period_end,
+            amount_due=invoice.amount_due,
+            sessions=tuple((s.start_time, s.end_time, s.total_energy_kwh or 0) for s in invoice.sessions),
+            company_name=settings.company_name,
+            iban=settings.iban,
+            address=settings.address,
+            price_per_kwh=settings.price_per_kwh,
+        )
+
 def generate_invoice_pdf(invoice: Invoice, settings: BillingSettings) -> str:
     """Generate a Swiss QR Bill PDF for the invoice and return the file path."""
-    ensure_invoices_dir()
-    
-    # Construct filename
-    filename = f"invoice_{invoice.id}_{invoice.renter.name.replace(' ', '_')}_{invoice.period_start.strftime('%Y%m')}.svg"
-    filepath = os.path.join(INVOICES_DIR, filename)
-    pdf_filepath = filepath.replace(".svg", ".pdf")
+    return render_invoice_pdf(InvoiceDocument.from_invoice(invoice, settings))
 
-    # Simple invoice details (In a real scenario, you'd use a templating engine like Jinja + Weasyprint for the full page, 
-    # but here we generate the QR bill part)
-    
+# Modules of the QR code as qrcode's SvgPathImage draws them: one unit square each
+_QR_MODULE = re.compile(r"M(\d+),(\d+)H\d+V\d+H\d+z")
+_QR_PATH_DATA = re.compile(r' d="((?:M\d+,\d+H\d+V\d+H\d+z)+)"')
+
+def _merge_qr_modules(path_data: str) -> str:
+    """The same QR code path with each horizontal run of modules as one rectangle."""
+    rows = {}
+    for x, y in _QR_MODULE.findall(path_data):
+        rows.setdefault(int(y), []).append(int(x))
+    runs = []
+    for y in sorted(rows):
+        xs = sorted(rows[y])
+        start = previous = xs[0]
+        for x in xs[1:] + [None]:
+            if x != previous + 1:
+                runs.append(f"M{start},{y}H{previous + 1}V{y + 1}H{start}z")
+                start = x
+            previous = x
+    return "".join(runs)
+
+def qr_bill_svg(invoice: InvoiceDocument) -> str:
+    """The QR bill (payment part and receipt) of an invoice as SVG text."""
     qr_bill = QRBill(
-        account=settings.iban,
+        account=invoice.iban,
         creditor={
-            "name": settings.company_name,
-            "line1": settings.address.split(',')[0] if ',' in settings.address else settings.address,
-            "line2": settings.address.split(',')[1].strip() if ',' in settings.address else "Switzerland",
+            "name": invoice.company_name,
+            "line1": invoice.address.split(',')[0] if ',' in invoice.address else invoice.address,
+            "line2": invoice.address.split(',')[1].strip() if ',' in invoice.address else "Switzerland",
             "country": "CH"
         },
         debtor={
-            "name": invoice.renter.name,
+            "name": invoice.renter_name,
             "line1": "Underground Parking",
             "line2": "Switzerland",
             "country": "CH"
         },
         amount=str(round(invoice.amount_due, 2)),
         currency="CHF",
-        additional_information=f"Invoice {invoice.id} for charging sessions",
+        additional_information=f"Invoice {invoice.invoice_id} for charging sessions",
     )
+    svg = StringIO()
+    qr_bill.as_svg(svg)
+    # Drawn as one square per module, the code makes up most of the parsing and
+    # PDF drawing work; runs cover exactly the same area
+    return _QR_PATH_DATA.sub(lambda m: f' d="{_merge_qr_modules(m.group(1))}"', svg.getvalue(), count=1)
+
+@lru_cache(maxsize=1)
+def _page_template():
+    """
+    Layout objects shared by every invoice a process renders. Imported and
+    built on first use, so only processes that render pay for ReportLab.
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.platypus import TableStyle
+
+    table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#f3f4f6")),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('ALIGN', (2, 0), (3, -1), 'RIGHT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('GRID', (0, 0), (-1, -2), 0.5, colors.HexColor("#e5e7eb")),
+        ('FONTNAME', (2, -1), (3, -1), 'Helvetica-Bold'),
+        ('LINEABOVE', (2, -1), (3, -1), 1, colors.black),
+    ])
+    return {
+        "page_size": A4,
+        "mm": mm,
+        "table_style": table_style,
+        "col_widths": [45*mm, 45*mm, 35*mm, 35*mm],
+        "table_header": ["Start Time", "End Time", "Energy (kWh)", "Cost (CHF)"],
+    }
+
+def render_invoice_pdf(invoice: InvoiceDocument) -> str:
+    """Render the PDF of an invoice document and return the file path. Pure CPU and file work."""
+    ensure_invoices_dir()
     
-    # Generate SVG
-    qr_bill.as_svg(filepath)
+    # Construct filename
+    filename = f"invoice_{invoice.invoice_id}_{invoice.renter_name.replace(' ', '_')}_{invoice.period_start.strftime('%Y%m')}.pdf"
+    pdf_filepath = os.path.join(INVOICES_DIR, filename)
+
+    # Simple invoice details (In a real scenario, you'd use a templating engine like Jinja + Weasyprint for the full page, 
+    # but here we generate the QR bill part)
+    svg = qr_bill_svg(invoice)
     
-    # Convert SVG to PDF using svglib and reportlab
+    # Draw the page and the QR bill with svglib and reportlab, all in memory
     try:
         from svglib.svglib import svg2rlg
         from reportlab.graphics import renderPDF
         from reportlab.pdfgen import canvas
-        from reportlab.lib.pagesizes import A4
-        from reportlab.lib.units import mm
-        from reportlab.platypus import Table, TableStyle
-        from reportlab.lib import colors
-        
-        width, height = A4
-        c = canvas.Canvas(pdf_filepath, pagesize=A4)
+        from reportlab.platypus import Table
+
+        template = _page_template()
+        mm = template["mm"]
+        width, height = template["page_size"]
+        pdf = BytesIO()
+        c = canvas.Canvas(pdf, pagesize=template["page_size"])
         
         # Draw header / Title
         c.setFont("Helvetica-Bold", 16)
         c.drawString(20*mm, height - 20*mm, "Invoice")
         
         c.setFont("Helvetica", 10)
-        c.drawString(20*mm, height - 30*mm, f"Invoice #: {invoice.id}")
+        c.drawString(20*mm, height - 30*mm, f"Invoice #: {invoice.invoice_id}")
         c.drawString(20*mm, height - 35*mm, f"Period: {invoice.period_start.strftime('%d.%m.%Y')} to {invoice.period_end.strftime('%d.%m.%Y')}")
         
         # Company Info
         c.setFont("Helvetica-Bold", 10)
-        c.drawString(120*mm, height - 20*mm, settings.company_name)
+        c.drawString(120*mm, height - 20*mm, invoice.company_name)
         c.setFont("Helvetica", 10)
-        c.drawString(120*mm, height - 25*mm, settings.address)
-        if settings.iban:
-            c.drawString(120*mm, height - 30*mm, f"IBAN: {settings.iban}")
+        c.drawString(120*mm, height - 25*mm, invoice.address)
+        if invoice.iban:
+            c.drawString(120*mm, height - 30*mm, f"IBAN: {invoice.iban}")
         
         # Debtor Info
         c.setFont("Helvetica-Bold", 10)
         c.drawString(20*mm, height - 50*mm, "Bill To:")
         c.setFont("Helvetica", 10)
-        c.drawString(20*mm, height - 55*mm, invoice.renter.name)
+        c.drawString(20*mm, height - 55*mm, invoice.renter_name)
         
         # Draw Sessions Table
         c.setFont("Helvetica-Bold", 12)
         c.drawString(20*mm, height - 75*mm, "Charging Sessions")
         
-        data = [["Start Time", "End Time", "Energy (kWh)", "Cost (CHF)"]]
-        for session in invoice.sessions:
-            start_str = session.start_time.strftime('%d.%m.%Y %H:%M')
-            end_str = session.end_time.strftime('%d.%m.%Y %H:%M') if session.end_time else "N/A"
-            kwh = round(session.total_energy_kwh or 0, 2)
-            cost = round(kwh * settings.price_per_kwh, 2)
+        data = [template["table_header"]]
+        for start_time, end_time, total_kwh in invoice.sessions:
+            start_str = start_time.strftime('%d.%m.%Y %H:%M')
+            end_str = end_time.strftime('%d.%m.%Y %H:%M') if end_time else "N/A"
+            kwh = round(total_kwh, 2)
+            cost = round(kwh * invoice.price_per_kwh, 2)
             data.append([start_str, end_str, f"{kwh:.2f}", f"{cost:.2f}"])
             
         # Total row
         data.append(["", "", "Total Amount Due:", f"{round(invoice.amount_due, 2):.2f} CHF"])
         
         # Create table
-        table = Table(data, colWidths=[45*mm, 45*mm, 35*mm, 35*mm])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#f3f4f6")),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('ALIGN', (2, 0), (3, -1), 'RIGHT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-            ('GRID', (0, 0), (-1, -2), 0.5, colors.HexColor("#e5e7eb")),
-            ('FONTNAME', (2, -1), (3, -1), 'Helvetica-Bold'),
-            ('LINEABOVE', (2, -1), (3, -1), 1, colors.black),
-        ]))
+        table = Table(data, colWidths=template["col_widths"])
+        table.setStyle(template["table_style"])
         
         w, h = table.wrapOn(c, width, height)
         # Position it below the "Charging Sessions" title
         table.drawOn(c, 20*mm, height - 80*mm - h)
         
-        # Load SVG
-        drawing = svg2rlg(filepath)
+        # Parse the QR bill straight from memory
+        drawing = svg2rlg(BytesIO(svg.encode("utf-8")))
         # Draw SVG at bottom left (0, 0)
         # The QR Bill is 210mm x 105mm, exactly the width of A4 and the bottom 1/3 of the page
         renderPDF.draw(drawing, c, 0, 0)
         
         c.save()
-        
-        # Optionally delete the svg
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        _write_atomically(pdf_filepath, pdf.getvalue())
         return pdf_filepath
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        print(f"Error converting SVG to PDF: {e}")
-        return filepath # Return SVG path fallback
+    except Exception:
+        logger.exception(f"Error converting the QR bill of invoice {invoice.invoice_id} to PDF, keeping the SVG")
+        # Keep the QR bill itself as the fallback document
+        svg_filepath = pdf_filepath[:-len(".pdf")] + ".svg"
+        _write_atomically(svg_filepath, svg.encode("utf-8"))
+        return svg_filepath
 
+def _write_atomically(path: str, content: bytes):
+    # Readers never see a half-written file, and a failed render leaves nothing behind
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
 
-def calculate_and_generate_invoice(db: Session, renter: Renter, period_end_date: datetime) -> Optional[Invoice]:
-    """Calculate due amount for unbilled sessions up to a date and generate an invoice."""
-    settings = db.query(BillingSettings).first()
-    if not settings:
-        raise ValueError("Billing settings not configured")
-
-    # Find unbilled sessions for this renter that ended before or on the period_end_date
-    unbilled_sessions = db.query(ChargingSession).join(
-        ChargingSession.token_rel
-    ).filter(
-        ChargingSession.token_rel.has(renter_id=renter.id),
-        ChargingSession.invoice_id == None,
-        ChargingSession.start_time <= period_end_date,
-        ChargingSession.total_energy_kwh > 0
-    ).all()
-
-    if not unbilled_sessions:
-        return None
-
-    total_kwh = sum([session.total_energy_kwh for session in unbilled_sessions if session.total_energy_kwh])
-    amount_due = total_kwh * settings.price_per_kwh
 
-    if amount_due <= 0:
+def calculate_and_generate_invoice(db: Session, renter: Renter, period_end_date: datetime, settings=None) -> Optional[Invoice]:
+    """
+    Calculate due amount for unbilled sessions up to a date and generate an invoice.
+    `settings` may be a BillingSettingsSnapshot; if omitted the row is read from the DB.
+    """
+    if settings is None:
+        settings = db.query(BillingSettings).first()
+    invoice = create_invoice(db, renter, period_end_date, settings)
+    if invoice is None:
         return None
 
-    # Determine period start from the earliest session
-    period_start = min([session.start_time for session in unbilled_sessions])
-
-    # Create Invoice record
-    invoice = Invoice(
-        renter_id=renter.id,
-        period_start=period_start,
-        period_end=period_end_date,
-        amount_due=amount_due,
-        is_paid=False
-    )
-    db.add(invoice)
-    db.commit()
-    db.refresh(invoice)
-
-    # Link sessions
-    for session in unbilled_sessions:
-        session.invoice_id = invoice.id
-    db.commit()
-
     # Generate PDF
     file_path = generate_invoice_pdf(invoice, settings)
     invoice.file_path = file_path
@@ -188,6 +253,39 @@ def calculate_and_generate_invoice(db: Session, renter: Renter, period_end_date:
     return invoice
 
 
+def create_invoice(db: Session, renter: Renter, period_end_date: datetime, settings) -> Optional[Invoice]:
+    """Create the invoice for a renter's unbilled sessions and link them to it, without rendering the PDF."""
+    invoice_ids = billing_engine.bill(db, period_end_date, settings, renter_ids=[renter.id])
+    if not invoice_ids:
+        return None
+    return db.get(Invoice, invoice_ids[0])
+
+
+def invoice_documents(invoice_ids: List[int], settings, db: Session = None) -> List[InvoiceDocument]:
+    """Load what the render stage needs for a set of invoices, in one query."""
+    with session_scope(db) as db:
+        invoices = db.query(Invoice).options(
+            joinedload(Invoice.renter), selectinload(Invoice.sessions)
+        ).filter(Invoice.id.in_(invoice_ids)).order_by(Invoice.id).all()
+        return [InvoiceDocument.from_invoice(invoice, settings) for invoice in invoices]
+
+
+def store_invoice_file(invoice_id: int, file_path: str, db: Session = None):
+    with session_scope(db) as db:
+        db.query(Invoice).filter(Invoice.id == invoice_id).update({Invoice.file_path: file_path})
+        db.commit()
+
+
+def load_billing_settings(db: Session = None):
+    """The current billing settings snapshot, creating the defaults on first use."""
+    with session_scope(db) as db:
+        settings = billing_settings_cache.get(db)
+        if settings is None:
+            get_billing_settings(db) # Creates and publishes the defaults
+            settings = billing_settings_cache.get(db)
+        return settings
+
+
 def get_billing_settings(db: Session) -> BillingSettings:
     settings = db.query(BillingSettings).first()
     if not settings:
@@ -201,4 +299,5 @@ def get_billing_settings(db: Session) -> BillingSettings:
         db.add(settings)
         db.commit()
         db.refresh(settings)
+        billing_settings_cache.publish(settings)
     return settings
@@ -0,0 +1,81 @@
+import threading
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.database import session_scope
+from app.models import BillingSettings, BillingMode, BillingPeriodicity
+
+@dataclass(frozen=True)
+class BillingSettingsSnapshot:
+    """Immutable copy of the BillingSettings row, tagged with a version."""
+    version: int
+    company_name: str
+    iban: str
+    address: str
+    periodicity: BillingPeriodicity
+    price_per_kwh: float
+    billing_mode: BillingMode
+
+    @classmethod
+    def from_model(cls, settings: BillingSettings, version: int) -> "BillingSettingsSnapshot":
+        return cls(
+            version=version,
+            company_name=settings.company_name,
+            iban=settings.iban,
+            address=settings.address,
+            periodicity=settings.periodicity,
+            price_per_kwh=settings.price_per_kwh,
+            billing_mode=settings.billing_mode or BillingMode.Postpaid,
+        )
+
+# Cached marker for "no settings row yet"
+_NOT_CONFIGURED = object()
+
+class BillingSettingsCache:
+    """
+    Serves the billing configuration from memory.
+
+    The row is loaded once and replaced wholesale with a new versioned
+    snapshot whenever the settings are committed, so readers always see a
+    consistent set of values without querying the DB.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session = None) -> Optional[BillingSettingsSnapshot]:
+        """Current snapshot, or None if billing has never been configured."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._load(db)
+        return None if snapshot is _NOT_CONFIGURED else snapshot
+
+    def publish(self, settings: BillingSettings) -> BillingSettingsSnapshot:
+        """Swap in a new snapshot. Call after the settings row has been committed."""
+        with self._lock:
+            self._version += 1
+            snapshot = BillingSettingsSnapshot.from_model(settings, self._version)
+            self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def _load(self, db: Session = None):
+        with session_scope(db) as db:
+            version = self._version
+            settings = db.query(BillingSettings).first()
+            with self._lock:
+                if self._version != version and self._snapshot is not None:
+                    # A newer snapshot was published while we were reading
+                    return self._snapshot
+                if settings is None:
+                    self._snapshot = _NOT_CONFIGURED
+                    return _NOT_CONFIGURED
+                self._version += 1
+                self._snapshot = BillingSettingsSnapshot.from_model(settings, self._version)
+                return self._snapshot
+
+billing_settings_cache = BillingSettingsCache()
@@ -0,0 +1,97 @@
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session, selectinload, joinedload
+from app.models import ChargingStation, ChargingSession, AuthorizationToken, Renter, MeterReading, MeterSeries
+from app.schemas import ChargerDashboardItem, ConnectorStatus, ActiveSessionRef
+from app.services.last_seen_tracker import last_seen_tracker
+from app.services.meter_ingest import DEFAULT_MEASURAND
+
+def latest_energy_value():
+    """Correlated subquery: the session's most recent total (phase-less) energy register value."""
+    return (
+        select(MeterReading.value)
+        .where(
+            MeterReading.transaction_id == ChargingSession.transaction_id,
+            MeterReading.series_id.in_(
+                select(MeterSeries.id).where(MeterSeries.measurand == DEFAULT_MEASURAND, MeterSeries.phase.is_(None))
+            ),
+        )
+        .order_by(MeterReading.timestamp.desc(), MeterReading.id.desc())
+        .limit(1)
+        .correlate(ChargingSession)
+        .scalar_subquery()
+    )
+
+def energy_consumed(latest_value, meter_start: int) -> int:
+    if latest_value is None:
+        return 0
+    return int(latest_value) - meter_start
+
+class DashboardService:
+    """
+    Set-based queries behind the admin charger overview: a constant number
+    of statements no matter how many stations or readings there are.
+    """
+
+    def open_sessions(self, db: Session, station_ids: Optional[Iterable[str]] = None) -> list:
+        """Open sessions with renter name and latest energy reading, oldest first, in one query."""
+        query = (
+            select(
+                ChargingSession.station_id,
+                ChargingSession.transaction_id,
+                ChargingSession.connector_id,
+                ChargingSession.start_time,
+                ChargingSession.meter_start,
+                func.coalesce(ChargingSession.renter_name_snapshot, Renter.name).label("renter_name"),
+                latest_energy_value().label("latest_energy"),
+            )
+            .outerjoin(AuthorizationToken, AuthorizationToken.token == ChargingSession.token_id)
+            .outerjoin(Renter, Renter.id == AuthorizationToken.renter_id)
+            .where(ChargingSession.end_time.is_(None))
+            .order_by(ChargingSession.station_id, ChargingSession.start_time)
+        )
+        if station_ids is not None:
+            query = query.where(ChargingSession.station_id.in_(list(station_ids)))
+        return db.execute(query).all()
+
+    def active_sessions(self, db: Session) -> Dict[str, ActiveSessionRef]:
+        """Newest open session per station."""
+        # Ordered by start_time, so the newest open session per station wins
+        result = {}
+        for row in self.open_sessions(db):
+            result[row.station_id] = ActiveSessionRef(
+                transaction_id=row.transaction_id,
+                renter_name=row.renter_name or "Unknown",
+                energy_consumed=energy_consumed(row.latest_energy, row.meter_start),
+            )
+        return result
+
+    def get_chargers(self, db: Session) -> List[ChargerDashboardItem]:
+        chargers = (
+            db.query(ChargingStation)
+            .options(selectinload(ChargingStation.connectors), joinedload(ChargingStation.parking_spot))
+            .all()
+        )
+        active = self.active_sessions(db)
+
+        return [
+            ChargerDashboardItem(
+                id=c.id,
+                vendor=c.vendor,
+                model=c.model,
+                is_online=c.is_online,
+                # Prefer the in-memory value, the DB copy lags by up to one flush interval
+                last_seen=last_seen_tracker.get_last_seen(c.id) or c.last_seen,
+                kiosk_mode=c.kiosk_mode or False,
+                parking_spot_label=c.parking_spot.label if c.parking_spot else None,
+                parking_spot_id=c.parking_spot.id if c.parking_spot else None,
+                connectors=[
+                    ConnectorStatus(connector_id=conn.connector_id, status=conn.status)
+                    for conn in c.connectors
+                ],
+                active_session=active.get(c.id),
+            )
+            for c in chargers
+        ]
+
+dashboard_service = DashboardService()
@@ -0,0 +1,207 @@
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import Date, delete, func, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models import (
+    AuthorizationToken, ChargingSession, EnergyRollupRenterDaily, EnergyRollupStationDaily, Renter,
+)
+
+GROUPINGS = ("total", "day", "station", "renter")
+
+@dataclass
+class UsageRow:
+    energy_kwh: float
+    session_count: int
+    day: Optional[date] = None
+    station_id: Optional[str] = None
+    renter_id: Optional[int] = None
+    renter_name: Optional[str] = None
+
+def _session_day(start_time: datetime) -> date:
+    if start_time.tzinfo is not None:
+        start_time = start_time.astimezone(timezone.utc)
+    return start_time.date()
+
+class EnergyRollupService:
+    """
+    Energy and session counts per day x station and per day x renter.
+
+    StopTransaction adds each session to the rollups of its start day (UTC)
+    in the same DB transaction that closes it, so reports over any date
+    range read a few rows per day instead of every session. A session
+    counts for the renter its token belonged to when it stopped; that
+    renter is kept on the session (renter_id_snapshot), so moving a token
+    to another renter later changes neither the rollups nor a rebuild.
+    rebuild() recomputes a range from charging_sessions with one grouped
+    query per table (the backfill), verify() reports where the stored
+    rollups differ from that.
+    """
+
+    @staticmethod
+    def _upsert(db: Session, model, key: dict, energy_kwh: float, sessions: int):
+        dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(model).values(**key, energy_kwh=energy_kwh, session_count=sessions)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key),
+            set_={
+                "energy_kwh": model.energy_kwh + stmt.excluded.energy_kwh,
+                "session_count": model.session_count + stmt.excluded.session_count,
+            },
+        )
+        db.execute(stmt)
+
+    def record_stop(self, db: Session, session: ChargingSession, previous_kwh: Optional[float] = None):
+        """
+        Add a session that was just stopped; the caller commits. For a repeated
+        StopTransaction pass the energy counted the first time (previous_kwh),
+        so only the difference is applied and the session isn't counted twice.
+        """
+        day = _session_day(session.start_time)
+        energy_kwh = (session.total_energy_kwh or 0.0) - (previous_kwh or 0.0)
+        sessions = 0 if previous_kwh is not None else 1
+        if not energy_kwh and not sessions:
+            return
+        self._upsert(db, EnergyRollupStationDaily, {"day": day, "station_id": session.station_id}, energy_kwh, sessions)
+
+        if previous_kwh is None and session.token_id:
+            session.renter_id_snapshot = (
+                db.query(AuthorizationToken.renter_id).filter(AuthorizationToken.token == session.token_id).scalar()
+            )
+        renter_id = session.renter_id_snapshot
+        if renter_id is not None:
+            self._upsert(db, EnergyRollupRenterDaily, {"day": day, "renter_id": renter_id}, energy_kwh, sessions)
+
+    @staticmethod
+    def _from_sessions(start: Optional[date], end: Optional[date]) -> Tuple:
+        """Grouped selects computing both rollups from closed sessions, days in [start, end]."""
+        day = func.date(ChargingSession.start_time, type_=Date).label("day")
+        energy = func.coalesce(func.sum(ChargingSession.total_energy_kwh), 0.0).label("energy_kwh")
+        sessions = func.count().label("session_count")
+        closed = [ChargingSession.end_time.is_not(None)]
+        if start:
+            closed.append(ChargingSession.start_time >= datetime.combine(start, datetime.min.time()))
+        if end:
+            closed.append(ChargingSession.start_time < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+
+        by_station = select(day, ChargingSession.station_id, energy, sessions).where(*closed).group_by(day, ChargingSession.station_id)
+        by_renter = (
+            select(day, ChargingSession.renter_id_snapshot, energy, sessions)
+            .where(*closed, ChargingSession.renter_id_snapshot.is_not(None))
+            .group_by(day, ChargingSession.renter_id_snapshot)
+        )
+        return by_station, by_renter
+
+    @staticmethod
+    def _in_range(model, start: Optional[date], end: Optional[date]) -> list:
+        conditions = []
+        if start:
+            conditions.append(model.day >= start)
+        if end:
+            conditions.append(model.day <= end)
+        return conditions
+
+    def rebuild(self, db: Session, start: Optional[date] = None, end: Optional[date] = None) -> Dict[str, int]:
+        """Replace the rollups of [start, end] (everything by default) with values recomputed from sessions; commits."""
+        by_station, by_renter = self._from_sessions(start, end)
+        if db.bind.dialect.name == "postgresql":
+            # Hold off StopTransaction upserts so none land between the delete and the insert
+            db.execute(text(
+                f"LOCK TABLE {EnergyRollupStationDaily.__tablename__}, {EnergyRollupRenterDaily.__tablename__} IN SHARE ROW EXCLUSIVE MODE"
+            ))
+        counts = {}
+        for model, query, key in (
+            (EnergyRollupStationDaily, by_station, "station_id"),
+            (EnergyRollupRenterDaily, by_renter, "renter_id"),
+        ):
+            db.execute(delete(model).where(*self._in_range(model, start, end)))
+            result = db.execute(model.__table__.insert().from_select(["day", key, "energy_kwh", "session_count"], query))
+            counts[model.__tablename__] = result.rowcount
+        db.commit()
+        return counts
+
+    def verify(self, db: Session, start: Optional[date] = None, end: Optional[date] = None, tolerance: float = 1e-6) -> List[str]:
+        """Differences between the stored rollups and a recomputation from sessions; empty when they agree."""
+        by_station, by_renter = self._from_sessions(start, end)
+        problems = []
+        for model, query, key in (
+            (EnergyRollupStationDaily, by_station, "station_id"),
+            (EnergyRollupRenterDaily, by_renter, "renter_id"),
+        ):
+            expected = {(_as_date(r[0]), r[1]): (r[2], r[3]) for r in db.execute(query)}
+            stored = {
+                (_as_date(r[0]), r[1]): (r[2], r[3])
+                for r in db.execute(
+                    select(model.day, getattr(model, key), model.energy_kwh, model.session_count)
+                    .where(*self._in_range(model, start, end))
+                )
+            }
+            for group in sorted(expected.keys() | stored.keys(), key=str):
+                want = expected.get(group, (0.0, 0))
+                have = stored.get(group, (0.0, 0))
+                if abs(want[0] - have[0]) > tolerance or want[1] != have[1]:
+                    problems.append(
+                        f"{model.__tablename__} {group[0]} {key}={group[1]}: "
+                        f"stored {have[0]:.3f} kWh / {have[1]} sessions, sessions say {want[0]:.3f} kWh / {want[1]}"
+                    )
+        return problems
+
+    def usage(
+        self,
+        db: Session,
+        start: date,
+        end: date,
+        group_by: str = "total",
+        station_id: Optional[str] = None,
+        renter_id: Optional[int] = None,
+    ) -> List[UsageRow]:
+        """Energy and session counts for the days [start, end], grouped by day, station, renter or not at all."""
+        if group_by not in GROUPINGS:
+            raise ValueError(f"group_by must be one of {', '.join(GROUPINGS)}")
+        per_station = station_id is not None or group_by == "station"
+        per_renter = renter_id is not None or group_by == "renter"
+        if per_station and per_renter:
+            raise ValueError("Usage is rolled up per station or per renter, not both")
+
+        model = EnergyRollupRenterDaily if (renter_id is not None or group_by == "renter") else EnergyRollupStationDaily
+        columns, group = [], []
+        if group_by == "day":
+            columns.append(model.day.label("day"))
+            group.append(model.day)
+        elif group_by == "station":
+            columns.append(model.station_id.label("station_id"))
+            group.append(model.station_id)
+        elif group_by == "renter":
+            columns += [model.renter_id.label("renter_id"), func.min(Renter.name).label("renter_name")]
+            group.append(model.renter_id)
+
+        query = select(
+            *columns,
+            func.coalesce(func.sum(model.energy_kwh), 0.0).label("energy_kwh"),
+            func.coalesce(func.sum(model.session_count), 0).label("session_count"),
+        ).where(*self._in_range(model, start, end))
+        if group_by == "renter":
+            query = query.outerjoin(Renter, Renter.id == model.renter_id)
+        if station_id is not None:
+            query = query.where(model.station_id == station_id)
+        if renter_id is not None:
+            query = query.where(model.renter_id == renter_id)
+        if group:
+            query = query.group_by(*group).order_by(*group)
+
+        rows = []
+        for row in db.execute(query).mappings():
+            values = dict(row)
+            if "day" in values:
+                values["day"] = _as_date(values["day"])
+            values["energy_kwh"] = float(values["energy_kwh"])
+            values["session_count"] = int(values["session_count"])
+            rows.append(UsageRow(**values))
+        return rows
+
+def _as_date(value) -> date:
+    # SQLite hands date() back as text
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+energy_rollups = EnergyRollupService()
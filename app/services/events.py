@@ -1,4 +1,5 @@
 from pyee.asyncio import AsyncIOEventEmitter
+from app.config import logger
 
 # Singleton instance of the Event Bus
 event_bus = AsyncIOEventEmitter()
@@ -7,3 +8,12 @@ event_bus = AsyncIOEventEmitter()
 class Events:
     METER_VALUES = "meter_values"
     STATUS_NOTIFICATION = "status_notification"
+    STATION_CONNECTED = "station_connected"
+    STATION_DISCONNECTED = "station_disconnected"
+    TRANSACTION_STARTED = "transaction_started"
+    TRANSACTION_STOPPED = "transaction_stopped"
+
+@event_bus.on("error")
+def _log_listener_error(error):
+    # A failing listener must not break the OCPP handler that emitted the event
+    logger.error(f"Event listener error: {error!r}")
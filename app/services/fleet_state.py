@@ -0,0 +1,377 @@
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy.orm import Session, selectinload, joinedload
+from app.database import session_scope
+from app.models import ChargingStation, ChargingStationStatus
+from app.schemas import ChargerDashboardItem, ChargerDetail, ConnectorStatus, ActiveSessionRef
+from app.config import logger
+from app.services.last_seen_tracker import last_seen_tracker
+from app.services.dashboard_service import dashboard_service, energy_consumed
+
+@dataclass
+class SessionView:
+    """An open transaction as the admin charger endpoints show it."""
+    transaction_id: int
+    connector_id: Optional[int]
+    start_time: datetime
+    meter_start: int
+    renter_name: str = "Unknown"
+    latest_energy: Optional[float] = None
+    # Sample time of latest_energy; None when it was loaded from the DB
+    latest_energy_at: Optional[datetime] = None
+
+    def __post_init__(self):
+        # The DB hands back naive UTC, the OCPP payloads carry an offset; keep them comparable
+        self.start_time = naive_utc(self.start_time)
+
+    @classmethod
+    def from_row(cls, row) -> "SessionView":
+        """From a dashboard_service.open_sessions() row."""
+        return cls(
+            transaction_id=row.transaction_id,
+            connector_id=row.connector_id,
+            start_time=row.start_time,
+            meter_start=row.meter_start,
+            renter_name=row.renter_name or "Unknown",
+            latest_energy=_as_float(row.latest_energy),
+        )
+
+    @property
+    def energy_consumed(self) -> int:
+        return energy_consumed(self.latest_energy, self.meter_start)
+
+@dataclass
+class StationView:
+    id: str
+    vendor: Optional[str] = None
+    model: Optional[str] = None
+    firmware_version: Optional[str] = None
+    is_online: bool = False
+    kiosk_mode: bool = False
+    last_seen: Optional[datetime] = None
+    last_heartbeat: Optional[datetime] = None
+    parking_spot_id: Optional[int] = None
+    parking_spot_label: Optional[str] = None
+    connectors: Dict[int, ChargingStationStatus] = field(default_factory=dict)
+    sessions: Dict[int, SessionView] = field(default_factory=dict)
+
+    @classmethod
+    def from_model(cls, station: ChargingStation) -> "StationView":
+        return cls(
+            id=station.id,
+            vendor=station.vendor,
+            model=station.model,
+            firmware_version=station.firmware_version,
+            is_online=bool(station.is_online),
+            kiosk_mode=bool(station.kiosk_mode),
+            last_seen=station.last_seen,
+            last_heartbeat=station.last_heartbeat,
+            parking_spot_id=station.parking_spot.id if station.parking_spot else None,
+            parking_spot_label=station.parking_spot.label if station.parking_spot else None,
+            connectors={conn.connector_id: conn.status for conn in station.connectors},
+        )
+
+    def active_session(self) -> Optional[SessionView]:
+        """Newest open session, the one the dashboard shows."""
+        return max(self.sessions.values(), key=lambda s: s.start_time, default=None)
+
+class FleetState:
+    """
+    In-process read model of the fleet behind the admin charger endpoints.
+
+    Rebuilt from the DB at startup, then kept current by the OCPP services
+    (after their commits) and by the admin mutations, so the charger
+    overview and detail pages are served without touching the DB.
+    last_seen/last_heartbeat are overlaid from the last_seen_tracker on read.
+
+    Until the first rebuild nothing is tracked and callers fall back to
+    their DB queries; updates arriving before then are ignored because the
+    rebuild picks them up anyway.
+    """
+
+    def __init__(self):
+        self._stations: Dict[str, StationView] = {}
+        # transaction_id -> station_id, for MeterValues and StopTransaction
+        self._session_station: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self.ready = False
+
+    # --- Loading ---
+
+    @staticmethod
+    def _load(db: Session, station_ids: Optional[Iterable[str]] = None) -> Dict[str, StationView]:
+        query = db.query(ChargingStation).options(
+            selectinload(ChargingStation.connectors), joinedload(ChargingStation.parking_spot)
+        )
+        if station_ids is not None:
+            station_ids = list(station_ids)
+            query = query.filter(ChargingStation.id.in_(station_ids))
+        stations = {s.id: StationView.from_model(s) for s in query.order_by(ChargingStation.id).all()}
+
+        for row in dashboard_service.open_sessions(db, station_ids):
+            station = stations.get(row.station_id)
+            if station is None:
+                continue
+            station.sessions[row.transaction_id] = SessionView.from_row(row)
+        return stations
+
+    def rebuild(self, db: Session = None):
+        with session_scope(db) as db:
+            stations = self._load(db)
+            with self._lock:
+                self._stations = stations
+                self._session_station = {tx: s.id for s in stations.values() for tx in s.sessions}
+                self.ready = True
+            logger.info(f"FleetState: Rebuilt with {len(stations)} stations.")
+
+    def reset(self):
+        with self._lock:
+            self._stations.clear()
+            self._session_station.clear()
+            self.ready = False
+
+    def refresh_station(self, db: Session, charger_id: str):
+        """Reload one station from the DB, e.g. after an admin edit. Drops it if it no longer exists."""
+        if not self.ready:
+            return
+        station = self._load(db, [charger_id]).get(charger_id)
+        with self._lock:
+            self._drop(charger_id)
+            if station is not None:
+                self._stations[charger_id] = station
+                for tx in station.sessions:
+                    self._session_station[tx] = charger_id
+
+    def refresh_sessions(self, db: Session):
+        """Reload open sessions, e.g. after renter or token edits changed who they belong to."""
+        if not self.ready:
+            return
+        sessions: Dict[str, Dict[int, SessionView]] = {}
+        for row in dashboard_service.open_sessions(db):
+            sessions.setdefault(row.station_id, {})[row.transaction_id] = SessionView.from_row(row)
+        with self._lock:
+            self._session_station = {}
+            for station in self._stations.values():
+                station.sessions = sessions.get(station.id, {})
+                for tx in station.sessions:
+                    self._session_station[tx] = station.id
+
+    def remove_station(self, charger_id: str):
+        with self._lock:
+            self._drop(charger_id)
+
+    def _drop(self, charger_id: str):
+        station = self._stations.pop(charger_id, None)
+        if station is not None:
+            for tx in station.sessions:
+                self._session_station.pop(tx, None)
+
+    # --- Updates from the OCPP services (called after the DB commit) ---
+
+    def station_booted(self, charger_id: str, vendor: str, model: str, firmware_version: Optional[str]):
+        if not self.ready:
+            return
+        with self._lock:
+            station = self._stations.setdefault(charger_id, StationView(id=charger_id))
+            station.is_online = True
+            station.vendor = vendor
+            station.model = model
+            station.firmware_version = firmware_version
+
+    def set_online(self, charger_id: str):
+        if not self.ready:
+            return
+        with self._lock:
+            self._stations.setdefault(charger_id, StationView(id=charger_id)).is_online = True
+
+    def set_offline(self, charger_ids: Iterable[str]):
+        """Mirror of the DB update: offline, with every connector Unknown."""
+        if not self.ready:
+            return
+        with self._lock:
+            for charger_id in charger_ids:
+                station = self._stations.get(charger_id)
+                if station is None:
+                    continue
+                station.is_online = False
+                for connector_id in station.connectors:
+                    station.connectors[connector_id] = ChargingStationStatus.Unknown
+
+    def clear_offline_connectors(self):
+        """Watchdog consistency fix: connectors of offline stations are Unknown."""
+        if not self.ready:
+            return
+        with self._lock:
+            for station in self._stations.values():
+                if not station.is_online:
+                    for connector_id in station.connectors:
+                        station.connectors[connector_id] = ChargingStationStatus.Unknown
+
+    def set_connector_status(self, charger_id: str, connector_id: int, status: str):
+        if not self.ready:
+            return
+        with self._lock:
+            station = self._stations.get(charger_id)
+            if station is not None:
+                station.connectors[connector_id] = ChargingStationStatus(status)
+
+    def session_started(self, charger_id: str, session: SessionView):
+        if not self.ready:
+            return
+        with self._lock:
+            station = self._stations.get(charger_id)
+            if station is not None:
+                station.sessions[session.transaction_id] = session
+                self._session_station[session.transaction_id] = charger_id
+
+    def session_stopped(self, transaction_id: int):
+        if not self.ready:
+            return
+        with self._lock:
+            charger_id = self._session_station.pop(transaction_id, None)
+            station = self._stations.get(charger_id) if charger_id else None
+            if station is not None:
+                station.sessions.pop(transaction_id, None)
+
+    def record_energy(self, transaction_id: int, timestamp: datetime, value: float):
+        """Latest energy register reading; older samples arriving late are ignored."""
+        if not self.ready:
+            return
+        with self._lock:
+            charger_id = self._session_station.get(transaction_id)
+            station = self._stations.get(charger_id) if charger_id else None
+            session = station.sessions.get(transaction_id) if station else None
+            if session is None:
+                return
+            timestamp = naive_utc(timestamp)
+            if session.latest_energy_at is not None and timestamp < session.latest_energy_at:
+                return
+            session.latest_energy = value
+            session.latest_energy_at = timestamp
+
+    # --- Reads ---
+
+    def has_unknown_connector_status(self, charger_id: str) -> bool:
+        with self._lock:
+            station = self._stations.get(charger_id)
+            if station is None or not station.connectors:
+                return True
+            return any(status == ChargingStationStatus.Unknown for status in station.connectors.values())
+
+    def dashboard_items(self) -> List[ChargerDashboardItem]:
+        with self._lock:
+            return [self._dashboard_item(station) for station in self._stations.values()]
+
+    def detail(self, charger_id: str) -> Optional[ChargerDetail]:
+        with self._lock:
+            station = self._stations.get(charger_id)
+            if station is None:
+                return None
+            # Newest session wins if two claim the same connector
+            active_map = {
+                s.connector_id: s.transaction_id
+                for s in sorted(station.sessions.values(), key=lambda s: s.start_time)
+                if s.connector_id is not None
+            }
+            return ChargerDetail(
+                id=station.id,
+                vendor=station.vendor,
+                model=station.model,
+                firmware_version=station.firmware_version,
+                is_online=station.is_online,
+                kiosk_mode=station.kiosk_mode,
+                last_heartbeat=last_seen_tracker.get_last_heartbeat(station.id) or station.last_heartbeat,
+                last_seen=last_seen_tracker.get_last_seen(station.id) or station.last_seen,
+                parking_spot_label=station.parking_spot_label,
+                parking_spot_id=station.parking_spot_id,
+                connectors=[
+                    ConnectorStatus(connector_id=connector_id, status=status, current_transaction_id=active_map.get(connector_id))
+                    for connector_id, status in sorted(station.connectors.items())
+                ],
+            )
+
+    @staticmethod
+    def _dashboard_item(station: StationView) -> ChargerDashboardItem:
+        session = station.active_session()
+        return ChargerDashboardItem(
+            id=station.id,
+            vendor=station.vendor,
+            model=station.model,
+            is_online=station.is_online,
+            last_seen=last_seen_tracker.get_last_seen(station.id) or station.last_seen,
+            kiosk_mode=station.kiosk_mode,
+            parking_spot_label=station.parking_spot_label,
+            parking_spot_id=station.parking_spot_id,
+            connectors=[
+                ConnectorStatus(connector_id=connector_id, status=status)
+                for connector_id, status in sorted(station.connectors.items())
+            ],
+            active_session=ActiveSessionRef(
+                transaction_id=session.transaction_id,
+                renter_name=session.renter_name,
+                energy_consumed=session.energy_consumed,
+            ) if session else None,
+        )
+
+    # --- Consistency ---
+
+    def diff(self, db: Session, station_ids: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Compare the read model against a fresh load from the DB and describe
+        every mismatch; empty when they agree. last_seen/last_heartbeat are
+        left out, the tracker owns those. Restrict to station_ids to ignore
+        stations other writers are busy with.
+        """
+        expected = self._load(db, station_ids)
+        with self._lock:
+            if station_ids is None:
+                ids = set(expected) | set(self._stations)
+            else:
+                ids = set(station_ids)
+            actual = {charger_id: self._stations.get(charger_id) for charger_id in ids}
+            problems = []
+            for charger_id in sorted(ids):
+                problems.extend(_compare(charger_id, expected.get(charger_id), actual[charger_id]))
+        return problems
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Timestamps are stored as naive UTC; aware values are converted, naive ones taken as UTC."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _as_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+_STATION_FIELDS = ("vendor", "model", "firmware_version", "is_online", "kiosk_mode", "parking_spot_id", "parking_spot_label", "connectors")
+
+def _compare(charger_id: str, expected: Optional[StationView], actual: Optional[StationView]) -> List[str]:
+    if expected is None and actual is None:
+        return []
+    if expected is None:
+        return [f"{charger_id}: in the read model but not in the DB"]
+    if actual is None:
+        return [f"{charger_id}: in the DB but not in the read model"]
+
+    problems = []
+    for name in _STATION_FIELDS:
+        want, got = getattr(expected, name), getattr(actual, name)
+        if want != got:
+            problems.append(f"{charger_id}.{name}: DB {want!r}, read model {got!r}")
+
+    for tx in sorted(set(expected.sessions) | set(actual.sessions)):
+        want, got = expected.sessions.get(tx), actual.sessions.get(tx)
+        if want is None or got is None:
+            problems.append(f"{charger_id} transaction {tx}: open in {'read model' if want is None else 'DB'} only")
+            continue
+        for name in ("connector_id", "meter_start", "renter_name", "energy_consumed"):
+            if getattr(want, name) != getattr(got, name):
+                problems.append(f"{charger_id} transaction {tx}.{name}: DB {getattr(want, name)!r}, read model {getattr(got, name)!r}")
+    return problems
+
+fleet_state = FleetState()
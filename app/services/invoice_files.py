@@ -0,0 +1,191 @@
+import asyncio
+import dataclasses
+import hashlib
+import os
+import zipfile
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from email.utils import formatdate, parsedate_to_datetime
+from typing import AsyncIterator, List, Mapping, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.config import logger
+from app.database import run_db, session_scope
+from app.models import Invoice
+from app.services.billing_service import InvoiceDocument, invoice_documents, load_billing_settings, store_invoice_file
+from app.services.invoice_renderer import InvoiceRenderer, invoice_renderer
+
+_CHUNK_SIZE = 64 * 1024
+
+def media_type(path: str) -> str:
+    # A PDF whose render failed is stored as the QR bill SVG
+    return "application/pdf" if path.endswith(".pdf") else "image/svg+xml"
+
+def validators(etag: str, stat: os.stat_result) -> dict:
+    """
+    Headers every answer for an invoice file carries, 200, 206 and 304 alike.
+    A regenerated PDF gets a new ETag, so clients may cache but must revalidate.
+    """
+    return {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+
+def not_modified(request_headers: Mapping[str, str], etag: str, mtime: float) -> bool:
+    """
+    Whether a GET can be answered with 304 (RFC 9110 13.1.2 / 13.1.3).
+    If-None-Match takes precedence; If-Modified-Since only counts without it.
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison: W/"x" matches "x"
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            return False
+        # HTTP dates have whole seconds
+        return int(mtime) <= since.timestamp()
+    return False
+
+class _ZipStream:
+    """Write-only file object for ZipFile that hands out what was written so far."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+class InvoiceFileService:
+    """
+    Invoice files as the billing API hands them out.
+
+    ETags are strong: a hash of the file content, computed once per file
+    version (path, size, mtime) and remembered, so a revalidation costs a
+    stat instead of a read. A file that is gone (a wiped volume, an invoice
+    from before the PDFs were kept) is rendered again by the invoice
+    renderer on first request, from the invoice's stored amount rather than
+    today's price; two requests racing for the same file render it twice,
+    and the atomic write keeps that harmless. archive() streams a ZIP of
+    many invoices without holding more than one file of it in memory.
+    """
+
+    def __init__(self, renderer: InvoiceRenderer = invoice_renderer, etag_cache_size: int = 1024):
+        self.renderer = renderer
+        self.etag_cache_size = etag_cache_size
+        self._etags: "OrderedDict[Tuple, str]" = OrderedDict()
+
+    def etag(self, path: str, stat: os.stat_result) -> str:
+        """Strong ETag of a file; blocking on a cache miss, it reads the whole file."""
+        key = (path, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        etag = self._etags.get(key)
+        if etag is not None:
+            self._etags.move_to_end(key)
+            return etag
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(_CHUNK_SIZE):
+                digest.update(chunk)
+        etag = f'"{digest.hexdigest()[:32]}"'
+        self._etags[key] = etag
+        while len(self._etags) > self.etag_cache_size:
+            self._etags.popitem(last=False)
+        return etag
+
+    @staticmethod
+    def _stored_path(invoice_id: int, db: Session = None) -> Tuple[bool, Optional[str]]:
+        """(invoice exists, its file if that is on disk)."""
+        with session_scope(db) as db:
+            row = db.query(Invoice.file_path).filter(Invoice.id == invoice_id).first()
+            if row is None:
+                return False, None
+            file_path = row[0]
+            return True, file_path if file_path and os.path.exists(file_path) else None
+
+    @staticmethod
+    def _as_billed(document: InvoiceDocument) -> InvoiceDocument:
+        # The price may have changed since; the cost column has to add up to what was billed
+        energy_kwh = sum(kwh for _, _, kwh in document.sessions)
+        if energy_kwh > 0:
+            return dataclasses.replace(document, price_per_kwh=document.amount_due / energy_kwh)
+        return document
+
+    async def _regenerate(self, invoice_id: int, db: Session = None) -> str:
+        billing_settings = await run_db(load_billing_settings, db)
+        documents = await run_db(invoice_documents, [invoice_id], billing_settings, db)
+        if not documents:
+            raise LookupError(f"Invoice {invoice_id} not found")
+        file_path = await self.renderer.render(self._as_billed(documents[0]))
+        await run_db(store_invoice_file, invoice_id, file_path, db)
+        logger.info(f"Regenerated missing file of invoice {invoice_id}: {file_path}")
+        return file_path
+
+    async def ensure(self, invoice_id: int, db: Session = None) -> Optional[str]:
+        """The path of the invoice's file, rendering it if it is missing; None for an unknown invoice."""
+        exists, file_path = await run_db(self._stored_path, invoice_id, db)
+        if not exists:
+            return None
+        return file_path or await self._regenerate(invoice_id, db)
+
+    @staticmethod
+    def _invoice_ids(start: date, end: date, db: Session = None) -> List[int]:
+        with session_scope(db) as db:
+            rows = db.query(Invoice.id).filter(
+                Invoice.period_end >= datetime.combine(start, datetime.min.time()),
+                Invoice.period_end < datetime.combine(end + timedelta(days=1), datetime.min.time()),
+            ).order_by(Invoice.id).all()
+            return [row[0] for row in rows]
+
+    async def invoice_ids(self, start: date, end: date, db: Session = None) -> List[int]:
+        """Invoices whose period ends in the days [start, end]."""
+        return await run_db(self._invoice_ids, start, end, db)
+
+    @staticmethod
+    def _add(archive: zipfile.ZipFile, path: str):
+        # ZipFile.write copies in chunks; on a stream that can't seek it appends a data descriptor
+        archive.write(path, arcname=os.path.basename(path))
+
+    async def archive(self, invoice_ids: List[int], db: Session = None) -> AsyncIterator[bytes]:
+        """
+        A ZIP of the given invoices' files, yielded piece by piece as it is
+        written, regenerating missing files on the way. Invoices that can't
+        be produced are listed in MISSING.txt instead of failing a download
+        that has already started.
+        """
+        stream = _ZipStream()
+        missing = []
+        with zipfile.ZipFile(stream, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for invoice_id in invoice_ids:
+                try:
+                    file_path = await self.ensure(invoice_id, db)
+                    if file_path is None:
+                        raise LookupError("invoice not found")
+                    await asyncio.to_thread(self._add, archive, file_path)
+                except Exception as e:
+                    logger.error(f"Invoice {invoice_id} left out of the archive: {e}")
+                    missing.append(f"{invoice_id}: {e}")
+                data = stream.take()
+                if data:
+                    yield data
+            if missing:
+                archive.writestr("MISSING.txt", "\n".join(missing) + "\n")
+        yield stream.take()
+
+invoice_files = InvoiceFileService()
@@ -0,0 +1,137 @@
+import asyncio
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from app.config import settings, logger
+from app.database import run_db
+from app.services.billing_run import BillingRun, billing_run
+from app.services.billing_service import load_billing_settings
+
+QUEUED, INVOICING, RENDERING, DONE, FAILED = "queued", "invoicing", "rendering", "done", "failed"
+
+@dataclass
+class InvoiceJob:
+    id: str
+    period_end: datetime
+    renter_id: Optional[int] = None # None: every active renter
+    status: str = QUEUED
+    invoice_ids: List[int] = field(default_factory=list)
+    rendered: int = 0
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+class InvoiceJobQueue:
+    """
+    Invoice generation as background jobs.
+
+    Requests (one renter, or every active renter) are queued and picked up
+    by a few worker tasks, which run them through a BillingRun: the money
+    part on the DB thread pool, the PDFs in the renderer processes. Jobs
+    report their stage and how many invoices were created and rendered;
+    finished jobs stay queryable until history_size newer ones have
+    finished. Jobs live in memory, like the rest of the monolith's
+    runtime state.
+    """
+
+    def __init__(
+        self,
+        run: BillingRun = billing_run,
+        workers: int = settings.INVOICE_JOB_WORKERS,
+        history_size: int = settings.INVOICE_JOB_HISTORY,
+    ):
+        self.run = run
+        self.workers = workers
+        self.history_size = history_size
+        self._jobs: "OrderedDict[str, InvoiceJob]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self.running = False
+
+    def submit(self, period_end: datetime, renter_id: Optional[int] = None) -> InvoiceJob:
+        """Queue a job. Call on the event loop; before start() jobs wait until the workers run."""
+        job = InvoiceJob(id=uuid.uuid4().hex, period_end=period_end, renter_id=renter_id)
+        self._jobs[job.id] = job
+        if self._queue is not None:
+            self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[InvoiceJob]:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> List[InvoiceJob]:
+        """All known jobs, newest first."""
+        return list(reversed(self._jobs.values()))
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history_size)]:
+            del self._jobs[job_id]
+
+    async def process(self, job: InvoiceJob, db: Session = None):
+        """Run one job to completion. Workers own a DB session per stage; tests can pass one in."""
+        job.status = INVOICING
+        job.started_at = datetime.now(timezone.utc)
+
+        def invoiced(invoice_ids: List[int]):
+            job.invoice_ids = list(invoice_ids)
+            job.status = RENDERING
+
+        def rendered(invoice_id: int):
+            job.rendered += 1
+
+        try:
+            billing_settings = await run_db(load_billing_settings, db)
+            renter_ids = [job.renter_id] if job.renter_id is not None else None
+            await self.run.run(job.period_end, billing_settings, renter_ids, db, on_invoiced=invoiced, on_rendered=rendered)
+            job.status = DONE
+        except Exception as e:
+            logger.error(f"Invoice job {job.id} failed: {e}")
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+            self._prune()
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self._queue = asyncio.Queue()
+            # Jobs submitted before startup
+            for job in self._jobs.values():
+                if job.status == QUEUED:
+                    self._queue.put_nowait(job)
+            self._tasks = [asyncio.create_task(self._loop()) for _ in range(max(1, self.workers))]
+            logger.info(f"InvoiceJobQueue: {len(self._tasks)} workers started.")
+
+    async def stop(self):
+        self.running = False
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._queue = None
+
+    async def _loop(self):
+        while self.running:
+            try:
+                job = await self._queue.get()
+                await self.process(job)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"InvoiceJobQueue worker error: {e}")
+
+invoice_jobs = InvoiceJobQueue()
@@ -0,0 +1,59 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from app.config import settings
+from app.services.billing_service import InvoiceDocument, render_invoice_pdf
+
+class InvoiceRenderer:
+    """
+    Renders invoice PDFs in a small pool of worker processes.
+
+    Building the QR bill, re-parsing its SVG and drawing the page is pure
+    Python CPU work that holds the GIL, so a thread would still stall the
+    event loop serving the chargers. The pool is started on first use and
+    shut down once no render has been asked for in idle_timeout seconds;
+    renders beyond the worker count queue up instead of starting more
+    processes.
+    """
+
+    def __init__(self, workers: int = settings.INVOICE_RENDER_WORKERS, idle_timeout: float = settings.INVOICE_RENDER_IDLE_SECONDS):
+        self.workers = workers
+        self.idle_timeout = idle_timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+        self._idle_handle: Optional[asyncio.TimerHandle] = None
+
+    async def render(self, document: InvoiceDocument) -> str:
+        """Render one invoice and return the file path."""
+        if self.workers <= 0:
+            return render_invoice_pdf(document)
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        if self._pool is None:
+            # spawn: forking a process that runs DB and scheduler threads can copy held locks
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        loop = asyncio.get_running_loop()
+        self._in_flight += 1
+        try:
+            return await loop.run_in_executor(self._pool, render_invoice_pdf, document)
+        finally:
+            self._in_flight -= 1
+            if self._in_flight == 0:
+                self._idle_handle = loop.call_later(self.idle_timeout, self._shutdown_if_idle)
+
+    def _shutdown_if_idle(self):
+        self._idle_handle = None
+        if self._in_flight == 0:
+            self.shutdown()
+
+    def shutdown(self):
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+invoice_renderer = InvoiceRenderer()
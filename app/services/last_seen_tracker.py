@@ -0,0 +1,120 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from sqlalchemy import update, values, column, cast, func, String, DateTime
+from app.database import SessionLocal, run_db
+from app.models import ChargingStation
+from app.config import settings, logger
+
+class LastSeenTracker:
+    """
+    Keeps last_seen / last_heartbeat per charger in memory and writes the
+    changed ones back with a single bulk UPDATE ... FROM (VALUES ...) every
+    flush interval, instead of one UPDATE + COMMIT per incoming frame.
+    """
+
+    def __init__(self, flush_interval: float = settings.LAST_SEEN_FLUSH_INTERVAL_SECONDS):
+        self.flush_interval = flush_interval
+        self._last_seen: Dict[str, datetime] = {}
+        self._last_heartbeat: Dict[str, datetime] = {}
+        self._dirty: set[str] = set()
+        self._flush_lock = asyncio.Lock()
+        self.running = False
+        self._task = None
+
+    def touch(self, charger_id: str, heartbeat: bool = False):
+        now = datetime.now(timezone.utc)
+        self._last_seen[charger_id] = now
+        if heartbeat:
+            self._last_heartbeat[charger_id] = now
+        self._dirty.add(charger_id)
+
+    def get_last_seen(self, charger_id: str) -> Optional[datetime]:
+        return self._last_seen.get(charger_id)
+
+    def get_last_heartbeat(self, charger_id: str) -> Optional[datetime]:
+        return self._last_heartbeat.get(charger_id)
+
+    def forget(self, charger_id: str):
+        self._last_seen.pop(charger_id, None)
+        self._last_heartbeat.pop(charger_id, None)
+        self._dirty.discard(charger_id)
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self._task = asyncio.create_task(self._loop())
+            logger.info("LastSeenTracker: Started.")
+
+    async def stop(self):
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        logger.info("LastSeenTracker: Stopped.")
+
+    async def _loop(self):
+        while self.running:
+            try:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"LastSeenTracker error: {e}")
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+
+            dirty, self._dirty = self._dirty, set()
+            rows = [
+                (charger_id, self._last_seen.get(charger_id), self._last_heartbeat.get(charger_id))
+                for charger_id in dirty
+                if charger_id in self._last_seen
+            ]
+            if not rows:
+                return
+
+            try:
+                await run_db(self._write, rows)
+            except Exception as e:
+                logger.error(f"LastSeenTracker: Failed to flush {len(rows)} stations: {e}")
+                # Retry on the next tick
+                self._dirty.update(charger_id for charger_id, _, _ in rows)
+
+    def _write(self, rows: list):
+        v = values(
+            column("id", String),
+            column("last_seen", DateTime),
+            column("last_heartbeat", DateTime),
+            name="v",
+        ).data(rows)
+
+        stmt = (
+            update(ChargingStation)
+            .where(ChargingStation.id == v.c.id)
+            .values(
+                last_seen=cast(v.c.last_seen, DateTime),
+                last_heartbeat=func.coalesce(cast(v.c.last_heartbeat, DateTime), ChargingStation.last_heartbeat),
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        db = SessionLocal()
+        try:
+            db.execute(stmt)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+last_seen_tracker = LastSeenTracker()
@@ -0,0 +1,69 @@
+import bisect
+from typing import Dict, List
+
+# Upper bucket bounds in milliseconds; anything slower lands in the overflow bucket
+DEFAULT_BOUNDS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+class _Series:
+    __slots__ = ("counts", "count", "total_ms", "max_ms")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * buckets
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram per label (here: OCPP action).
+
+    Recording is a bisect and a few increments, so it can sit on the
+    response path. Percentiles are reported as the upper bound of the
+    bucket they fall into.
+    """
+
+    def __init__(self, bounds_ms=DEFAULT_BOUNDS_MS):
+        self.bounds_ms = tuple(bounds_ms)
+        self._series: Dict[str, _Series] = {}
+
+    def record(self, label: str, seconds: float):
+        ms = seconds * 1000.0
+        series = self._series.get(label)
+        if series is None:
+            series = self._series[label] = _Series(len(self.bounds_ms) + 1)
+        series.counts[bisect.bisect_left(self.bounds_ms, ms)] += 1
+        series.count += 1
+        series.total_ms += ms
+        if ms > series.max_ms:
+            series.max_ms = ms
+
+    def _percentile(self, series: _Series, q: float) -> float:
+        rank = q * series.count
+        seen = 0
+        for i, n in enumerate(series.counts):
+            seen += n
+            if seen >= rank and n:
+                return self.bounds_ms[i] if i < len(self.bounds_ms) else series.max_ms
+        return series.max_ms
+
+    def snapshot(self) -> dict:
+        result = {}
+        for label, series in sorted(self._series.items()):
+            if not series.count:
+                continue
+            labels: List[str] = [f"le_{b}ms" for b in self.bounds_ms] + ["overflow"]
+            result[label] = {
+                "count": series.count,
+                "mean_ms": round(series.total_ms / series.count, 3),
+                "max_ms": round(series.max_ms, 3),
+                "p50_ms": self._percentile(series, 0.50),
+                "p95_ms": self._percentile(series, 0.95),
+                "p99_ms": self._percentile(series, 0.99),
+                "buckets": dict(zip(labels, series.counts)),
+            }
+        return result
+
+    def reset(self):
+        self._series.clear()
+
+response_latency = LatencyHistogram()
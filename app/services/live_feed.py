@@ -0,0 +1,193 @@
+import asyncio
+import json
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+from app.database import SessionLocal, run_db
+from app.models import ChargingSession
+from app.config import settings, logger
+from app.services.events import event_bus, Events
+from app.services.meter_ingest import parse_meter_values
+
+class Subscriber:
+    """
+    One dashboard connection. Pending deltas are keyed by what they describe,
+    so a newer update for the same charger/connector replaces the older one
+    instead of queueing behind it. A subscriber that falls too far behind is
+    switched to a full resync.
+    """
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self.pending: "OrderedDict[tuple, dict]" = OrderedDict()
+        self.resync = False
+        self.coalesced = 0
+        self.wakeup = asyncio.Event()
+
+    def push(self, key: tuple, delta: dict):
+        if self.resync:
+            return
+        if key in self.pending:
+            self.coalesced += 1
+            self.pending.move_to_end(key)
+        elif len(self.pending) >= self.max_pending:
+            self.pending.clear()
+            self.resync = True
+            self.wakeup.set()
+            return
+        self.pending[key] = delta
+        self.wakeup.set()
+
+    def drain(self) -> list:
+        deltas = list(self.pending.values())
+        self.pending.clear()
+        self.wakeup.clear()
+        return deltas
+
+class LiveFeed:
+    """
+    Pushes charger state changes to dashboard subscribers over SSE.
+
+    The OCPP handlers publish connect/disconnect, StatusNotification,
+    transaction and MeterValues events on the event bus; this turns them
+    into per-charger deltas. Each stream starts with a snapshot from the
+    fleet read model (dashboard_service until that is built), followed by
+    coalesced deltas.
+    """
+
+    def __init__(
+        self,
+        max_pending: int = settings.LIVE_FEED_MAX_PENDING,
+        min_interval: float = settings.LIVE_FEED_MIN_INTERVAL_SECONDS,
+        keepalive: float = settings.LIVE_FEED_KEEPALIVE_SECONDS,
+    ):
+        self.max_pending = max_pending
+        self.min_interval = min_interval
+        self.keepalive = keepalive
+        self._subscribers: Set[Subscriber] = set()
+        # transaction_id -> meter_start, to turn register readings into energy consumed
+        self._meter_start: Dict[int, int] = {}
+        self._meter_start_loaded = False
+
+    def listen(self, bus):
+        bus.on(Events.STATION_CONNECTED, self._on_connected)
+        bus.on(Events.STATION_DISCONNECTED, self._on_disconnected)
+        bus.on(Events.STATUS_NOTIFICATION, self._on_status)
+        bus.on(Events.TRANSACTION_STARTED, self._on_transaction_started)
+        bus.on(Events.TRANSACTION_STOPPED, self._on_transaction_stopped)
+        bus.on(Events.METER_VALUES, self._on_meter_values)
+
+    # --- Event bus handlers (run on the event loop) ---
+
+    def _publish(self, key: tuple, delta: dict):
+        for subscriber in self._subscribers:
+            subscriber.push(key, delta)
+
+    def _on_connected(self, charger_id: str):
+        self._publish((charger_id, "online"), {"type": "online", "charger_id": charger_id, "is_online": True})
+
+    def _on_disconnected(self, charger_id: str):
+        self._publish((charger_id, "online"), {"type": "online", "charger_id": charger_id, "is_online": False})
+
+    def _on_status(self, charger_id: str, connector_id: int, status: str, error_code: str = None):
+        self._publish((charger_id, "connector", connector_id), {
+            "type": "connector_status",
+            "charger_id": charger_id,
+            "connector_id": connector_id,
+            "status": status,
+            "error_code": error_code,
+        })
+
+    def _on_transaction_started(self, charger_id: str, connector_id: int, transaction_id: int, meter_start: int):
+        self._meter_start[transaction_id] = meter_start
+        self._publish((charger_id, "session"), {
+            "type": "session",
+            "charger_id": charger_id,
+            "active_session": {"transaction_id": transaction_id, "energy_consumed": 0},
+        })
+
+    def _on_transaction_stopped(self, charger_id: str, transaction_id: int):
+        self._meter_start.pop(transaction_id, None)
+        self._publish((charger_id, "session"), {"type": "session", "charger_id": charger_id, "active_session": None})
+
+    def _on_meter_values(self, charger_id: str, connector_id: Optional[int], transaction_id: Optional[int], meter_value: list):
+        if not self._subscribers or not transaction_id:
+            return
+        meter_start = self._meter_start.get(transaction_id)
+        if meter_start is None:
+            return
+        try:
+            latest = parse_meter_values(transaction_id, meter_value).latest_float()
+        except Exception as e:
+            logger.debug(f"LiveFeed: Unparseable MeterValues from {charger_id}: {e}")
+            return
+        if latest is None:
+            return
+        self._publish((charger_id, "energy"), {
+            "type": "energy",
+            "charger_id": charger_id,
+            "transaction_id": transaction_id,
+            "energy_consumed": int(latest) - meter_start,
+        })
+
+    # --- Streaming ---
+
+    def _snapshot(self) -> list:
+        from app.services.dashboard_service import dashboard_service
+        from app.services.fleet_state import fleet_state
+        if fleet_state.ready and self._meter_start_loaded:
+            return [item.model_dump(mode="json") for item in fleet_state.dashboard_items()]
+        db = SessionLocal()
+        try:
+            if not self._meter_start_loaded:
+                rows = db.query(ChargingSession.transaction_id, ChargingSession.meter_start).filter(
+                    ChargingSession.end_time.is_(None)
+                ).all()
+                for transaction_id, meter_start in rows:
+                    self._meter_start.setdefault(transaction_id, meter_start)
+                self._meter_start_loaded = True
+            return [item.model_dump(mode="json") for item in dashboard_service.get_chargers(db)]
+        finally:
+            db.close()
+
+    @staticmethod
+    def _format(event: str, data) -> str:
+        return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    async def stream(self, request):
+        """SSE generator: snapshot, then batches of deltas until the client goes away."""
+        subscriber = Subscriber(self.max_pending)
+        # Subscribe before reading the snapshot so nothing falls in between
+        self._subscribers.add(subscriber)
+        try:
+            yield self._format("snapshot", await run_db(self._snapshot))
+            while True:
+                try:
+                    await asyncio.wait_for(subscriber.wakeup.wait(), timeout=self.keepalive)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+
+                if subscriber.resync:
+                    subscriber.resync = False
+                    subscriber.drain()
+                    yield self._format("snapshot", await run_db(self._snapshot))
+                else:
+                    yield self._format("deltas", subscriber.drain())
+
+                # Let further updates for the same keys coalesce before the next batch
+                if self.min_interval > 0:
+                    await asyncio.sleep(self.min_interval)
+        finally:
+            self._subscribers.discard(subscriber)
+
+    def get_stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "pending": sum(len(s.pending) for s in self._subscribers),
+            "coalesced": sum(s.coalesced for s in self._subscribers),
+        }
+
+live_feed = LiveFeed()
+live_feed.listen(event_bus)
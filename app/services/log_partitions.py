@@ -0,0 +1,127 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.database import session_scope
+from app.config import settings, logger
+
+PARENT_TABLE = "ocpp_message_logs"
+DEFAULT_PARTITION = "ocpp_message_logs_default"
+PARTITION_PREFIX = "ocpp_message_logs_p"
+
+def partition_name(day: date) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+def partition_day(name: str) -> Optional[date]:
+    """The day a partition created by partition_name() covers, None for anything else."""
+    if not name.startswith(PARTITION_PREFIX):
+        return None
+    try:
+        return datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+class LogPartitionManager:
+    """
+    Maintains the daily range partitions of ocpp_message_logs (Postgres only).
+
+    Partitions are created a few days ahead so inserts never wait on DDL;
+    anything that still falls outside them lands in the default partition
+    and is moved into its day's partition once that exists. Retention drops
+    whole partitions, which is instant and leaves nothing for vacuum,
+    instead of DELETEing rows.
+    """
+
+    def __init__(self, retention_days: int = settings.LOG_RETENTION_DAYS, ahead_days: int = settings.LOG_PARTITIONS_AHEAD_DAYS):
+        self.retention_days = retention_days
+        self.ahead_days = ahead_days
+
+    @staticmethod
+    def is_partitioned(db: Session) -> bool:
+        if db.bind.dialect.name != "postgresql":
+            return False
+        return db.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"
+        ), {"table": PARENT_TABLE}).scalar()
+
+    @staticmethod
+    def partitions(db: Session) -> Dict[date, str]:
+        rows = db.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:table)"
+        ), {"table": PARENT_TABLE}).scalars()
+        return {day: name for name in rows if (day := partition_day(name)) is not None}
+
+    @staticmethod
+    def create_partition(db: Session, day: date):
+        """
+        Create and attach the partition for one day, moving in any rows the
+        default partition caught for it. Attaching (rather than CREATE ...
+        PARTITION OF) doesn't block concurrent inserts into other partitions.
+        """
+        name, lower, upper = partition_name(day), day.isoformat(), (day + timedelta(days=1)).isoformat()
+        db.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+        db.execute(text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE timestamp >= '{lower}' AND timestamp < '{upper}' RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ))
+        db.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{lower}') TO ('{upper}')"))
+
+    def ensure_partitions(self, db: Session, today: date) -> List[str]:
+        """Create the partitions for today and the next ahead_days days that don't exist yet."""
+        existing = self.partitions(db)
+        created = []
+        for offset in range(self.ahead_days + 1):
+            day = today + timedelta(days=offset)
+            if day in existing:
+                continue
+            try:
+                db.execute(text("SET LOCAL lock_timeout = '5s'"))
+                self.create_partition(db, day)
+                db.commit()
+                created.append(partition_name(day))
+            except Exception as e:
+                db.rollback()
+                logger.error(f"LogPartitions: Failed to create partition for {day}: {e}")
+        return created
+
+    def drop_expired(self, db: Session, today: date) -> List[str]:
+        """Drop partitions that end on or before the retention cutoff."""
+        if self.retention_days <= 0:
+            return []
+        cutoff = today - timedelta(days=self.retention_days)
+        dropped = []
+        for day, name in sorted(self.partitions(db).items()):
+            if day + timedelta(days=1) > cutoff:
+                break
+            try:
+                db.execute(text("SET LOCAL lock_timeout = '5s'"))
+                db.execute(text(f"DROP TABLE {name}"))
+                db.commit()
+                dropped.append(name)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"LogPartitions: Failed to drop partition {name}: {e}")
+
+        # Stragglers the default partition caught are few; those go row by row
+        try:
+            db.execute(text("SET LOCAL lock_timeout = '5s'"))
+            db.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE timestamp < '{cutoff.isoformat()}'"))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"LogPartitions: Failed to delete expired rows from {DEFAULT_PARTITION}: {e}")
+        return dropped
+
+    def maintain(self, db: Session = None, today: date = None) -> dict:
+        """Daily job: create upcoming partitions, drop expired ones."""
+        with session_scope(db) as db:
+            if not self.is_partitioned(db):
+                return {"created": [], "dropped": []}
+            today = today or datetime.now(timezone.utc).date()
+            result = {"created": self.ensure_partitions(db, today), "dropped": self.drop_expired(db, today)}
+            if result["created"] or result["dropped"]:
+                logger.info(f"LogPartitions: Created {result['created']}, dropped {result['dropped']}")
+            return result
+
+log_partitions = LogPartitionManager()
@@ -1,31 +1,207 @@
-from app.database import SessionLocal
-from app.models import OcppMessageLog
-from app.config import logger
+import asyncio
 import json
+import time
+from collections import deque
+from datetime import datetime, timezone
+from sqlalchemy import insert
+from app.database import SessionLocal, run_db
+from app.models import OcppMessageLog
+from app.config import settings, logger
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "sample")
 
 class LoggingService:
+    """
+    Write-behind pipeline for OCPP message logs.
+
+    Messages are buffered in a bounded in-memory queue and written by a
+    background flusher in multi-row batches, either when a full batch is
+    waiting or when the flush interval elapses.
+    """
+
+    def __init__(
+        self,
+        max_queue_size: int = settings.LOG_QUEUE_MAX_SIZE,
+        batch_size: int = settings.LOG_BATCH_SIZE,
+        flush_interval: float = settings.LOG_FLUSH_INTERVAL_SECONDS,
+        overflow_policy: str = settings.LOG_OVERFLOW_POLICY,
+        sample_rate: int = settings.LOG_SAMPLE_RATE,
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            logger.warning(f"Unknown LOG_OVERFLOW_POLICY '{overflow_policy}', falling back to drop_oldest")
+            overflow_policy = "drop_oldest"
+
+        self.max_queue_size = max(1, max_queue_size)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.sample_rate = max(1, sample_rate)
+
+        self._queue = deque()
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self.running = False
+        self._task = None
+
+        # Counters
+        self._enqueued = 0
+        self._flushed = 0
+        self._dropped = 0
+        self._failed = 0
+        self._overflow_seen = 0
+        self._flush_count = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self._task = asyncio.create_task(self._loop())
+            logger.info("LoggingService: Write-behind flusher started.")
+
+    async def stop(self):
+        """Stop the flusher and write out everything still queued."""
+        self.running = False
+        self._wakeup.set()
+        self._space.set()
+        if self._task:
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        logger.info("LoggingService: Flusher stopped, queue drained.")
+
     async def log_message(self, station_id: str, direction: str, message_type: str, action: str, payload: dict):
-        db = SessionLocal()
-        try:
-            # Ensure payload is a dict or valid JSON structure
-            if not isinstance(payload, (dict, list)):
+        # Ensure payload is a dict or valid JSON structure
+        if not isinstance(payload, (dict, list)):
+            try:
+                payload = json.loads(payload)
+            except:
+                pass
+
+        row = {
+            "station_id": station_id,
+            "direction": direction,
+            "message_type": message_type,
+            "action": action,
+            "payload": payload,
+            # Stamp on receipt, not on flush
+            "timestamp": datetime.now(timezone.utc),
+        }
+
+        if len(self._queue) >= self.max_queue_size:
+            if not await self._make_room():
+                self._dropped += 1
+                return
+
+        self._queue.append(row)
+        self._enqueued += 1
+
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _make_room(self) -> bool:
+        """Apply the overflow policy. Returns False if the new row must be dropped."""
+        if self.overflow_policy == "block":
+            while len(self._queue) >= self.max_queue_size:
+                if self.running:
+                    self._space.clear()
+                    self._wakeup.set()
+                    await self._space.wait()
+                else:
+                    # No flusher to wait for, write through instead
+                    await self.flush()
+            return True
+
+        if self.overflow_policy == "sample":
+            self._overflow_seen += 1
+            if self._overflow_seen % self.sample_rate != 0:
+                return False
+
+        # drop_oldest, or a sampled row displacing the oldest one
+        self._queue.popleft()
+        self._dropped += 1
+        return True
+
+    async def _loop(self):
+        while self.running:
+            try:
                 try:
-                    payload = json.loads(payload)
-                except:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
                     pass
-            
-            log_entry = OcppMessageLog(
-                station_id=station_id,
-                direction=direction,
-                message_type=message_type,
-                action=action,
-                payload=payload
-            )
-            db.add(log_entry)
+                self._wakeup.clear()
+                await self.flush()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"LoggingService flusher error: {e}")
+
+    async def flush(self):
+        """Write all queued rows in batches of at most batch_size."""
+        async with self._flush_lock:
+            while self._queue:
+                batch = []
+                while self._queue and len(batch) < self.batch_size:
+                    batch.append(self._queue.popleft())
+                self._space.set()
+
+                started = time.perf_counter()
+                written = await run_db(self._write_batch, batch)
+                elapsed_ms = (time.perf_counter() - started) * 1000.0
+
+                self._flushed += written
+                self._failed += len(batch) - written
+                self._flush_count += 1
+                self._last_flush_ms = elapsed_ms
+                self._total_flush_ms += elapsed_ms
+                self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+
+    def _write_batch(self, rows: list) -> int:
+        """Insert rows with a single executemany. Returns the number of rows written."""
+        db = SessionLocal()
+        try:
+            db.execute(insert(OcppMessageLog), rows)
             db.commit()
+            return len(rows)
         except Exception as e:
-            logger.error(f"Failed to log OCPP message: {e}")
+            db.rollback()
+            logger.error(f"Failed to write batch of {len(rows)} OCPP log rows, retrying row by row: {e}")
         finally:
             db.close()
 
+        # One bad row (e.g. unknown station_id) must not take the whole batch down
+        written = 0
+        for row in rows:
+            db = SessionLocal()
+            try:
+                db.execute(insert(OcppMessageLog), [row])
+                db.commit()
+                written += 1
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Failed to log OCPP message: {e}")
+            finally:
+                db.close()
+        return written
+
+    def get_stats(self) -> dict:
+        return {
+            "queue_depth": len(self._queue),
+            "max_queue_size": self.max_queue_size,
+            "overflow_policy": self.overflow_policy,
+            "enqueued": self._enqueued,
+            "flushed": self._flushed,
+            "dropped": self._dropped,
+            "failed": self._failed,
+            "flush_count": self._flush_count,
+            "last_flush_ms": round(self._last_flush_ms, 3),
+            "max_flush_ms": round(self._max_flush_ms, 3),
+            "avg_flush_ms": round(self._total_flush_ms / self._flush_count, 3) if self._flush_count else 0.0,
+        }
+
 logging_service = LoggingService()
@@ -0,0 +1,214 @@
+import asyncio
+import io
+import math
+import threading
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.database import run_db, session_scope
+from app.models import MeterReading
+from app.config import settings, logger
+from app.services.meter_series import meter_series
+
+DEFAULT_MEASURAND = "Energy.Active.Import.Register"
+COLUMNS = ("transaction_id", "timestamp", "measurand", "value", "unit", "phase", "context")
+# What a row of meter_readings holds: the four descriptive strings become one series id
+STORED_COLUMNS = ("transaction_id", "timestamp", "series_id", "value")
+
+class MeterColumns:
+    """MeterValues flattened into one list per meter_readings column."""
+
+    __slots__ = COLUMNS
+
+    def __init__(self):
+        for name in COLUMNS:
+            setattr(self, name, [])
+
+    def __len__(self):
+        return len(self.transaction_id)
+
+    def extend(self, other: "MeterColumns"):
+        for name in COLUMNS:
+            getattr(self, name).extend(getattr(other, name))
+
+    def rows(self) -> list:
+        return [dict(zip(COLUMNS, values)) for values in zip(*(getattr(self, name) for name in COLUMNS))]
+
+    def series_keys(self) -> list:
+        return list(zip(self.measurand, self.unit, self.phase, self.context))
+
+    def stored(self, db: Session) -> list:
+        """Rows in STORED_COLUMNS order, with the series ids resolved (and created if new)."""
+        keys = self.series_keys()
+        ids = meter_series.ids_for(db, keys)
+        return list(zip(self.transaction_id, self.timestamp, [ids[key] for key in keys], self.value))
+
+    def latest_float(self, measurand: str = DEFAULT_MEASURAND, phase: Optional[str] = None) -> Optional[float]:
+        """Last parseable value for a measurand/phase, in payload order."""
+        reading = self.latest_reading(measurand, phase)
+        return reading[1] if reading else None
+
+    def latest_reading(self, measurand: str = DEFAULT_MEASURAND, phase: Optional[str] = None) -> Optional[Tuple[datetime, float]]:
+        """(timestamp, value) of the last value for a measurand/phase, in payload order."""
+        for i in range(len(self) - 1, -1, -1):
+            if self.measurand[i] == measurand and self.phase[i] == phase:
+                return self.timestamp[i], self.value[i]
+        return None
+
+def parse_meter_values(transaction_id: int, meter_values: list) -> MeterColumns:
+    """
+    Flatten a MeterValues payload (snake_case, as delivered by the ocpp lib)
+    into column arrays. Values are parsed to float here, once; ones that
+    aren't finite numbers are dropped.
+    """
+    columns = MeterColumns()
+    tx_col, ts_col, measurand_col, value_col = columns.transaction_id, columns.timestamp, columns.measurand, columns.value
+    unit_col, phase_col, context_col = columns.unit, columns.phase, columns.context
+
+    for mv in meter_values or []:
+        ts = datetime.fromisoformat(mv.get("timestamp").replace("Z", "+00:00"))
+        for sv in mv.get("sampled_value", []):
+            try:
+                value = float(sv.get("value"))
+                if not math.isfinite(value):
+                    raise ValueError(value)
+            except (TypeError, ValueError):
+                logger.warning(f"Dropping non-numeric meter value {sv.get('value')!r} for transaction {transaction_id}")
+                continue
+            tx_col.append(transaction_id)
+            ts_col.append(ts)
+            measurand_col.append(sv.get("measurand", DEFAULT_MEASURAND))
+            value_col.append(value)
+            unit_col.append(sv.get("unit"))
+            phase_col.append(sv.get("phase"))
+            context_col.append(sv.get("context"))
+    return columns
+
+def _copy_escape(value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.isoformat(sep=" ")
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+class MeterReadingWriter:
+    """
+    Writes parsed MeterValues with one COPY (PostgreSQL) or one multi-row
+    INSERT per batch instead of one ORM object per sampled value.
+
+    With a coalesce interval > 0, frames from all stations are buffered and
+    written together every interval, or as soon as METER_BATCH_MAX_ROWS rows
+    are waiting.
+    """
+
+    def __init__(
+        self,
+        coalesce_interval: float = settings.METER_COALESCE_INTERVAL_SECONDS,
+        max_batch_rows: int = settings.METER_BATCH_MAX_ROWS,
+    ):
+        self.coalesce_interval = coalesce_interval
+        self.max_batch_rows = max(1, max_batch_rows)
+        self._pending = MeterColumns()
+        self._lock = threading.Lock()
+        self.running = False
+        self._task = None
+
+    def submit(self, columns: MeterColumns, db: Session = None):
+        """Persist now, or queue for the next coalesced flush. Safe to call from DB worker threads."""
+        if not len(columns):
+            return
+        if self.coalesce_interval <= 0:
+            self.write(columns, db)
+            return
+
+        batch = None
+        with self._lock:
+            self._pending.extend(columns)
+            if len(self._pending) >= self.max_batch_rows:
+                batch, self._pending = self._pending, MeterColumns()
+        if batch is not None:
+            self._write_with_fallback(batch)
+
+    def write(self, columns: MeterColumns, db: Session = None):
+        with session_scope(db) as db:
+            try:
+                if db.bind.dialect.name == "postgresql":
+                    self._copy(db, columns)
+                else:
+                    db.execute(insert(MeterReading), [dict(zip(STORED_COLUMNS, row)) for row in columns.stored(db)])
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+
+    def _copy(self, db: Session, columns: MeterColumns):
+        buffer = io.StringIO()
+        for values in columns.stored(db):
+            buffer.write("\t".join(_copy_escape(v) for v in values))
+            buffer.write("\n")
+        buffer.seek(0)
+
+        raw = db.connection().connection
+        with raw.cursor() as cursor:
+            cursor.copy_expert(f"COPY {MeterReading.__tablename__} ({', '.join(STORED_COLUMNS)}) FROM STDIN", buffer)
+
+    def _write_with_fallback(self, batch: MeterColumns):
+        try:
+            self.write(batch)
+        except Exception as e:
+            # One unknown transaction id must not lose the readings of every other station
+            logger.error(f"Failed to write {len(batch)} coalesced meter readings, retrying per transaction: {e}")
+            by_transaction = {}
+            for i, transaction_id in enumerate(batch.transaction_id):
+                group = by_transaction.setdefault(transaction_id, MeterColumns())
+                for name in COLUMNS:
+                    getattr(group, name).append(getattr(batch, name)[i])
+            for transaction_id, group in by_transaction.items():
+                try:
+                    self.write(group)
+                except Exception as e:
+                    logger.error(f"Dropped {len(group)} meter readings for transaction {transaction_id}: {e}")
+
+    def start(self):
+        if not self.running and self.coalesce_interval > 0:
+            self.running = True
+            self._task = asyncio.create_task(self._loop())
+            logger.info("MeterReadingWriter: Coalescing flusher started.")
+
+    async def stop(self):
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _loop(self):
+        while self.running:
+            try:
+                await asyncio.sleep(self.coalesce_interval)
+                await self.flush()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"MeterReadingWriter error: {e}")
+
+    async def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, MeterColumns()
+        if len(batch):
+            await run_db(self._write_with_fallback, batch)
+
+meter_reading_writer = MeterReadingWriter()
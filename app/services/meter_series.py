@@ -0,0 +1,76 @@
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import MeterSeries
+
+# (measurand, unit, phase, context)
+SeriesKey = Tuple[str, Optional[str], Optional[str], Optional[str]]
+
+class MeterSeriesRegistry:
+    """
+    Process-wide copy of the meter_series dictionary.
+
+    A station reports a handful of distinct measurand/unit/phase/context
+    combinations, so readings store a small series id instead of four
+    strings, and the mapping is kept in memory in both directions. Unknown
+    combinations are inserted in their own committed transaction: an id
+    handed out here must stay valid even if the caller's batch rolls back.
+    """
+
+    def __init__(self):
+        self._ids: Dict[SeriesKey, int] = {}
+        self._keys: Dict[int, SeriesKey] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, db: Session):
+        rows = db.execute(select(MeterSeries.id, MeterSeries.measurand, MeterSeries.unit, MeterSeries.phase, MeterSeries.context)).all()
+        for series_id, *key in rows:
+            self._ids[tuple(key)] = series_id
+            self._keys[series_id] = tuple(key)
+
+    def _create(self, keys: Iterable[SeriesKey]):
+        rows = [dict(zip(("measurand", "unit", "phase", "context"), key)) for key in keys]
+        db = SessionLocal()
+        try:
+            if db.bind.dialect.name == "postgresql":
+                # Another worker may have inserted the same key in the meantime
+                db.execute(postgresql.insert(MeterSeries).values(rows).on_conflict_do_nothing())
+            else:
+                db.execute(insert(MeterSeries), rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def ids_for(self, db: Session, keys: Iterable[SeriesKey]) -> Dict[SeriesKey, int]:
+        """Series id of every key, creating the ones that don't exist yet."""
+        keys = set(keys)
+        missing = keys - self._ids.keys()
+        if missing:
+            with self._lock:
+                self._load(db)
+                missing -= self._ids.keys()
+                if missing:
+                    self._create(missing)
+                    self._load(db)
+        return {key: self._ids[key] for key in keys}
+
+    def keys(self, db: Session, series_ids: Iterable[int]) -> Dict[int, SeriesKey]:
+        """Key of every series id."""
+        series_ids = set(series_ids)
+        if not series_ids <= self._keys.keys():
+            with self._lock:
+                self._load(db)
+        return {series_id: self._keys[series_id] for series_id in series_ids}
+
+    def reset(self):
+        with self._lock:
+            self._ids.clear()
+            self._keys.clear()
+
+meter_series = MeterSeriesRegistry()
@@ -0,0 +1,189 @@
+import sys
+from array import array
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import delete, exists, insert, select
+from sqlalchemy.orm import Session
+from app.database import session_scope
+from app.models import ChargingSession, MeterReading, MeterReadingArchive
+from app.config import settings, logger
+from app.services.meter_series import meter_series
+from app.services.downsampling import minmax_indices
+
+EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+def _to_micros(ts: datetime) -> int:
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return (ts - EPOCH) // _MICROSECOND
+
+def _little_endian(values: array) -> array:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+def pack_timestamps(micros: Sequence[int]) -> bytes:
+    """
+    Microseconds since the epoch as little-endian int64 deltas, the first
+    one relative to the epoch. Regular sampling makes the deltas repeat,
+    which the TOAST compression of the bytea column then squeezes out.
+    """
+    deltas = array("q", [b - a for a, b in zip([0, *micros], micros)])
+    return _little_endian(deltas).tobytes()
+
+def unpack_timestamps(data: bytes) -> array:
+    deltas = array("q")
+    deltas.frombytes(data)
+    return array("q", accumulate(_little_endian(deltas)))
+
+def pack_values(values: Sequence[float]) -> bytes:
+    return _little_endian(array("d", values)).tobytes()
+
+def unpack_values(data: bytes) -> array:
+    values = array("d")
+    values.frombytes(data)
+    return _little_endian(values)
+
+@dataclass
+class ReadingSeries:
+    """One measurand/unit/phase/context series of a session, in time order."""
+    measurand: str
+    unit: Optional[str]
+    phase: Optional[str]
+    context: Optional[str]
+    micros: Sequence[int]  # int64 microseconds since the epoch (UTC)
+    values: Sequence[float]  # float64
+
+    def timestamps(self) -> List[datetime]:
+        return np.asarray(self.micros, dtype=np.int64).astype("datetime64[us]").tolist()
+
+    def downsampled(self, max_points: int) -> "ReadingSeries":
+        """At most max_points samples, keeping each stretch's extremes (see minmax_indices)."""
+        if len(self) <= max_points:
+            return self
+        values = np.asarray(self.values, dtype=np.float64)
+        keep = minmax_indices(values, max_points)
+        return replace(self, micros=np.asarray(self.micros, dtype=np.int64)[keep], values=values[keep])
+
+    def __len__(self):
+        return len(self.values)
+
+class MeterStore:
+    """
+    Reads of a session's meter readings, and the compaction of closed
+    sessions into meter_reading_archives.
+
+    Open sessions keep one narrow row per sampled value, which is what
+    ingestion appends to. Once a session has been closed for
+    METER_ARCHIVE_AFTER_HOURS, its rows are packed into one archive row per
+    series (two binary arrays) and deleted. Reads merge both forms, so late
+    MeterValues that arrive after the session was archived are not lost;
+    the next compaction run folds them in.
+    """
+
+    def __init__(self, archive_after_hours: float = settings.METER_ARCHIVE_AFTER_HOURS, batch_sessions: int = settings.METER_ARCHIVE_BATCH_SESSIONS):
+        self.archive_after_hours = archive_after_hours
+        self.batch_sessions = batch_sessions
+
+    @staticmethod
+    def _merge(db: Session, transaction_id: int, raw: list) -> Dict[int, Tuple[array, array]]:
+        """The session's archived samples per series id, with raw (series_id, timestamp, value) rows appended."""
+        parts: Dict[int, Tuple[array, array]] = {}
+        archived = db.execute(
+            select(MeterReadingArchive.series_id, MeterReadingArchive.timestamp_data, MeterReadingArchive.value_data)
+            .where(MeterReadingArchive.transaction_id == transaction_id)
+        )
+        for series_id, timestamp_data, value_data in archived:
+            parts[series_id] = (unpack_timestamps(timestamp_data), unpack_values(value_data))
+
+        archived_ids = set(parts)
+        for series_id, ts, value in raw:
+            micros, values = parts.setdefault(series_id, (array("q"), array("d")))
+            micros.append(_to_micros(ts))
+            values.append(value)
+
+        # Late rows can be older than the end of the archive they were appended to
+        for series_id in archived_ids & {series_id for series_id, _, _ in raw}:
+            micros, values = parts[series_id]
+            if any(a > b for a, b in zip(micros, micros[1:])):
+                ordered = sorted(zip(micros, values), key=lambda sample: sample[0])
+                parts[series_id] = (array("q", [m for m, _ in ordered]), array("d", [v for _, v in ordered]))
+        return parts
+
+    def series(self, db: Session, transaction_id: int) -> List[ReadingSeries]:
+        """Every series of a session, each in time order."""
+        raw = db.execute(
+            select(MeterReading.series_id, MeterReading.timestamp, MeterReading.value)
+            .where(MeterReading.transaction_id == transaction_id)
+            .order_by(MeterReading.timestamp, MeterReading.id)
+        ).all()
+        parts = self._merge(db, transaction_id, raw)
+        keys = meter_series.keys(db, parts)
+        return [
+            ReadingSeries(*keys[series_id], micros, values)
+            for series_id, (micros, values) in sorted(parts.items())
+        ]
+
+    def archive_session(self, db: Session, transaction_id: int) -> int:
+        """Pack a session's raw rows into its archive. Returns the number of rows packed; the caller commits."""
+        # Exactly the rows deleted get archived, even if a late reading is being inserted concurrently
+        deleted = db.execute(
+            delete(MeterReading)
+            .where(MeterReading.transaction_id == transaction_id)
+            .returning(MeterReading.id, MeterReading.series_id, MeterReading.timestamp, MeterReading.value)
+        ).all()
+        if not deleted:
+            return 0
+        raw = [(series_id, ts, value) for _, series_id, ts, value in sorted(deleted, key=lambda row: (row[2], row[0]))]
+        parts = self._merge(db, transaction_id, raw)
+
+        db.execute(delete(MeterReadingArchive).where(MeterReadingArchive.transaction_id == transaction_id))
+        db.execute(insert(MeterReadingArchive), [
+            {
+                "transaction_id": transaction_id,
+                "series_id": series_id,
+                "sample_count": len(values),
+                "first_timestamp": EPOCH + timedelta(microseconds=micros[0]),
+                "last_timestamp": EPOCH + timedelta(microseconds=micros[-1]),
+                "timestamp_data": pack_timestamps(micros),
+                "value_data": pack_values(values),
+            }
+            for series_id, (micros, values) in parts.items()
+        ])
+        return len(deleted)
+
+    def archive_closed(self, db: Session = None, now: datetime = None) -> int:
+        """Scheduled job: archive up to batch_sessions sessions closed long enough ago. Returns the number archived."""
+        if self.archive_after_hours <= 0:
+            return 0
+        with session_scope(db) as db:
+            now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+            cutoff = now - timedelta(hours=self.archive_after_hours)
+            transaction_ids = db.execute(
+                select(ChargingSession.transaction_id)
+                .where(
+                    ChargingSession.end_time < cutoff,
+                    exists().where(MeterReading.transaction_id == ChargingSession.transaction_id),
+                )
+                .limit(self.batch_sessions)
+            ).scalars().all()
+
+            archived = 0
+            for transaction_id in transaction_ids:
+                try:
+                    self.archive_session(db, transaction_id)
+                    db.commit()
+                    archived += 1
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"MeterStore: Failed to archive readings of transaction {transaction_id}: {e}")
+            if archived:
+                logger.info(f"MeterStore: Archived the readings of {archived} closed sessions")
+            return archived
+
+meter_store = MeterStore()
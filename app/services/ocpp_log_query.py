@@ -0,0 +1,128 @@
+import base64
+import csv
+import io
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+from app.models import OcppMessageLog
+
+# Rows fetched per round trip from the server-side cursor while exporting
+EXPORT_YIELD_PER = 1000
+
+EXPORT_COLUMNS = ("id", "timestamp", "direction", "message_type", "action", "payload")
+
+class InvalidCursor(ValueError):
+    pass
+
+@dataclass(frozen=True)
+class OcppLogFilter:
+    station_id: str
+    action: Optional[str] = None
+    direction: Optional[str] = None
+    message_type: Optional[str] = None
+    since: Optional[datetime] = None  # inclusive
+    until: Optional[datetime] = None  # exclusive
+
+    @staticmethod
+    def day_range(date: str) -> Tuple[datetime, datetime]:
+        """[start, end) of a YYYY-MM-DD day. Raises ValueError for anything else."""
+        start = datetime.combine(datetime.strptime(date, "%Y-%m-%d").date(), datetime.min.time())
+        return start, start + timedelta(days=1)
+
+def encode_cursor(timestamp: datetime, log_id: int) -> str:
+    raw = f"{timestamp.isoformat()}|{log_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, log_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(log_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+
+class OcppLogQueryService:
+    """
+    Reads of the OCPP message log for one station.
+
+    Pages are keyset-paginated on (timestamp, id), newest first, so every
+    page costs the same no matter how deep the client has scrolled. Exports
+    stream oldest first from a server-side cursor, so memory stays flat
+    regardless of the time range.
+    """
+
+    @staticmethod
+    def _select(filters: OcppLogFilter):
+        query = select(OcppMessageLog).where(OcppMessageLog.station_id == filters.station_id)
+        if filters.action:
+            query = query.where(OcppMessageLog.action == filters.action)
+        if filters.direction:
+            query = query.where(OcppMessageLog.direction == filters.direction)
+        if filters.message_type:
+            query = query.where(OcppMessageLog.message_type == filters.message_type)
+        if filters.since:
+            query = query.where(OcppMessageLog.timestamp >= filters.since)
+        if filters.until:
+            query = query.where(OcppMessageLog.timestamp < filters.until)
+        return query
+
+    def page(self, db: Session, filters: OcppLogFilter, limit: int, cursor: Optional[str] = None) -> Tuple[List[OcppMessageLog], Optional[str]]:
+        """Up to `limit` rows older than the cursor, plus the cursor for the next page (None on the last one)."""
+        query = self._select(filters)
+        if cursor:
+            timestamp, log_id = decode_cursor(cursor)
+            query = query.where(tuple_(OcppMessageLog.timestamp, OcppMessageLog.id) < tuple_(timestamp, log_id))
+        query = query.order_by(OcppMessageLog.timestamp.desc(), OcppMessageLog.id.desc()).limit(limit + 1)
+
+        rows = db.execute(query).scalars().all()
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].timestamp, rows[-1].id)
+
+    def iter_batches(self, db: Session, filters: OcppLogFilter, yield_per: int = EXPORT_YIELD_PER) -> Iterator[List[dict]]:
+        """Matching rows oldest first, as dicts, `yield_per` at a time from a server-side cursor."""
+        query = self._select(filters).order_by(OcppMessageLog.timestamp, OcppMessageLog.id)
+        result = db.execute(query.execution_options(yield_per=yield_per))
+        try:
+            for partition in result.scalars().partitions():
+                yield [self._as_dict(log) for log in partition]
+                # Already handed out; don't let the identity map grow with the export
+                db.expunge_all()
+        finally:
+            result.close()
+
+    @staticmethod
+    def _as_dict(log: OcppMessageLog) -> dict:
+        return {
+            "id": log.id,
+            "timestamp": log.timestamp.isoformat() if log.timestamp else None,
+            "direction": log.direction,
+            "message_type": log.message_type,
+            "action": log.action,
+            "payload": log.payload,
+        }
+
+    def export_ndjson(self, db: Session, filters: OcppLogFilter, yield_per: int = EXPORT_YIELD_PER) -> Iterator[str]:
+        for batch in self.iter_batches(db, filters, yield_per):
+            yield "".join(json.dumps(row, default=str) + "\n" for row in batch)
+
+    def export_csv(self, db: Session, filters: OcppLogFilter, yield_per: int = EXPORT_YIELD_PER) -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        for batch in self.iter_batches(db, filters, yield_per):
+            for row in batch:
+                row["payload"] = json.dumps(row["payload"], default=str)
+                writer.writerow([row[name] for name in EXPORT_COLUMNS])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        # Header only, for an empty range
+        if buffer.tell():
+            yield buffer.getvalue()
+
+ocpp_log_query = OcppLogQueryService()
@@ -0,0 +1,146 @@
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
+from sqlalchemy.orm import Session
+from app.models import ChargingSession, AuthorizationToken, Renter
+from app.config import logger
+
+@dataclass
+class PrepaidAccount:
+    """Live accounting for one open prepaid transaction."""
+    transaction_id: int
+    renter_id: int
+    meter_start_wh: float
+    consumed_kwh: float = 0.0
+    stop_requested: bool = False
+
+# Cached marker for "open transaction that isn't billed against a prepaid balance"
+_UNTRACKED = object()
+
+class PrepaidEngine:
+    """
+    In-memory prepaid balance enforcement.
+
+    The renter balance and the session's meter_start are loaded once when the
+    transaction starts; every energy sample afterwards is a dictionary lookup
+    and a subtraction. Consumption is summed per renter, so two sessions on
+    the same balance cannot each spend all of it.
+
+    Balances are reconciled with the DB whenever they change there: on
+    StopTransaction (after the deduction is committed) and on top-up.
+    """
+
+    def __init__(self):
+        self._accounts: Dict[int, object] = {}
+        self._balances: Dict[int, float] = {}
+        self._in_flight: Dict[int, float] = {}
+        self._by_renter: Dict[int, Set[int]] = {}
+        self._lock = threading.Lock()
+
+    def open(self, transaction_id: int, renter_id: int, meter_start_wh: float, balance_kwh: float):
+        with self._lock:
+            self._accounts[transaction_id] = PrepaidAccount(transaction_id, renter_id, meter_start_wh)
+            self._balances[renter_id] = balance_kwh
+            self._by_renter.setdefault(renter_id, set()).add(transaction_id)
+            self._in_flight.setdefault(renter_id, 0.0)
+
+    def is_tracked(self, transaction_id: int) -> bool:
+        return transaction_id in self._accounts
+
+    def evaluate(self, transaction_id: int, meter_wh: float) -> bool:
+        """
+        Apply an energy register sample. Returns True exactly once per
+        transaction: when the renter's in-flight consumption reaches the balance.
+        """
+        with self._lock:
+            account = self._accounts.get(transaction_id)
+            if account is None or account is _UNTRACKED:
+                return False
+
+            consumed_kwh = max(0.0, (meter_wh - account.meter_start_wh) / 1000.0)
+            if consumed_kwh < account.consumed_kwh:
+                # Out-of-order sample; the register only counts up
+                return False
+            renter_id = account.renter_id
+            self._in_flight[renter_id] += consumed_kwh - account.consumed_kwh
+            account.consumed_kwh = consumed_kwh
+
+            if account.stop_requested or consumed_kwh <= 0:
+                return False
+            balance = self._balances.get(renter_id, 0.0)
+            if self._in_flight[renter_id] >= balance:
+                account.stop_requested = True
+                logger.warning(
+                    f"Prepaid balance exceeded for transaction {transaction_id}. "
+                    f"Consumed {self._in_flight[renter_id]:.3f} kWh, Balance {balance} kWh. Triggering RemoteStop."
+                )
+                return True
+            return False
+
+    def rearm(self, transaction_id: int):
+        """Allow another stop command, e.g. after the charger rejected the first one."""
+        with self._lock:
+            account = self._accounts.get(transaction_id)
+            if isinstance(account, PrepaidAccount):
+                account.stop_requested = False
+
+    def close(self, transaction_id: int, balance_kwh: Optional[float] = None):
+        """Forget a finished transaction; pass the renter's balance as committed by StopTransaction."""
+        with self._lock:
+            account = self._accounts.pop(transaction_id, None)
+            if not isinstance(account, PrepaidAccount):
+                return
+            renter_id = account.renter_id
+            self._in_flight[renter_id] -= account.consumed_kwh
+            transactions = self._by_renter.get(renter_id)
+            if transactions is not None:
+                transactions.discard(transaction_id)
+            if not transactions:
+                self._by_renter.pop(renter_id, None)
+                self._in_flight.pop(renter_id, None)
+                self._balances.pop(renter_id, None)
+            elif balance_kwh is not None:
+                self._balances[renter_id] = balance_kwh
+
+    def set_balance(self, renter_id: int, balance_kwh: float):
+        """Reconcile after a top-up. Re-arms stops that the new balance covers."""
+        with self._lock:
+            if renter_id not in self._by_renter:
+                return
+            self._balances[renter_id] = balance_kwh
+            if self._in_flight[renter_id] < balance_kwh:
+                for transaction_id in self._by_renter[renter_id]:
+                    self._accounts[transaction_id].stop_requested = False
+
+    def load(self, db: Session, transaction_id: int):
+        """
+        Start tracking an open transaction that began before this process did
+        (or before prepaid mode was switched on). Loaded once per transaction.
+        """
+        session = db.query(ChargingSession).filter(
+            ChargingSession.transaction_id == transaction_id,
+            ChargingSession.end_time == None
+        ).first()
+        renter = None
+        if session and session.token_id:
+            token = db.query(AuthorizationToken).filter(AuthorizationToken.token == session.token_id).first()
+            if token and token.renter_id:
+                renter = db.query(Renter).filter(Renter.id == token.renter_id).first()
+
+        if session is None:
+            # Already stopped (a late frame processed after StopTransaction); nothing to enforce
+            return
+        if renter is None:
+            with self._lock:
+                self._accounts[transaction_id] = _UNTRACKED
+            return
+        self.open(transaction_id, renter.id, session.meter_start, renter.prepaid_balance_kwh)
+
+    def clear(self):
+        with self._lock:
+            self._accounts.clear()
+            self._balances.clear()
+            self._in_flight.clear()
+            self._by_renter.clear()
+
+prepaid_engine = PrepaidEngine()
@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+from typing import Dict, Optional
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, session_scope
+from app.models import ChargingStation
+from app.config import logger
+
+@dataclass(frozen=True)
+class StationMeta:
+    id: str
+    kiosk_mode: bool = False
+    vendor: Optional[str] = None
+    model: Optional[str] = None
+
+    @classmethod
+    def from_model(cls, station: ChargingStation) -> "StationMeta":
+        return cls(
+            id=station.id,
+            kiosk_mode=bool(station.kiosk_mode),
+            vendor=station.vendor,
+            model=station.model,
+        )
+
+# Cached marker for "looked up, no such station"
+_MISSING = object()
+
+class StationCache:
+    """
+    Process-wide cache of station metadata keyed by charge point id.
+
+    Warmed at startup, refreshed on BootNotification and invalidated by the
+    admin charger endpoints. Unknown ids are cached as missing so repeated
+    lookups for them don't hit the DB either.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, object] = {}
+
+    def warm(self):
+        db: Session = SessionLocal()
+        try:
+            stations = db.query(ChargingStation).all()
+            self._entries = {s.id: StationMeta.from_model(s) for s in stations}
+            logger.info(f"StationCache: Warmed with {len(stations)} stations.")
+        finally:
+            db.close()
+
+    def get(self, charger_id: str, db: Session = None) -> Optional[StationMeta]:
+        """Return the cached metadata, loading it from the DB on a miss. None if the station doesn't exist."""
+        entry = self._entries.get(charger_id)
+        if entry is None:
+            entry = self._load(charger_id, db)
+        return None if entry is _MISSING else entry
+
+    def exists(self, charger_id: str, db: Session = None) -> bool:
+        return self.get(charger_id, db) is not None
+
+    def put(self, meta: StationMeta):
+        self._entries[meta.id] = meta
+
+    def invalidate(self, charger_id: str):
+        self._entries.pop(charger_id, None)
+
+    def _load(self, charger_id: str, db: Session = None):
+        with session_scope(db) as db:
+            station = db.query(ChargingStation).filter(ChargingStation.id == charger_id).first()
+            entry = StationMeta.from_model(station) if station else _MISSING
+            self._entries[charger_id] = entry
+            return entry
+
+station_cache = StationCache()
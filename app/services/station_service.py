@@ -1,12 +1,18 @@
 from datetime import datetime, timezone
 from sqlalchemy.orm import Session
-from app.database import get_db, SessionLocal
+from app.database import get_db, SessionLocal, run_db
 from app.models import ChargingStation, BootLog, StationConnector, ChargingStationStatus
 from app.config import logger
+from app.services.last_seen_tracker import last_seen_tracker
+from app.services.station_cache import station_cache, StationMeta
+from app.services.fleet_state import fleet_state
 
 class StationService:
     
     async def process_boot(self, charger_id: str, vendor: str, model: str, firmware_version: str = None, **kwargs):
+        return await run_db(self._process_boot, charger_id, vendor, model, firmware_version)
+
+    def _process_boot(self, charger_id: str, vendor: str, model: str, firmware_version: str = None):
         """
         Handle BootNotification:
         1. Log the boot attempt.
@@ -43,7 +49,10 @@ class StationService:
                 station.vendor = vendor
                 station.firmware_version = firmware_version
             
+            meta = StationMeta.from_model(station)
             db.commit() # Commit station first
+            station_cache.put(meta)
+            fleet_state.station_booted(charger_id, vendor, model, firmware_version)
 
             db.add(boot_log)
             db.commit()
@@ -60,34 +69,17 @@ class StationService:
             db.close()
 
     async def heartbeat(self, charger_id: str, **kwargs):
-        db: Session = SessionLocal()
-        try:
-            station = db.query(ChargingStation).filter(ChargingStation.id == charger_id).first()
-            if station:
-                now = datetime.now(timezone.utc)
-                station.last_heartbeat = now
-                station.last_seen = now
-                station.is_online = True
-                db.commit()
-            
-            return {"current_time": datetime.now(timezone.utc).isoformat()}
-        finally:
-            db.close()
+        # Coalesced in memory, written out in bulk by the tracker
+        last_seen_tracker.touch(charger_id, heartbeat=True)
+        return {"current_time": datetime.now(timezone.utc).isoformat()}
 
     async def update_last_seen(self, charger_id: str):
-        db: Session = SessionLocal()
-        try:
-            station = db.query(ChargingStation).filter(ChargingStation.id == charger_id).first()
-            if station:
-                station.last_seen = datetime.now(timezone.utc)
-                station.is_online = True
-                db.commit()
-        except Exception as e:
-            logger.error(f"Error updating last_seen for {charger_id}: {e}")
-        finally:
-            db.close()
+        last_seen_tracker.touch(charger_id)
 
     async def handle_status_notification(self, charger_id: str, connector_id: int, status: str, error_code: str, **kwargs):
+        await run_db(self._handle_status_notification, charger_id, connector_id, status, error_code)
+
+    def _handle_status_notification(self, charger_id: str, connector_id: int, status: str, error_code: str):
         db: Session = SessionLocal()
         try:
             # Upsert Connector
@@ -108,22 +100,33 @@ class StationService:
             connector.last_updated = datetime.now(timezone.utc)
             
             db.commit()
+            fleet_state.set_connector_status(charger_id, connector_id, status)
         except Exception as e:
             logger.error(f"Error updating status for {charger_id}:{connector_id}: {e}")
         finally:
             db.close()
 
     async def set_station_online(self, charger_id: str):
+        await run_db(self._set_station_online, charger_id)
+
+    def _set_station_online(self, charger_id: str):
         db: Session = SessionLocal()
         try:
-            station = db.query(ChargingStation).filter(ChargingStation.id == charger_id).first()
-            if not station:
+            updated = 0
+            if station_cache.exists(charger_id, db):
+                updated = db.query(ChargingStation).filter(ChargingStation.id == charger_id).update(
+                    {ChargingStation.is_online: True},
+                    synchronize_session=False
+                )
+            if not updated:
                 logger.info(f"Station {charger_id} connected but not found in DB. Creating placeholder.")
                 station = ChargingStation(id=charger_id, is_online=True)
                 db.add(station)
+                db.commit()
+                station_cache.put(StationMeta(id=charger_id))
             else:
-                station.is_online = True
-            db.commit()
+                db.commit()
+            fleet_state.set_online(charger_id)
             logger.info(f"Station {charger_id} marked as ONLINE")
         except Exception as e:
             logger.error(f"Error marking station {charger_id} online: {e}")
@@ -131,11 +134,16 @@ class StationService:
             db.close()
 
     async def set_station_offline(self, charger_id: str):
+        await run_db(self._set_station_offline, charger_id)
+
+    def _set_station_offline(self, charger_id: str):
         db: Session = SessionLocal()
         try:
-            station = db.query(ChargingStation).filter(ChargingStation.id == charger_id).first()
-            if station:
-                station.is_online = False
+            if station_cache.exists(charger_id, db):
+                db.query(ChargingStation).filter(ChargingStation.id == charger_id).update(
+                    {ChargingStation.is_online: False},
+                    synchronize_session=False
+                )
                 
                 # Update connectors to Unknown
                 db.query(StationConnector).filter(
@@ -146,6 +154,7 @@ class StationService:
                 )
                 
                 db.commit()
+                fleet_state.set_offline([charger_id])
                 logger.info(f"Station {charger_id} marked as OFFLINE (Connectors: Unknown)")
         except Exception as e:
             logger.error(f"Error marking station {charger_id} offline: {e}")
@@ -154,10 +163,16 @@ class StationService:
             db.close()
 
     async def has_unknown_connector_status(self, charger_id: str) -> bool:
+        return await run_db(self._has_unknown_connector_status, charger_id)
+
+    def _has_unknown_connector_status(self, charger_id: str) -> bool:
         """
         Check if the station has any connectors with Unknown status, 
         or if it has no connectors registered at all.
         """
+        if fleet_state.ready:
+            return fleet_state.has_unknown_connector_status(charger_id)
+
         db: Session = SessionLocal()
         try:
             connectors = db.query(StationConnector).filter(
@@ -180,6 +195,9 @@ class StationService:
             db.close()
 
     async def sync_active_stations(self, active_ids: list[str]):
+        await run_db(self._sync_active_stations, active_ids)
+
+    def _sync_active_stations(self, active_ids: list[str]):
         db: Session = SessionLocal()
         try:
             # 1. Handle "Stuck Online" Stations
@@ -209,6 +227,7 @@ class StationService:
                 )
                 
                 db.commit()
+                fleet_state.set_offline(station_ids_to_offline)
                 logger.info(f"Watchdog: Forcefully set {len(station_ids_to_offline)} stuck stations to OFFLINE (Connectors: Unknown).")
             else:
                 logger.debug("Watchdog: No stuck stations found.")
@@ -232,6 +251,7 @@ class StationService:
             
             if updated_connectors_count > 0:
                 db.commit()
+                fleet_state.clear_offline_connectors()
                 logger.info(f"Watchdog: Fixed {updated_connectors_count} connectors with known status on OFFLINE stations.")
                 
         except Exception as e:
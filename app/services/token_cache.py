@@ -0,0 +1,143 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from sqlalchemy.dialects.postgresql import insert
+from app.database import SessionLocal, run_db
+from app.models import AuthorizationToken, AuthorizationStatus
+from app.config import settings, logger
+
+@dataclass(frozen=True)
+class TokenInfo:
+    token: str
+    status: AuthorizationStatus
+    expiry_date: Optional[datetime] = None
+    renter_id: Optional[int] = None
+
+    @classmethod
+    def from_model(cls, token: AuthorizationToken) -> "TokenInfo":
+        return cls(
+            token=token.token,
+            status=token.status,
+            expiry_date=token.expiry_date,
+            renter_id=token.renter_id,
+        )
+
+class TokenCache:
+    """
+    TTL cache of authorization token status.
+
+    Tags that don't exist are cached negatively (with a shorter TTL) and
+    queued once for persistence as "Unknown"; the queue is written with a
+    single INSERT ... ON CONFLICT DO NOTHING per flush interval, so a stuck
+    RFID reader no longer produces one INSERT per attempt.
+    """
+
+    def __init__(
+        self,
+        ttl: float = settings.TOKEN_CACHE_TTL_SECONDS,
+        negative_ttl: float = settings.TOKEN_NEGATIVE_CACHE_TTL_SECONDS,
+        flush_interval: float = settings.UNKNOWN_TOKEN_FLUSH_INTERVAL_SECONDS,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.flush_interval = flush_interval
+        self._entries: Dict[str, Tuple[float, Optional[TokenInfo]]] = {}
+        self._pending_unknown: set[str] = set()
+        self._generation = 0
+        self.running = False
+        self._task = None
+
+    def lookup(self, id_tag: str) -> Tuple[bool, Optional[TokenInfo]]:
+        """Returns (hit, info). On a hit, info is None for tags known not to exist."""
+        entry = self._entries.get(id_tag)
+        if entry is None:
+            return False, None
+        expires_at, info = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(id_tag, None)
+            return False, None
+        return True, info
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def store(self, id_tag: str, info: Optional[TokenInfo], generation: int = None):
+        """
+        Cache a DB lookup. Pass the generation read before the query so a
+        result that raced with an admin invalidation is discarded.
+        """
+        if generation is not None and generation != self._generation:
+            return
+        ttl = self.ttl if info is not None else self.negative_ttl
+        self._entries[id_tag] = (time.monotonic() + ttl, info)
+
+    def record_unknown(self, id_tag: str) -> bool:
+        """Queue an unseen tag for persistence. Returns False if it was already queued."""
+        if id_tag in self._pending_unknown:
+            return False
+        self._pending_unknown.add(id_tag)
+        return True
+
+    def invalidate(self, id_tag: str):
+        self._generation += 1
+        self._entries.pop(id_tag, None)
+        self._pending_unknown.discard(id_tag)
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self._task = asyncio.create_task(self._loop())
+            logger.info("TokenCache: Unknown-token flusher started.")
+
+    async def stop(self):
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _loop(self):
+        while self.running:
+            try:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"TokenCache flusher error: {e}")
+
+    async def flush(self):
+        if not self._pending_unknown:
+            return
+        pending, self._pending_unknown = self._pending_unknown, set()
+        try:
+            await run_db(self._write_unknown, sorted(pending))
+        except Exception as e:
+            logger.error(f"TokenCache: Failed to persist {len(pending)} unknown tokens: {e}")
+            self._pending_unknown.update(pending)
+
+    def _write_unknown(self, tags: list):
+        stmt = insert(AuthorizationToken).values([
+            {"token": tag, "status": AuthorizationStatus.Unknown, "description": "Auto-created unknown token"}
+            for tag in tags
+        ]).on_conflict_do_nothing(index_elements=["token"])
+
+        db = SessionLocal()
+        try:
+            db.execute(stmt)
+            db.commit()
+            logger.info(f"TokenCache: Saved {len(tags)} unknown tokens.")
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+token_cache = TokenCache()
@@ -0,0 +1,35 @@
+import threading
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models import transaction_id_seq, TRANSACTION_ID_BLOCK_SIZE, TRANSACTION_ID_MAX
+from app.config import logger
+
+class TransactionIdAllocator:
+    """
+    Hands out OCPP transaction ids from blocks reserved with one nextval() on
+    ocpp_transaction_id_seq. The sequence increments by the block size, so
+    blocks never overlap between processes, and only one StartTransaction
+    per block pays for the extra round trip.
+
+    Ids of a block that is still unused when the process exits are skipped,
+    never reused.
+    """
+
+    def __init__(self, block_size: int = TRANSACTION_ID_BLOCK_SIZE):
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def allocate(self, db: Session) -> int:
+        with self._lock:
+            if self._next >= self._end:
+                start = db.execute(select(transaction_id_seq.next_value())).scalar_one()
+                self._next = start
+                self._end = min(start + self.block_size, TRANSACTION_ID_MAX + 1)
+                logger.info(f"TransactionIdAllocator: Reserved ids {start}-{self._end - 1}")
+            transaction_id = self._next
+            self._next += 1
+            return transaction_id
+
+transaction_id_allocator = TransactionIdAllocator()
@@ -1,9 +1,17 @@
 from datetime import datetime
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
-from app.models import ChargingSession, MeterReading, AuthorizationToken, ChargingStation, BillingSettings, BillingMode, Renter, PrepaidTransaction, PrepaidTransactionType
+from app.database import SessionLocal, run_db
+from app.models import ChargingSession, AuthorizationToken, ChargingStation, BillingMode, Renter, PrepaidTransaction, PrepaidTransactionType
 from app.config import logger
 from app.services.events import event_bus, Events
+from app.services.station_cache import station_cache
+from app.services.token_cache import token_cache
+from app.services.billing_settings_cache import billing_settings_cache
+from app.services.meter_ingest import parse_meter_values, meter_reading_writer, MeterColumns, DEFAULT_MEASURAND
+from app.services.prepaid_engine import prepaid_engine
+from app.services.transaction_ids import transaction_id_allocator
+from app.services.fleet_state import fleet_state, SessionView
+from app.services.energy_rollups import energy_rollups
 
 class TransactionService:
     
@@ -12,6 +20,9 @@ class TransactionService:
         pass
 
     async def start_transaction(self, charger_id: str, connector_id: int, id_tag: str, meter_start: int, timestamp: str, **kwargs):
+        return await run_db(self._start_transaction, charger_id, connector_id, id_tag, meter_start, timestamp)
+
+    def _start_transaction(self, charger_id: str, connector_id: int, id_tag: str, meter_start: int, timestamp: str):
         """
         Handle StartTransaction:
         1. Validate token (again, usually).
@@ -22,8 +33,8 @@ class TransactionService:
         try:
             # Check Kiosk Mode
             kiosk_mode_enabled = False
-            station = db.query(ChargingStation).filter(ChargingStation.id == charger_id).first()
-            if station and getattr(station, "kiosk_mode", False):
+            station = station_cache.get(charger_id, db)
+            if station and station.kiosk_mode:
                 kiosk_mode_enabled = True
                 
             # Check Token
@@ -43,34 +54,33 @@ class TransactionService:
                  db.add(token)
                  db.commit()
                  db.refresh(token)
+                 token_cache.invalidate(id_tag)
             
             # Check Prepaid Balance
             renter = None
             if token and token.renter_id:
                 renter = db.query(Renter).filter(Renter.id == token.renter_id).first()
 
-            billing_settings = db.query(BillingSettings).first()
+            prepaid = False
+            billing_settings = billing_settings_cache.get(db)
             if billing_settings and billing_settings.billing_mode == BillingMode.Prepaid:
                 if renter and renter.prepaid_balance_kwh <= 0:
                     logger.warning(f"StartTransaction rejected for {id_tag}: Prepaid balance is {renter.prepaid_balance_kwh} kWh.")
                     return {"transaction_id": 0, "id_tag_info": {"status": "Blocked"}}
+                prepaid = renter is not None
             
             # Create Session
-            # We assume unique transaction_id comes from station or we generate one?
             # OCPP 1.6: Central System generates TransactionId (integer).
-            
-            # Simple Auto-Increment via DB or explicit
             ts = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
             
-            # We need to construct the object first to flush and get ID? 
-            # Or use a sequence. Let's rely on DB auto-increment for internal ID, but return that as transactionID.
-            
             # We already fetched renter above if available
             renter_name = None
             renter_email = None
             if renter:
                 renter_name = renter.name
                 renter_email = renter.contact_email
+                renter_id = renter.id
+                balance_kwh = renter.prepaid_balance_kwh
 
             session = ChargingSession(
                 station_id=charger_id,
@@ -78,24 +88,25 @@ class TransactionService:
                 token_snapshot=id_tag,
                 renter_name_snapshot=renter_name,
                 renter_email_snapshot=renter_email,
-                # generate a random int for unique constraints if needed, or use DB ID after flush
-                transaction_id=0, # Placeholder, will update after flush if possible or use sequence
+                transaction_id=transaction_id_allocator.allocate(db),
                 connector_id=connector_id,
                 start_time=ts,
                 meter_start=meter_start,
                 total_energy_kwh=0.0
             )
-            # Find a way to generate unique TransactionID safe for OCPP (integer)
-            # Doing a quick search for max id
-            
-            # A cheat: Commit first empty to get ID? No, Constraints.
-            # Use timestamp based integer?
-            import time
-            session.transaction_id = int(time.time() * 1000) % 2147483647 
-
             db.add(session)
             db.commit()
             db.refresh(session)
+
+            if prepaid:
+                prepaid_engine.open(session.transaction_id, renter_id, meter_start, balance_kwh)
+            fleet_state.session_started(charger_id, SessionView(
+                transaction_id=session.transaction_id,
+                connector_id=connector_id,
+                start_time=ts,
+                meter_start=meter_start,
+                renter_name=renter_name or "Unknown",
+            ))
             
             logger.info(f"Started transaction {session.transaction_id} on {charger_id}/{connector_id}")
             
@@ -111,6 +122,9 @@ class TransactionService:
             db.close()
 
     async def stop_transaction(self, charger_id: str, meter_stop: int, timestamp: str, transaction_id: int, reason: str = None, **kwargs):
+        return await run_db(self._stop_transaction, charger_id, meter_stop, timestamp, transaction_id, reason)
+
+    def _stop_transaction(self, charger_id: str, meter_stop: int, timestamp: str, transaction_id: int, reason: str = None):
         """
         Handle StopTransaction:
         1. Find session.
@@ -124,18 +138,22 @@ class TransactionService:
                 logger.warning(f"StopTransaction for unknown ID: {transaction_id}")
                 return {"id_tag_info": {"status": "Expired"}} # Return generic info
             
+            # A repeated StopTransaction only corrects what the first one counted
+            previous_kwh = session.total_energy_kwh if session.end_time is not None else None
+
             ts = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
             session.end_time = ts
             session.meter_stop = meter_stop
             session.stop_reason = reason
             
             # Calculate Energy & Deduct if Prepaid
+            balance_kwh = None
             if meter_stop >= session.meter_start:
                 consumed_wh = meter_stop - session.meter_start
                 session.total_energy_kwh = consumed_wh / 1000.0
 
                 # Preheat Deduction if Prepaid
-                billing_settings = db.query(BillingSettings).first()
+                billing_settings = billing_settings_cache.get(db)
                 if billing_settings and billing_settings.billing_mode == BillingMode.Prepaid and session.total_energy_kwh > 0:
                     # Need renter to deduct
                     token = db.query(AuthorizationToken).filter(AuthorizationToken.token == session.token_id).first()
@@ -144,6 +162,7 @@ class TransactionService:
                         if renter:
                             # Deduct balance
                             renter.prepaid_balance_kwh -= session.total_energy_kwh
+                            balance_kwh = renter.prepaid_balance_kwh
                             
                             # Create deduction transaction record
                             deduction_tx = PrepaidTransaction(
@@ -153,8 +172,11 @@ class TransactionService:
                                 type=PrepaidTransactionType.Deduction
                             )
                             db.add(deduction_tx)
-            
+
+            energy_rollups.record_stop(db, session, previous_kwh)
             db.commit()
+            prepaid_engine.close(transaction_id, balance_kwh)
+            fleet_state.session_stopped(transaction_id)
             logger.info(f"Stopped transaction {transaction_id}, consumed {session.total_energy_kwh} kWh")
             
             return {"id_tag_info": {"status": "Accepted"}}
@@ -168,80 +190,63 @@ class TransactionService:
         """
         Process MeterValues payload (save to DB).
         """
+        try:
+            columns = parse_meter_values(payload.get("transaction_id"), payload.get("meter_value", []))
+        except Exception as e:
+            logger.error(f"Error parsing MeterValues from {charger_id}: {e}")
+            return
+
+        stop_transaction_id = await run_db(self._handle_meter_values, charger_id, payload, columns)
+
+        if stop_transaction_id:
+            # Outgoing calls need the event loop, so the RemoteStop is sent from here
+            import asyncio
+            asyncio.create_task(self._send_prepaid_stop(charger_id, stop_transaction_id))
+
+    async def _send_prepaid_stop(self, charger_id: str, transaction_id: int):
+        from app.gateway.connection_manager import manager
+        websocket = manager.get_connection(charger_id)
+        if not websocket or not hasattr(websocket, 'charge_point'):
+            prepaid_engine.rearm(transaction_id)
+            return
+        try:
+            response = await websocket.charge_point.remote_stop_transaction(transaction_id=transaction_id)
+            if getattr(response, "status", None) != "Accepted":
+                logger.warning(f"RemoteStop for prepaid transaction {transaction_id} not accepted: {response}")
+                prepaid_engine.rearm(transaction_id)
+        except Exception as e:
+            logger.error(f"RemoteStop for prepaid transaction {transaction_id} failed: {e}")
+            prepaid_engine.rearm(transaction_id)
+
+    def _handle_meter_values(self, charger_id: str, payload: dict, columns: MeterColumns):
+        """
+        Save the readings and return the transaction id to stop if the prepaid
+        balance is exhausted, otherwise None.
+        """
         db: Session = SessionLocal()
         try:
-             # ConnectorID is inside payload usually?
-             # payload = { "connector_id": ..., "meter_value": [ ... ] }
-             connector_id = payload.get("connector_id")
              transaction_id = payload.get("transaction_id")
-             
-             meter_values = payload.get("meter_value", [])
-             
-             for mv in meter_values:
-                 timestamp_str = mv.get("timestamp")
-                 ts = datetime.fromisoformat(timestamp_str.replace("Z", "+00:00"))
-                 
-                 sampled_values = mv.get("sampled_value", [])
-                 for sv in sampled_values:
-                     # Create Reading
-                     reading = MeterReading(
-                         transaction_id=transaction_id, # Can be None if not in transaction
-                         timestamp=ts,
-                         measurand=sv.get("measurand", "Energy.Active.Import.Register"),
-                         value=sv.get("value"),
-                         unit=sv.get("unit"),
-                         phase=sv.get("phase"),
-                         context=sv.get("context")
-                     )
-                     # If transaction_id is missing in payload, try to find active session for this connector?
-                     # For now, if no transaction_id, we might skip or store with null if allowed.
-                     # Our model enforces transaction_id NOT NULL for MeterReading? 
-                     # Let's check model... -> yes nullable=False.
-                     # So if no transaction_id, we can't save it easily without lookups.
-                     # Simplification: Only save if transaction_id provided.
-                     
-                     if transaction_id:
-                         db.add(reading)
-            
-             db.commit()
-             logger.info(f"Saved {len(meter_values)} meter value records for {charger_id}")
+
+             # MeterReading.transaction_id is NOT NULL, so readings outside a transaction are not stored
+             if transaction_id:
+                 meter_reading_writer.submit(columns, db)
+                 logger.info(f"Saved {len(columns)} meter value records for {charger_id}")
 
              # Prepaid Limit Check (Option 1)
-             latest_meter_val = None
-             for mv in meter_values:
-                 sampled_values = mv.get("sampled_value", [])
-                 for sv in sampled_values:
-                     # Only take the total energy reading (the one WITHOUT a phase key)
-                     if sv.get("measurand", "Energy.Active.Import.Register") == "Energy.Active.Import.Register" and "phase" not in sv:
-                         val = sv.get("value")
-                         if val is not None:
-                             try:
-                                 latest_meter_val = float(val)
-                             except ValueError:
-                                 pass
+             # Only take the total energy reading (the one WITHOUT a phase key)
+             latest_reading = columns.latest_reading(DEFAULT_MEASURAND)
+             latest_meter_val = latest_reading[1] if latest_reading else None
+
+             if transaction_id and latest_reading is not None:
+                 fleet_state.record_energy(transaction_id, *latest_reading)
                                  
              if transaction_id and latest_meter_val is not None:
-                 session = db.query(ChargingSession).filter(
-                     ChargingSession.transaction_id == transaction_id, 
-                     ChargingSession.end_time == None
-                 ).first()
-                 
-                 if session:
-                     consumed_kwh = (latest_meter_val - session.meter_start) / 1000.0
-                     if consumed_kwh > 0:
-                         billing_settings = db.query(BillingSettings).first()
-                         if billing_settings and billing_settings.billing_mode == BillingMode.Prepaid:
-                             token = db.query(AuthorizationToken).filter(AuthorizationToken.token == session.token_id).first()
-                             if token and token.renter_id:
-                                 renter = db.query(Renter).filter(Renter.id == token.renter_id).first()
-                                 if renter and consumed_kwh >= renter.prepaid_balance_kwh:
-                                     logger.warning(f"Prepaid balance exceeded for transaction {transaction_id}. Consumed {consumed_kwh} kWh, Balance {renter.prepaid_balance_kwh} kWh. Triggering RemoteStop.")
-                                     from app.gateway.connection_manager import manager
-                                     import asyncio
-                                     websocket = manager.get_connection(charger_id)
-                                     if websocket and hasattr(websocket, 'charge_point'):
-                                         cp = websocket.charge_point
-                                         asyncio.create_task(cp.remote_stop_transaction(transaction_id=transaction_id))
+                 billing_settings = billing_settings_cache.get(db)
+                 if billing_settings and billing_settings.billing_mode == BillingMode.Prepaid:
+                     if not prepaid_engine.is_tracked(transaction_id):
+                         prepaid_engine.load(db, transaction_id)
+                     if prepaid_engine.evaluate(transaction_id, latest_meter_val):
+                         return transaction_id
 
         except Exception as e:
             logger.error(f"Error saving MeterValues: {e}")
@@ -23,6 +23,10 @@ import {
     DialogTitle,
 } from "@/components/ui/dialog";
 
+// Invoice jobs are polled for at most JOB_POLL_ATTEMPTS * JOB_POLL_INTERVAL_MS
+const JOB_POLL_INTERVAL_MS = 1000;
+const JOB_POLL_ATTEMPTS = 60;
+
 interface Renter {
     id: number;
     name: string;
@@ -178,11 +182,22 @@ export default function BillingPage() {
                 renter_id: Number(generateForm.renter_id),
                 end_date: fullEndDate
             });
-            
-            if (res.data.invoice_id) {
-                alert(`Success: Invoice ${res.data.invoice_id} generated.`);
+
+            // Generation runs as a background job; poll until it has finished or we stop waiting
+            let job = res.data;
+            for (let attempt = 0; attempt < JOB_POLL_ATTEMPTS && job.status !== "done" && job.status !== "failed"; attempt++) {
+                await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+                job = (await axios.get(`/api/billing/jobs/${job.id}`)).data;
+            }
+
+            if (job.status !== "done" && job.status !== "failed") {
+                alert(`Invoice job ${job.id} is still ${job.status}. It keeps running in the background; check the invoice list later.`);
+            } else if (job.status === "failed") {
+                alert(job.error || "Failed to generate invoice");
+            } else if (job.invoice_id) {
+                alert(`Success: Invoice ${job.invoice_id} generated.`);
             } else {
-                alert(res.data.message); // e.g. "No unbilled sessions found"
+                alert("No unbilled sessions found for this renter in the given period.");
             }
             
             setGenerateModalOpen(false);
@@ -119,6 +119,7 @@ export default function ChargerDetail() {
     const [charger, setCharger] = useState<ChargerDetail | null>(null);
     const [sessions, setSessions] = useState<Session[]>([]);
     const [logs, setLogs] = useState<Log[]>([]);
+    const [logsCursor, setLogsCursor] = useState<string | null>(null);
     const [loading, setLoading] = useState(true);
     const [stoppingSessionId, setStoppingSessionId] = useState<number | null>(null);
 
@@ -156,11 +157,14 @@ export default function ChargerDetail() {
         }
     };
 
-    const fetchLogs = async (date: string) => {
+    const fetchLogs = async (date: string, cursor: string | null = null) => {
         if (!id) return;
         try {
-            const res = await axios.get(`/api/admin/chargers/${id}/logs?date=${date}`);
-            setLogs(res.data);
+            const res = await axios.get(`/api/admin/chargers/${id}/logs`, {
+                params: { date, limit: 500, ...(cursor ? { cursor } : {}) }
+            });
+            setLogs(prev => cursor ? [...prev, ...res.data] : res.data);
+            setLogsCursor(res.headers["x-next-cursor"] ?? null);
         } catch (error) {
             console.error("Error fetching logs", error);
         }
@@ -609,6 +613,16 @@ export default function ChargerDetail() {
                                     ))}
                                 </TableBody>
                             </Table>
+                            {logsCursor && (
+                                <div className="flex justify-center py-2">
+                                    <button
+                                        onClick={() => fetchLogs(selectedLogDate, logsCursor)}
+                                        className="text-xs px-3 py-1 rounded border hover:bg-muted"
+                                    >
+                                        Load older messages
+                                    </button>
+                                </div>
+                            )}
                         </div>
                     </DialogContent>
                 </Dialog>
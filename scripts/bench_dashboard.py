@@ -0,0 +1,139 @@
+"""
+Admin dashboard benchmark: GET /api/admin/chargers logic at fleet scale.
+
+Seeds N stations (connectors, parking spots, an active session with a long
+reading history on a share of them), then times the previous per-station
+implementation against the set-based dashboard_service.get_chargers and
+counts the SQL statements each one issues. Everything it seeds is deleted
+afterwards.
+
+    python scripts/bench_dashboard.py --stations 1000 --readings 500
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, insert
+from app.database import SessionLocal, engine
+from app.models import (
+    ChargingStation, StationConnector, ParkingSpot, ChargingSession, MeterReading,
+    ChargingStationStatus,
+)
+from app.services.dashboard_service import dashboard_service
+from app.services.meter_series import meter_series
+
+PREFIX = "BENCH-DASH-"
+ENERGY_SERIES = ("Energy.Active.Import.Register", "Wh", None, None)
+FIRST_TRANSACTION_ID = 2100000000
+
+def legacy_get_chargers(db):
+    """The per-station loop get_chargers used before (lazy loads, one query per station)."""
+    result = []
+    for c in db.query(ChargingStation).filter(ChargingStation.id.like(f"{PREFIX}%")).all():
+        connectors = [(conn.connector_id, conn.status) for conn in c.connectors]
+        active = (
+            db.query(ChargingSession)
+            .filter(ChargingSession.station_id == c.id, ChargingSession.end_time.is_(None))
+            .first()
+        )
+        energy = 0
+        if active:
+            renter_name = active.renter_name_snapshot or (active.token_rel.renter.name if active.token_rel and active.token_rel.renter else "Unknown")
+            if active.meter_readings:
+                energy = int(active.meter_readings[-1].value) - active.meter_start
+        spot = c.parking_spot.label if c.parking_spot else None
+        result.append((c.id, connectors, energy, spot))
+    return result
+
+def seed(stations, active_share, readings):
+    db = SessionLocal()
+    try:
+        start = datetime.utcnow() - timedelta(hours=readings / 360)
+        active_every = max(1, round(1 / active_share)) if active_share > 0 else 0
+        series_id = meter_series.ids_for(db, [ENERGY_SERIES])[ENERGY_SERIES]
+        station_rows, connector_rows, spot_rows, session_rows, reading_rows = [], [], [], [], []
+        for i in range(stations):
+            station_id = f"{PREFIX}{i:05d}"
+            station_rows.append({"id": station_id, "is_online": True, "vendor": "Bench", "model": "Dash"})
+            connector_rows += [
+                {"station_id": station_id, "connector_id": n, "status": ChargingStationStatus.Available}
+                for n in (1, 2)
+            ]
+            spot_rows.append({"label": station_id, "charging_station_id": station_id})
+            if active_every and i % active_every == 0:
+                transaction_id = FIRST_TRANSACTION_ID + i
+                session_rows.append({
+                    "transaction_id": transaction_id, "station_id": station_id, "connector_id": 1,
+                    "start_time": start, "meter_start": 0, "renter_name_snapshot": "Bench Renter",
+                })
+                reading_rows += [
+                    {"transaction_id": transaction_id, "timestamp": start + timedelta(seconds=10 * k),
+                     "value": float(k * 30), "series_id": series_id}
+                    for k in range(readings)
+                ]
+        db.execute(insert(ChargingStation), station_rows)
+        db.execute(insert(StationConnector), connector_rows)
+        db.execute(insert(ParkingSpot), spot_rows)
+        if session_rows:
+            db.execute(insert(ChargingSession), session_rows)
+        for offset in range(0, len(reading_rows), 50000):
+            db.execute(insert(MeterReading), reading_rows[offset:offset + 50000])
+        db.commit()
+        return len(session_rows), len(reading_rows)
+    finally:
+        db.close()
+
+def cleanup():
+    db = SessionLocal()
+    try:
+        sessions = db.query(ChargingSession.transaction_id).filter(ChargingSession.station_id.like(f"{PREFIX}%"))
+        db.query(MeterReading).filter(MeterReading.transaction_id.in_(sessions.scalar_subquery())).delete(synchronize_session=False)
+        db.query(ChargingSession).filter(ChargingSession.station_id.like(f"{PREFIX}%")).delete(synchronize_session=False)
+        db.query(ParkingSpot).filter(ParkingSpot.charging_station_id.like(f"{PREFIX}%")).delete(synchronize_session=False)
+        db.query(StationConnector).filter(StationConnector.station_id.like(f"{PREFIX}%")).delete(synchronize_session=False)
+        db.query(ChargingStation).filter(ChargingStation.id.like(f"{PREFIX}%")).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+def measure(fn, runs):
+    statements = [0]
+    def count(*args):
+        statements[0] += 1
+    event.listen(engine, "before_cursor_execute", count)
+    timings = []
+    try:
+        for _ in range(runs):
+            db = SessionLocal()
+            try:
+                started = time.perf_counter()
+                fn(db)
+                timings.append(time.perf_counter() - started)
+            finally:
+                db.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return min(timings), statements[0] // runs
+
+def main(args):
+    cleanup()
+    sessions, readings = seed(args.stations, args.active_share, args.readings)
+    print(f"stations={args.stations} active_sessions={sessions} meter_readings={readings}")
+    try:
+        for name, fn in (("legacy per-station", legacy_get_chargers), ("set-based", dashboard_service.get_chargers)):
+            best, statements = measure(fn, args.runs)
+            print(f"{name:<20} {best * 1000:10.1f} ms {statements:8d} statements")
+    finally:
+        cleanup()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the admin charger dashboard query")
+    parser.add_argument("--stations", type=int, default=1000)
+    parser.add_argument("--active-share", type=float, default=0.5, help="Fraction of stations with an open session")
+    parser.add_argument("--readings", type=int, default=500, help="Meter readings per active session")
+    parser.add_argument("--runs", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,56 @@
+"""
+Invoice PDF micro-benchmark: renders invoices one after another in this
+process, the way a single renderer worker does, and reports milliseconds
+per invoice and the process's peak RSS. Run it on the target hardware
+(e.g. the Raspberry Pi of docker-compose.light.yml) to size
+INVOICE_RENDER_WORKERS.
+
+    python scripts/bench_invoice_pdf.py --invoices 200 --sessions 30
+
+Needs no database; PDFs are written to a temporary directory.
+"""
+import argparse
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("INVOICES_DIR", tempfile.mkdtemp(prefix="bench_invoices_"))
+
+from app.services.billing_service import render_invoice_pdf
+from bench_invoice_rendering import document
+from bench_ocpp_latency import percentile
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def main(args):
+    documents = [document(i + 1, args.sessions) for i in range(args.invoices)]
+    rss_before = peak_rss_mb()
+
+    first_started = time.perf_counter()
+    render_invoice_pdf(documents[0]) # Imports and per-process setup
+    first_ms = (time.perf_counter() - first_started) * 1000.0
+
+    timings = []
+    for doc in documents[1:]:
+        started = time.perf_counter()
+        render_invoice_pdf(doc)
+        timings.append((time.perf_counter() - started) * 1000.0)
+
+    size = os.path.getsize(render_invoice_pdf(documents[0]))
+    print(f"invoices: {args.invoices} x {args.sessions} sessions, {size / 1024:.1f} KiB per PDF")
+    print(f"first invoice: {first_ms:.1f} ms")
+    print(f"ms/invoice: mean {statistics.mean(timings):.1f}  p50 {percentile(timings, 50):.1f}  p95 {percentile(timings, 95):.1f}")
+    print(f"peak RSS: {rss_before:.1f} MiB before rendering, {peak_rss_mb():.1f} MiB after")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmark invoice PDF rendering")
+    parser.add_argument("--invoices", type=int, default=100)
+    parser.add_argument("--sessions", type=int, default=30, help="Sessions per invoice")
+    main(parser.parse_args())
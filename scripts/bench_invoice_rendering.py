@@ -0,0 +1,82 @@
+"""
+Invoice rendering benchmark for the automatic billing run.
+
+Renders N invoices (30 sessions each by default) the way the billing run
+does, while a probe on the same event loop wakes up every 10 ms and
+records how late it was. That lag is added to every OCPP frame the
+gateway handles during the run.
+
+    python scripts/bench_invoice_rendering.py --invoices 200 --mode inline    # before: rendered on the event loop
+    python scripts/bench_invoice_rendering.py --invoices 200 --workers 4      # after: worker processes
+
+Needs no database; PDFs are written to a temporary directory.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("INVOICES_DIR", tempfile.mkdtemp(prefix="bench_invoices_"))
+
+from app.services.billing_service import InvoiceDocument
+from app.services.invoice_renderer import InvoiceRenderer
+from bench_ocpp_latency import percentile
+
+START = datetime(2026, 1, 1)
+
+def document(invoice_id: int, sessions: int) -> InvoiceDocument:
+    rows = tuple(
+        (START + timedelta(days=d), START + timedelta(days=d, hours=2), 11.5 + d % 7)
+        for d in range(sessions)
+    )
+    return InvoiceDocument(
+        invoice_id=invoice_id, renter_name=f"Bench Renter {invoice_id}",
+        period_start=START, period_end=START + timedelta(days=31),
+        amount_due=round(sum(r[2] for r in rows) * 0.3, 2), sessions=rows,
+        company_name="Bench Parking AG", iban="CH6209000000000000000", address="Parking Street 1, 1000 City",
+        price_per_kwh=0.3,
+    )
+
+async def probe(lags: list, stop: asyncio.Event, interval: float = 0.01):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append((loop.time() - expected) * 1000.0)
+
+async def main(args):
+    documents = [document(i + 1, args.sessions) for i in range(args.invoices)]
+    renderer = InvoiceRenderer(workers=0 if args.mode == "inline" else args.workers)
+    slots = asyncio.Semaphore(max(1, renderer.workers * 2))
+    lags, stop = [], asyncio.Event()
+    probing = asyncio.create_task(probe(lags, stop))
+
+    async def render(doc):
+        async with slots:
+            return await renderer.render(doc)
+
+    started = time.perf_counter()
+    try:
+        paths = await asyncio.gather(*(render(doc) for doc in documents))
+    finally:
+        renderer.shutdown()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probing
+    assert all(path.endswith(".pdf") for path in paths)
+
+    print(f"mode: {args.mode}" + (f", {renderer.workers} workers" if renderer.workers else ""))
+    print(f"invoices: {args.invoices} x {args.sessions} sessions in {elapsed:.2f} s -> {args.invoices / elapsed:.1f} invoices/s")
+    print(f"event loop lag (ms): p50 {percentile(lags, 50):.1f}  p99 {percentile(lags, 99):.1f}  max {max(lags, default=0):.1f}  ({len(lags)} probes)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark invoice rendering during a billing run")
+    parser.add_argument("--invoices", type=int, default=100)
+    parser.add_argument("--sessions", type=int, default=30, help="Sessions per invoice")
+    parser.add_argument("--mode", choices=["inline", "pool"], default="pool")
+    parser.add_argument("--workers", type=int, default=4)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,133 @@
+"""
+MeterValues ingestion benchmark: rows/second of the old per-value ORM path
+versus the column-array bulk path (one COPY per frame, and coalesced COPY
+across many frames).
+
+Needs a migrated database at DATABASE_URL. Creates a throwaway station and
+session, and removes everything it wrote afterwards.
+
+    python scripts/bench_meter_ingest.py --frames 2000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.models import ChargingStation, ChargingSession, MeterReading
+from app.services.meter_ingest import parse_meter_values, MeterColumns, MeterReadingWriter
+from app.services.meter_series import meter_series
+
+STATION_ID = "BENCH-METER-CP"
+TRANSACTION_ID = 2147000000
+
+def three_phase_frame(ts: datetime, seq: int) -> list:
+    """One MeterValues frame: voltage/current/power per phase plus energy register."""
+    sampled = []
+    for phase in ("L1", "L2", "L3"):
+        sampled += [
+            {"value": "230.1", "measurand": "Voltage", "unit": "V", "phase": f"{phase}-N", "context": "Sample.Periodic"},
+            {"value": "16.0", "measurand": "Current.Import", "unit": "A", "phase": phase, "context": "Sample.Periodic"},
+            {"value": "3680", "measurand": "Power.Active.Import", "unit": "W", "phase": phase, "context": "Sample.Periodic"},
+            {"value": str(seq * 10), "measurand": "Energy.Active.Import.Register", "unit": "Wh", "phase": phase, "context": "Sample.Periodic"},
+        ]
+    sampled.append({"value": str(seq * 30), "measurand": "Energy.Active.Import.Register", "unit": "Wh", "context": "Sample.Periodic"})
+    return [{"timestamp": ts.isoformat(), "sampled_value": sampled}]
+
+def orm_path(frames):
+    """What handle_meter_values did before: one ORM object per sampled value, commit per frame."""
+    db = SessionLocal()
+    try:
+        for meter_value in frames:
+            for mv in meter_value:
+                ts = datetime.fromisoformat(mv["timestamp"].replace("Z", "+00:00"))
+                for sv in mv["sampled_value"]:
+                    key = (sv.get("measurand", "Energy.Active.Import.Register"), sv.get("unit"), sv.get("phase"), sv.get("context"))
+                    db.add(MeterReading(
+                        transaction_id=TRANSACTION_ID,
+                        timestamp=ts,
+                        series_id=meter_series.ids_for(db, [key])[key],
+                        value=float(sv.get("value")),
+                    ))
+            db.commit()
+    finally:
+        db.close()
+
+def bulk_per_frame(frames):
+    writer = MeterReadingWriter(coalesce_interval=0)
+    db = SessionLocal()
+    try:
+        for meter_value in frames:
+            writer.submit(parse_meter_values(TRANSACTION_ID, meter_value), db)
+    finally:
+        db.close()
+
+def bulk_coalesced(frames, batch_rows):
+    writer = MeterReadingWriter(coalesce_interval=1, max_batch_rows=batch_rows)
+    for meter_value in frames:
+        writer.submit(parse_meter_values(TRANSACTION_ID, meter_value))
+    # Remaining partial batch
+    batch, writer._pending = writer._pending, MeterColumns()
+    if len(batch):
+        writer.write(batch)
+
+def clear_readings():
+    db = SessionLocal()
+    try:
+        db.query(MeterReading).filter(MeterReading.transaction_id == TRANSACTION_ID).delete()
+        db.commit()
+    finally:
+        db.close()
+
+def main(args):
+    db = SessionLocal()
+    try:
+        db.merge(ChargingStation(id=STATION_ID))
+        db.flush()
+        if not db.query(ChargingSession).filter(ChargingSession.transaction_id == TRANSACTION_ID).first():
+            db.add(ChargingSession(
+                transaction_id=TRANSACTION_ID,
+                station_id=STATION_ID,
+                start_time=datetime.now(timezone.utc),
+                meter_start=0,
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+    start = datetime.now(timezone.utc)
+    frames = [three_phase_frame(start + timedelta(seconds=10 * i), i) for i in range(args.frames)]
+    rows = sum(len(sv["sampled_value"]) for frame in frames for sv in frame)
+
+    runs = [
+        ("orm (per value, commit per frame)", lambda: orm_path(frames)),
+        ("bulk COPY per frame", lambda: bulk_per_frame(frames)),
+        (f"bulk COPY coalesced ({args.batch_rows} rows)", lambda: bulk_coalesced(frames, args.batch_rows)),
+    ]
+
+    print(f"frames={args.frames} rows={rows} ({rows // args.frames} sampled values per frame)")
+    try:
+        for name, run in runs:
+            clear_readings()
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+            print(f"{name:<42} {elapsed:8.3f} s {rows / elapsed:12.0f} rows/s")
+    finally:
+        clear_readings()
+        db = SessionLocal()
+        try:
+            db.query(ChargingSession).filter(ChargingSession.transaction_id == TRANSACTION_ID).delete()
+            db.query(ChargingStation).filter(ChargingStation.id == STATION_ID).delete()
+            db.commit()
+        finally:
+            db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark MeterValues ingestion paths")
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--batch-rows", type=int, default=5000)
+    main(parser.parse_args())
@@ -0,0 +1,113 @@
+"""
+Meter reading storage benchmark for one 10-hour, 3-phase session sampled
+every 10 seconds (13 values per frame: voltage/current/power/energy per
+phase plus the total energy register).
+
+Reports bytes on disk per sample for
+  - the old layout (strings per row), computed from the same data,
+  - the numeric rows ingestion writes,
+  - the packed per-series archive of a closed session,
+and samples/second for ingesting and for reading the session back from
+each form.
+
+Needs a migrated PostgreSQL database at DATABASE_URL. Creates a throwaway
+station and session, and removes everything it wrote afterwards.
+
+    python scripts/bench_meter_storage.py --hours 10 --interval 10
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.database import SessionLocal
+from app.models import ChargingStation, ChargingSession, MeterReading, MeterReadingArchive
+from app.services.meter_ingest import parse_meter_values, MeterReadingWriter
+from app.services.meter_store import MeterStore
+from bench_meter_ingest import three_phase_frame
+
+STATION_ID = "BENCH-STORAGE-CP"
+TRANSACTION_ID = 2147000001
+START = datetime(2026, 1, 1, 8, 0)
+
+# Heap bytes per row as Postgres stores them: tuple header and columns, plus the line pointer.
+# Both row layouts carry the same two indexes, so those are left out.
+LEGACY_ROW_SIZE = text("""
+    SELECT coalesce(sum(pg_column_size(ROW(r.id, r.transaction_id, r.timestamp, s.measurand, r.value::text, s.unit, s.phase, s.context)) + 4), 0)
+    FROM meter_readings r JOIN meter_series s ON s.id = r.series_id
+    WHERE r.transaction_id = :tx
+""")
+COMPACT_ROW_SIZE = text("""
+    SELECT coalesce(sum(pg_column_size(ROW(r.id, r.transaction_id, r.timestamp, r.value, r.series_id)) + 4), 0)
+    FROM meter_readings r WHERE r.transaction_id = :tx
+""")
+ARCHIVE_SIZE = text("""
+    SELECT coalesce(sum(pg_column_size(a.*) + 4), 0)
+    FROM meter_reading_archives a WHERE a.transaction_id = :tx
+""")
+
+def cleanup(db):
+    db.query(MeterReading).filter(MeterReading.transaction_id == TRANSACTION_ID).delete()
+    db.query(MeterReadingArchive).filter(MeterReadingArchive.transaction_id == TRANSACTION_ID).delete()
+    db.query(ChargingSession).filter(ChargingSession.transaction_id == TRANSACTION_ID).delete()
+    db.query(ChargingStation).filter(ChargingStation.id == STATION_ID).delete()
+    db.commit()
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+def main(args):
+    frames = int(args.hours * 3600 / args.interval)
+    payloads = [three_phase_frame(START + timedelta(seconds=args.interval * i), i) for i in range(frames)]
+    samples = sum(len(sv["sampled_value"]) for frame in payloads for sv in frame)
+    store = MeterStore()
+
+    db = SessionLocal()
+    try:
+        cleanup(db)
+        db.add(ChargingStation(id=STATION_ID))
+        db.add(ChargingSession(
+            transaction_id=TRANSACTION_ID, station_id=STATION_ID, start_time=START,
+            end_time=START + timedelta(hours=args.hours), meter_start=0,
+        ))
+        db.commit()
+
+        writer = MeterReadingWriter(coalesce_interval=0)
+        _, ingest_s = timed(lambda: [writer.write(parse_meter_values(TRANSACTION_ID, frame), db) for frame in payloads])
+
+        legacy = db.execute(LEGACY_ROW_SIZE, {"tx": TRANSACTION_ID}).scalar()
+        compact = db.execute(COMPACT_ROW_SIZE, {"tx": TRANSACTION_ID}).scalar()
+        _, raw_read_s = timed(lambda: store.series(db, TRANSACTION_ID))
+
+        _, archive_s = timed(lambda: (store.archive_session(db, TRANSACTION_ID), db.commit()))
+        archived = db.execute(ARCHIVE_SIZE, {"tx": TRANSACTION_ID}).scalar()
+        series, archive_read_s = timed(lambda: store.series(db, TRANSACTION_ID))
+        assert sum(len(s) for s in series) == samples
+
+        print(f"session: {args.hours} h, {args.interval} s interval, {frames} frames, {samples} samples, {len(series)} series")
+        print(f"{'layout':<34}{'bytes':>12}{'bytes/sample':>14}")
+        for name, size in (("text rows (before)", legacy), ("numeric rows + series id", compact), ("packed archive (closed session)", archived)):
+            print(f"{name:<34}{size:>12}{size / samples:>14.1f}")
+        print(f"{'step':<34}{'seconds':>12}{'samples/s':>14}")
+        for name, elapsed in (
+            ("ingest (COPY per frame)", ingest_s),
+            ("read numeric rows", raw_read_s),
+            ("archive", archive_s),
+            ("read packed archive", archive_read_s),
+        ):
+            print(f"{name:<34}{elapsed:>12.3f}{samples / elapsed:>14.0f}")
+    finally:
+        cleanup(db)
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark meter reading storage layouts")
+    parser.add_argument("--hours", type=float, default=10)
+    parser.add_argument("--interval", type=float, default=10, help="Seconds between MeterValues frames")
+    main(parser.parse_args())
@@ -0,0 +1,104 @@
+"""
+OCPP response latency benchmark.
+
+Opens N concurrent charger connections against a running backend and has each
+one send Heartbeat, StatusNotification, Authorize and MeterValues frames in a
+loop, timing CALL -> CALLRESULT round trips per action.
+
+Compare the old "DB calls on the event loop" behaviour with the DB thread pool
+by running the server twice:
+
+    DB_THREADPOOL_SIZE=0 uvicorn app.main:app      # before: inline DB calls
+    uvicorn app.main:app                           # after: DB thread pool
+
+    python scripts/bench_ocpp_latency.py --chargers 200 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import websockets
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+def frames(charger_id, seq):
+    now = datetime.now(timezone.utc).isoformat()
+    return [
+        ("Heartbeat", {}),
+        ("StatusNotification", {"connectorId": 1, "errorCode": "NoError", "status": "Available"}),
+        ("Authorize", {"idTag": f"BENCH-{charger_id}"}),
+        ("MeterValues", {
+            "connectorId": 1,
+            "meterValue": [{
+                "timestamp": now,
+                "sampledValue": [{"value": str(seq * 10), "measurand": "Energy.Active.Import.Register", "unit": "Wh"}],
+            }],
+        }),
+    ]
+
+async def run_charger(url, charger_id, deadline, interval, latencies, errors):
+    try:
+        async with websockets.connect(f"{url}/{charger_id}", subprotocols=["ocpp1.6"]) as ws:
+            seq = 0
+            while time.monotonic() < deadline:
+                for action, payload in frames(charger_id, seq):
+                    message_id = str(uuid.uuid4())
+                    started = time.perf_counter()
+                    await ws.send(json.dumps([2, message_id, action, payload]))
+                    # Skip any server-initiated CALLs (e.g. TriggerMessage) until our result arrives
+                    while True:
+                        reply = json.loads(await ws.recv())
+                        if reply[0] in (3, 4) and reply[1] == message_id:
+                            break
+                        if reply[0] == 2:
+                            await ws.send(json.dumps([3, reply[1], {"status": "Accepted"}]))
+                    latencies[action].append((time.perf_counter() - started) * 1000.0)
+                seq += 1
+                await asyncio.sleep(interval)
+    except Exception as e:
+        errors.append(f"{charger_id}: {e}")
+
+async def main(args):
+    latencies = defaultdict(list)
+    errors = []
+    deadline = time.monotonic() + args.duration
+
+    tasks = []
+    for i in range(args.chargers):
+        charger_id = f"{args.prefix}{i:05d}"
+        tasks.append(asyncio.create_task(run_charger(args.url, charger_id, deadline, args.interval, latencies, errors)))
+        # Stagger connects a little so we measure steady state rather than the connect storm
+        await asyncio.sleep(args.ramp / max(args.chargers, 1))
+    await asyncio.gather(*tasks)
+
+    all_samples = [value for samples in latencies.values() for value in samples]
+    print(f"chargers={args.chargers} duration={args.duration}s frames={len(all_samples)} errors={len(errors)}")
+    print(f"{'action':<20} {'count':>8} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+    for action, samples in sorted(latencies.items()) + [("ALL", all_samples)]:
+        print(
+            f"{action:<20} {len(samples):>8} {statistics.median(samples) if samples else 0:>10.2f} "
+            f"{percentile(samples, 95):>10.2f} {percentile(samples, 99):>10.2f} {max(samples, default=0):>10.2f}"
+        )
+    for error in errors[:10]:
+        print(f"error: {error}", file=sys.stderr)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure OCPP response latency under concurrent chargers")
+    parser.add_argument("--url", default="ws://localhost:8000/ocpp")
+    parser.add_argument("--chargers", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--interval", type=float, default=1.0, help="Pause between message rounds per charger")
+    parser.add_argument("--ramp", type=float, default=5.0, help="Seconds over which to open connections")
+    parser.add_argument("--prefix", default="BENCH-CP-")
+    asyncio.run(main(parser.parse_args()))
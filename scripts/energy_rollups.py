@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Maintenance for the daily energy rollups (energy_rollups_station_daily,
+energy_rollups_renter_daily).
+
+    python scripts/energy_rollups.py verify [--from 2026-01-01] [--to 2026-01-31]
+    python scripts/energy_rollups.py backfill [--from 2026-01-01] [--to 2026-01-31]
+
+verify lists the days whose stored rollups differ from what the charging
+sessions add up to and exits with status 1 if there are any. backfill
+recomputes the range (everything by default) from the sessions. Uses
+DATABASE_URL like the app.
+"""
+import argparse
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.services.energy_rollups import energy_rollups
+
+def main(args) -> int:
+    db = SessionLocal()
+    try:
+        if args.command == "backfill":
+            counts = energy_rollups.rebuild(db, args.start, args.end)
+            for table, rows in counts.items():
+                print(f"{table}: {rows} rows")
+            return 0
+
+        problems = energy_rollups.verify(db, args.start, args.end)
+        for problem in problems:
+            print(problem)
+        print(f"{len(problems)} difference(s)")
+        return 1 if problems else 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill or verify the daily energy rollups")
+    parser.add_argument("command", choices=["backfill", "verify"])
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, help="First day (inclusive)")
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, help="Last day (inclusive)")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,278 @@
+"""
+Fleet-scale OCPP load generator.
+
+Spawns many concurrent SimulatedChargePoint connections (the simulator from
+tests/integration/test_full_flow.py) against /ocpp/{charge_point_id} and
+reports throughput and p50/p95/p99 latency per action.
+
+Scenarios set the message mix; every knob can still be overridden:
+
+    boot-storm       all chargers connect and boot at once, then idle on heartbeats
+    steady           chargers ramp in, heartbeat and run charging sessions
+    churn            short sessions, so StartTransaction/StopTransaction dominate
+    reconnect-storm  steady traffic, and every --reconnect-every seconds all
+                     chargers drop their connection and reconnect at once
+
+Run the backend against a Postgres container, then for example:
+
+    python scripts/load_generator.py --scenario steady --chargers 2000 --duration 120 --seed
+
+Thousands of sockets need a raised file descriptor limit (ulimit -n 65536).
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import websockets
+from ocpp.routing import on
+from ocpp.v16 import call, call_result
+from ocpp.v16.enums import Action, ChargePointStatus, RemoteStartStopStatus, TriggerMessageStatus
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.integration.test_full_flow import SimulatedChargePoint, setup_database
+
+DEFAULTS = dict(ramp=30, heartbeat_interval=30, meter_interval=10, idle_time=30, session_length=120, reconnect_every=0)
+
+SCENARIOS = {
+    "boot-storm": dict(ramp=0, heartbeat_interval=60, session_length=0),
+    "steady": dict(),
+    "churn": dict(ramp=10, heartbeat_interval=60, meter_interval=5, idle_time=2, session_length=10),
+    "reconnect-storm": dict(ramp=10, reconnect_every=30),
+}
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.counters = defaultdict(int)
+        self.last_error = None
+
+    def record(self, action, seconds):
+        self.latencies[action].append(seconds)
+
+    def fail(self, action):
+        self.errors[action] += 1
+
+    def report(self, elapsed):
+        actions = sorted(set(self.latencies) | set(self.errors))
+        total = sum(len(v) for v in self.latencies.values())
+        print()
+        print(f"{'action':<20} {'count':>8} {'errors':>7} {'msg/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for action in actions:
+            samples = self.latencies[action]
+            print(
+                f"{action:<20} {len(samples):>8} {self.errors[action]:>7} {len(samples) / elapsed:>9.1f} "
+                f"{percentile(samples, 50) * 1000:>8.1f} {percentile(samples, 95) * 1000:>8.1f} "
+                f"{percentile(samples, 99) * 1000:>8.1f} {max(samples, default=0) * 1000:>8.1f}"
+            )
+        print(f"\n{total} calls in {elapsed:.1f} s = {total / elapsed:.1f} msg/s")
+        print(", ".join(f"{k}={v}" for k, v in sorted(self.counters.items())))
+        if self.last_error:
+            print(f"last connection error: {self.last_error}")
+
+class LoadChargePoint(SimulatedChargePoint):
+    """SimulatedChargePoint that times every call and answers the server's commands."""
+
+    def __init__(self, charge_point_id, connection, stats, response_timeout=30):
+        super().__init__(charge_point_id, connection, response_timeout)
+        self.stats = stats
+
+    async def call(self, payload, suppress=True, unique_id=None, skip_schema_validation=False):
+        action = type(payload).__name__
+        started = time.perf_counter()
+        try:
+            response = await super().call(payload, suppress=False)
+        except Exception:
+            self.stats.fail(action)
+            raise
+        self.stats.record(action, time.perf_counter() - started)
+        return response
+
+    async def meter_values_3phase(self, connector_id, transaction_id, energy_wh):
+        sampled = []
+        for phase in ("L1", "L2", "L3"):
+            sampled += [
+                {"value": f"{random.uniform(228, 232):.1f}", "measurand": "Voltage", "unit": "V", "phase": f"{phase}-N", "context": "Sample.Periodic"},
+                {"value": f"{random.uniform(15, 16):.2f}", "measurand": "Current.Import", "unit": "A", "phase": phase, "context": "Sample.Periodic"},
+                {"value": f"{random.uniform(3600, 3700):.0f}", "measurand": "Power.Active.Import", "unit": "W", "phase": phase, "context": "Sample.Periodic"},
+            ]
+        sampled.append({"value": str(energy_wh), "measurand": "Energy.Active.Import.Register", "unit": "Wh", "context": "Sample.Periodic"})
+        return await self.call(call.MeterValues(
+            connector_id=connector_id,
+            transaction_id=transaction_id,
+            meter_value=[{"timestamp": now_iso(), "sampledValue": sampled}]
+        ))
+
+    @on(Action.trigger_message)
+    def on_trigger_message(self, requested_message, **kwargs):
+        return call_result.TriggerMessage(status=TriggerMessageStatus.accepted)
+
+    @on(Action.remote_stop_transaction)
+    def on_remote_stop_transaction(self, transaction_id, **kwargs):
+        self.stats.counters["remote_stops"] += 1
+        return call_result.RemoteStopTransaction(status=RemoteStartStopStatus.accepted)
+
+class Storm:
+    """Generation counter that releases every charger at the same moment."""
+
+    def __init__(self, stop_at):
+        self.stop_at = stop_at
+        self.generation = 0
+        self.event = asyncio.Event()
+
+    def trigger(self):
+        self.generation += 1
+        self.event.set()
+        self.event = asyncio.Event()
+
+async def pause(seconds, storm, generation):
+    """Sleep, returning False early if a reconnect storm starts or the run ends first."""
+    if storm.generation != generation:
+        return False
+    remaining = storm.stop_at - time.monotonic()
+    try:
+        await asyncio.wait_for(storm.event.wait(), timeout=max(0.0, min(seconds, remaining)))
+        return False
+    except asyncio.TimeoutError:
+        return seconds < remaining
+
+def jitter(seconds):
+    return seconds * random.uniform(0.8, 1.2)
+
+async def heartbeat_loop(cp, args, stop_at, storm, generation):
+    while args.heartbeat_interval > 0 and time.monotonic() < stop_at:
+        if not await pause(jitter(args.heartbeat_interval), storm, generation):
+            return
+        await cp.heartbeat()
+
+async def session_loop(cp, args, stop_at, storm, generation):
+    energy_wh = 0
+    while args.session_length > 0 and time.monotonic() < stop_at:
+        if not await pause(jitter(args.idle_time), storm, generation):
+            return
+        await cp.authorize(args.id_tag)
+        await cp.status_notification(1, ChargePointStatus.preparing)
+        start = await cp.start_transaction(1, args.id_tag, energy_wh, now_iso())
+        if not start.transaction_id:
+            cp.stats.counters["start_rejected"] += 1
+            await cp.status_notification(1, ChargePointStatus.available)
+            continue
+        cp.stats.counters["sessions"] += 1
+        await cp.status_notification(1, ChargePointStatus.charging)
+
+        session_end = time.monotonic() + jitter(args.session_length)
+        while time.monotonic() < min(session_end, stop_at):
+            if not await pause(args.meter_interval, storm, generation):
+                # Connection is going away mid-session; the charger would replay the stop later
+                return
+            energy_wh += int(11000 * args.meter_interval / 3600)
+            if args.phases == 3:
+                await cp.meter_values_3phase(1, start.transaction_id, energy_wh)
+            else:
+                await cp.meter_values(1, start.transaction_id, energy_wh)
+
+        await cp.status_notification(1, ChargePointStatus.finishing)
+        await cp.stop_transaction(start.transaction_id, energy_wh, now_iso(), args.id_tag)
+        await cp.status_notification(1, ChargePointStatus.available)
+
+async def run_charger(index, args, stats, stop_at, storm):
+    charger_id = f"{args.prefix}{index:05d}"
+    await asyncio.sleep(random.uniform(0, args.ramp) if args.ramp > 0 else 0)
+
+    while time.monotonic() < stop_at:
+        generation = storm.generation
+        try:
+            async with websockets.connect(f"{args.url}/{charger_id}", subprotocols=["ocpp1.6"], open_timeout=60) as ws:
+                stats.counters["connects"] += 1
+                cp = LoadChargePoint(charger_id, ws, stats, response_timeout=args.timeout)
+                listener = asyncio.create_task(cp.start())
+                try:
+                    await cp.boot()
+                    await cp.status_notification(1, ChargePointStatus.available)
+                    async with asyncio.TaskGroup() as group:
+                        group.create_task(heartbeat_loop(cp, args, stop_at, storm, generation))
+                        group.create_task(session_loop(cp, args, stop_at, storm, generation))
+                    # Chargers with nothing scheduled just hold the connection
+                    await pause(stop_at - time.monotonic(), storm, generation)
+                finally:
+                    listener.cancel()
+        except Exception as e:
+            stats.counters["connection_errors"] += 1
+            stats.last_error = f"{charger_id}: {e!r}"
+            await asyncio.sleep(1)
+
+async def storm_loop(args, storm, stop_at):
+    while args.reconnect_every > 0:
+        await asyncio.sleep(args.reconnect_every)
+        if time.monotonic() >= stop_at:
+            return
+        print(f"Reconnect storm #{storm.generation + 1}")
+        storm.trigger()
+
+async def main(args):
+    logging.getLogger("test_flow").setLevel(logging.WARNING)
+    logging.getLogger("ocpp").setLevel(logging.WARNING)
+
+    if args.seed:
+        setup_database()
+
+    stats = Stats()
+    started = time.monotonic()
+    stop_at = started + args.duration
+    storm = Storm(stop_at)
+    print(f"scenario={args.scenario} chargers={args.chargers} duration={args.duration}s url={args.url}")
+
+    storms = asyncio.create_task(storm_loop(args, storm, stop_at))
+    chargers = [asyncio.create_task(run_charger(i, args, stats, stop_at, storm)) for i in range(args.chargers)]
+    try:
+        await asyncio.wait(chargers, timeout=args.duration + args.timeout)
+    finally:
+        storms.cancel()
+        for task in chargers:
+            task.cancel()
+        await asyncio.gather(*chargers, return_exceptions=True)
+
+    stats.report(time.monotonic() - started)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fleet-scale OCPP 1.6 load generator")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="steady")
+    parser.add_argument("--url", default="ws://localhost:8000/ocpp")
+    parser.add_argument("--chargers", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--prefix", default="LOAD-CP-")
+    parser.add_argument("--id-tag", default="DEADBEEF")
+    parser.add_argument("--seed", action="store_true", help="Seed the DEADBEEF renter/token via DATABASE_URL first")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-call response timeout")
+    parser.add_argument("--ramp", type=float, help="Spread initial connects over this many seconds (0 = boot storm)")
+    parser.add_argument("--heartbeat-interval", type=float, help="0 disables heartbeats")
+    parser.add_argument("--meter-interval", type=float)
+    parser.add_argument("--phases", type=int, choices=(1, 3), default=3)
+    parser.add_argument("--idle-time", type=float, help="Seconds between sessions")
+    parser.add_argument("--session-length", type=float, help="0 disables transactions")
+    parser.add_argument("--reconnect-every", type=float, help="Seconds between reconnect storms (0 = never)")
+    args = parser.parse_args()
+
+    # Explicit flags win over the scenario, the scenario over the defaults
+    for key, value in {**DEFAULTS, **SCENARIOS[args.scenario]}.items():
+        if getattr(args, key) is None:
+            setattr(args, key, value)
+
+    asyncio.run(main(args))
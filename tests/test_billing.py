@@ -1,3 +1,4 @@
+import os
 import pytest
 from fastapi.testclient import TestClient
 from datetime import datetime, timedelta
@@ -74,14 +75,31 @@ def test_generate_manual_invoice(client, db_session):
         "end_date": datetime.now().isoformat()
     }
     print(f"Renter ID in test is {renter.id}")
-    import unittest.mock
-    with unittest.mock.patch('app.services.billing_service.generate_invoice_pdf', return_value="/tmp/mock.pdf"):
-        response = client.post("/api/billing/invoices/generate", json=payload)
+    # The job prices with the cached settings; drop any left by an earlier, rolled back test
+    from app.services.billing_settings_cache import billing_settings_cache
+    billing_settings_cache.invalidate()
+    response = client.post("/api/billing/invoices/generate", json=payload)
     print(f"Response: {response.json()}")
     
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    assert response.json()["status"] == "queued"
+
+    # 3. Run the job the way a worker would, on the test session and rendering inline
+    import asyncio
+    import unittest.mock
+    from app.services.billing_run import BillingRun
+    from app.services.invoice_jobs import InvoiceJobQueue, invoice_jobs
+    from app.services.invoice_renderer import InvoiceRenderer
+    queue = InvoiceJobQueue(run=BillingRun(InvoiceRenderer(workers=0)))
+    with unittest.mock.patch('app.services.invoice_renderer.render_invoice_pdf', return_value="/tmp/mock.pdf"):
+        asyncio.run(queue.process(invoice_jobs.get(job_id), db_session))
+
+    response = client.get(f"/api/billing/jobs/{job_id}")
     assert response.status_code == 200
     data = response.json()
-    assert "invoice_id" in data
+    assert data["status"] == "done"
+    assert data["invoices_rendered"] == 1
     assert data["invoice_id"] is not None
     
     # Verify invoice was created correctly
@@ -112,3 +130,90 @@ def test_mark_invoice_paid(client, db_session):
     print(f"Response: {response.json()}")
     assert response.status_code == 200
     assert response.json()["is_paid"] is True
+
+def test_billing_engine_invoices_all_active_renters(db_session):
+    from app.services.billing_engine import BillingEngine
+    from app.services.billing_service import get_billing_settings
+
+    db_session.add(ChargingStation(id="CS-BULK"))
+    renters = [Renter(name=f"Bulk {i}", contact_email="bulk@example.com", is_active=i != 2) for i in range(3)]
+    db_session.add_all(renters)
+    db_session.flush()
+    start = datetime(2020, 3, 1)
+    for i, renter in enumerate(renters):
+        db_session.add(AuthorizationToken(token=f"BULK-{i}", renter_id=renter.id))
+        db_session.flush()
+        for k, kwh in enumerate((5.0, 7.0, 0.0)): # the empty session stays unbilled
+            db_session.add(ChargingSession(
+                transaction_id=1_970_000_000 + i * 10 + k, station_id="CS-BULK", token_id=f"BULK-{i}",
+                start_time=start + timedelta(days=k), end_time=start + timedelta(days=k, hours=1),
+                meter_start=0, total_energy_kwh=kwh,
+            ))
+    db_session.commit()
+    settings = get_billing_settings(db_session)
+
+    engine = BillingEngine(batch_size=1)
+    # Without renter ids: every active renter, joined through Renter.is_active
+    seeded = {r.id for r in renters}
+    due = [bill for bill in engine.unbilled(db_session, datetime(2020, 4, 1)) if bill.renter_id in seeded]
+    assert [bill.renter_id for bill in due] == [renters[0].id, renters[1].id]
+    assert [bill.total_kwh for bill in due] == [12.0, 12.0]
+
+    invoice_ids = engine.bill(db_session, datetime(2020, 4, 1), settings, renter_ids=[r.id for r in renters[:2]])
+    invoices = db_session.query(Invoice).filter(Invoice.id.in_(invoice_ids)).order_by(Invoice.id).all()
+    assert [invoice.renter_id for invoice in invoices] == [renters[0].id, renters[1].id]
+    for invoice in invoices:
+        assert invoice.amount_due == 12.0 * settings.price_per_kwh
+        assert invoice.period_start == start
+        assert sorted(s.total_energy_kwh for s in invoice.sessions) == [5.0, 7.0]
+
+    # Nothing left to bill for them; the inactive renter is only billed when asked for by id
+    assert engine.bill(db_session, datetime(2020, 4, 1), settings, renter_ids=[r.id for r in renters[:2]]) == []
+    assert engine.unbilled(db_session, datetime(2020, 4, 1), renter_ids=[renters[2].id])[0].total_kwh == 12.0
+
+def test_invoice_pdf_is_regenerated_and_revalidated(client, db_session, tmp_path, monkeypatch):
+    import io
+    import zipfile
+    from app.services import billing_service
+    from app.services.billing_settings_cache import billing_settings_cache
+    from app.services.invoice_files import invoice_files
+    from app.services.invoice_renderer import InvoiceRenderer
+    monkeypatch.setattr(billing_service, "INVOICES_DIR", str(tmp_path))
+    monkeypatch.setattr(invoice_files, "renderer", InvoiceRenderer(workers=0))
+    billing_settings_cache.invalidate()
+
+    db_session.add(BillingSettings(company_name="A", iban="CH6209000000000000000", address="C", periodicity=BillingPeriodicity.Monthly, price_per_kwh=0.50, billing_mode="Postpaid"))
+    renter = Renter(name="Jane", contact_email="jane@example.com")
+    db_session.add(renter)
+    db_session.commit()
+    period_end = datetime(2021, 3, 31)
+    invoice = Invoice(renter_id=renter.id, period_start=datetime(2021, 3, 1), period_end=period_end, amount_due=5.0,
+                      file_path=str(tmp_path / "gone.pdf"))
+    db_session.add(invoice)
+    db_session.commit()
+
+    # The file is missing: rendered on the first request
+    response = client.get(f"/api/billing/invoices/{invoice.id}/pdf")
+    assert response.status_code == 200
+    assert response.content.startswith(b"%PDF")
+    db_session.refresh(invoice)
+    assert os.path.exists(invoice.file_path)
+    etag = response.headers["etag"]
+    assert not etag.startswith("W/")
+
+    response = client.get(f"/api/billing/invoices/{invoice.id}/pdf", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    response = client.get(f"/api/billing/invoices/{invoice.id}/pdf", headers={"If-Modified-Since": response.headers["last-modified"]})
+    assert response.status_code == 304
+
+    response = client.get(f"/api/billing/invoices/{invoice.id}/pdf", headers={"Range": "bytes=0-3", "If-Range": etag})
+    assert response.status_code == 206
+    assert response.content == b"%PDF"
+
+    response = client.get("/api/billing/invoices/export", params={"start": "2021-03-01", "end": "2021-03-31"})
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert archive.namelist() == [os.path.basename(invoice.file_path)]
+
+    assert client.get("/api/billing/invoices/0/pdf").status_code == 404
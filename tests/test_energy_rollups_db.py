@@ -0,0 +1,99 @@
+from datetime import date, datetime, timedelta
+from app.models import (
+    AuthorizationToken, ChargingSession, ChargingStation, EnergyRollupRenterDaily, EnergyRollupStationDaily, Renter,
+)
+from app.services.energy_rollups import energy_rollups
+
+STATION_ID = "ROLLUP-CP"
+DAY = date(2026, 3, 1)
+START = datetime(2026, 3, 1, 9, 0)
+
+def _seed(db):
+    db.add(ChargingStation(id=STATION_ID))
+    renter = Renter(name="Rollup Renter", contact_email="rollup@example.com")
+    db.add(renter)
+    db.flush()
+    db.add(AuthorizationToken(token="ROLLUP-TAG", renter_id=renter.id))
+    db.flush()
+    return renter
+
+def _stop(db, transaction_id, start, kwh):
+    session = ChargingSession(
+        transaction_id=transaction_id, station_id=STATION_ID, token_id="ROLLUP-TAG",
+        start_time=start, end_time=start + timedelta(hours=1), meter_start=0, total_energy_kwh=kwh,
+    )
+    db.add(session)
+    db.flush()
+    energy_rollups.record_stop(db, session)
+    db.flush()
+    return session
+
+def test_stop_updates_station_and_renter_rollups(db_session):
+    renter = _seed(db_session)
+    _stop(db_session, 1_960_000_001, START, 10.0)
+    session = _stop(db_session, 1_960_000_002, START + timedelta(hours=3), 5.5)
+
+    # A repeated StopTransaction with a corrected meter value
+    session.total_energy_kwh = 6.0
+    energy_rollups.record_stop(db_session, session, previous_kwh=5.5)
+    db_session.flush()
+
+    station = db_session.get(EnergyRollupStationDaily, (DAY, STATION_ID))
+    assert (station.energy_kwh, station.session_count) == (16.0, 2)
+    by_renter = db_session.get(EnergyRollupRenterDaily, (DAY, renter.id))
+    assert (by_renter.energy_kwh, by_renter.session_count) == (16.0, 2)
+    assert energy_rollups.verify(db_session, DAY, DAY) == []
+
+def test_rebuild_repairs_what_verify_reports(db_session):
+    _seed(db_session)
+    _stop(db_session, 1_960_000_003, START, 10.0)
+    db_session.get(EnergyRollupStationDaily, (DAY, STATION_ID)).energy_kwh = 3.0
+    db_session.flush()
+
+    problems = energy_rollups.verify(db_session, DAY, DAY)
+    assert len(problems) == 1 and STATION_ID in problems[0]
+
+    energy_rollups.rebuild(db_session, DAY, DAY)
+    assert energy_rollups.verify(db_session, DAY, DAY) == []
+    assert db_session.get(EnergyRollupStationDaily, (DAY, STATION_ID)).energy_kwh == 10.0
+
+def test_energy_report(client, db_session):
+    renter = _seed(db_session)
+    _stop(db_session, 1_960_000_004, START, 10.0)
+    _stop(db_session, 1_960_000_005, START + timedelta(days=1), 4.0)
+    _stop(db_session, 1_960_000_006, START + timedelta(days=40), 99.0) # outside the range
+    db_session.commit()
+
+    params = {"start": "2026-03-01", "end": "2026-03-31", "station_id": STATION_ID}
+    response = client.get("/api/admin/reports/energy", params={**params, "group_by": "day"})
+    assert response.status_code == 200
+    assert [(r["day"], r["energy_kwh"], r["session_count"]) for r in response.json()] == [
+        ("2026-03-01", 10.0, 1), ("2026-03-02", 4.0, 1),
+    ]
+
+    response = client.get("/api/admin/reports/energy", params={
+        "start": "2026-03-01", "end": "2026-03-31", "renter_id": renter.id, "group_by": "renter",
+    })
+    assert response.json() == [{
+        "energy_kwh": 14.0, "session_count": 2, "day": None, "station_id": None,
+        "renter_id": renter.id, "renter_name": "Rollup Renter",
+    }]
+
+    assert client.get("/api/admin/reports/energy", params={**params, "group_by": "renter"}).status_code == 400
+    assert client.get("/api/admin/reports/energy", params={**params, "end": "2026-02-01"}).status_code == 400
+
+def test_sessions_stay_with_the_renter_they_stopped_under(db_session):
+    renter = _seed(db_session)
+    _stop(db_session, 1_960_000_007, START, 10.0)
+
+    # The tag moves to another renter afterwards
+    other = Renter(name="Next Renter", contact_email="next@example.com")
+    db_session.add(other)
+    db_session.flush()
+    db_session.get(AuthorizationToken, "ROLLUP-TAG").renter_id = other.id
+    db_session.flush()
+
+    assert energy_rollups.verify(db_session, DAY, DAY) == []
+    energy_rollups.rebuild(db_session, DAY, DAY)
+    assert db_session.get(EnergyRollupRenterDaily, (DAY, renter.id)).energy_kwh == 10.0
+    assert db_session.get(EnergyRollupRenterDaily, (DAY, other.id)) is None
@@ -0,0 +1,81 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from app.database import SessionLocal
+from app.models import (
+    ChargingStation, StationConnector, BootLog, AuthorizationToken, AuthorizationStatus, ChargingSession, MeterReading, Renter,
+    EnergyRollupStationDaily, EnergyRollupRenterDaily,
+)
+from app.services.fleet_state import fleet_state
+from app.services.station_service import station_service
+from app.services.station_cache import station_cache
+from app.services.transactions import transaction_service
+
+STATION_ID = "CS-FLEET-STATE"
+ID_TAG = "FLEET-STATE-TAG"
+
+def test_read_model_matches_db_through_a_charging_session():
+    # The OCPP services commit through their own sessions, so seed and clean up outside db_session
+    db = SessionLocal()
+    renter = Renter(name="Fleet State Renter", contact_email="fleet-state@example.com")
+    db.add(renter)
+    db.commit()
+    db.add(AuthorizationToken(token=ID_TAG, status=AuthorizationStatus.Accepted, renter_id=renter.id))
+    db.commit()
+    fleet_state.rebuild(db)
+
+    def check():
+        db.expire_all()
+        assert fleet_state.diff(db, [STATION_ID]) == []
+
+    async def run():
+        t0 = datetime.now(timezone.utc)
+        await station_service.set_station_online(STATION_ID)
+        check()
+        await station_service.process_boot(STATION_ID, "Vendor", "Model", "1.0")
+        check()
+        await station_service.handle_status_notification(STATION_ID, 1, "Charging", "NoError")
+        check()
+
+        started = await transaction_service.start_transaction(STATION_ID, 1, ID_TAG, 1000, t0.isoformat())
+        transaction_id = started["transaction_id"]
+        assert transaction_id
+        check()
+
+        for minutes, energy in ((2, 1600), (1, 1300)):
+            await transaction_service.handle_meter_values(STATION_ID, {
+                "connector_id": 1,
+                "transaction_id": transaction_id,
+                "meter_value": [{
+                    "timestamp": (t0 + timedelta(minutes=minutes)).isoformat(),
+                    "sampled_value": [{"value": str(energy), "measurand": "Energy.Active.Import.Register", "unit": "Wh"}],
+                }],
+            })
+        check()
+        assert fleet_state.detail(STATION_ID).connectors[0].current_transaction_id == transaction_id
+        item = next(i for i in fleet_state.dashboard_items() if i.id == STATION_ID)
+        assert item.active_session.energy_consumed == 600
+        assert item.active_session.renter_name == "Fleet State Renter"
+
+        await transaction_service.stop_transaction(STATION_ID, 1600, (t0 + timedelta(minutes=3)).isoformat(), transaction_id)
+        check()
+        await station_service.set_station_offline(STATION_ID)
+        check()
+        assert fleet_state.has_unknown_connector_status(STATION_ID) is True
+
+    try:
+        asyncio.run(run())
+    finally:
+        fleet_state.reset()
+        station_cache.invalidate(STATION_ID)
+        transaction_ids = [tx for (tx,) in db.query(ChargingSession.transaction_id).filter(ChargingSession.station_id == STATION_ID)]
+        db.query(MeterReading).filter(MeterReading.transaction_id.in_(transaction_ids)).delete(synchronize_session=False)
+        db.query(EnergyRollupStationDaily).filter(EnergyRollupStationDaily.station_id == STATION_ID).delete()
+        db.query(EnergyRollupRenterDaily).filter(EnergyRollupRenterDaily.renter_id == renter.id).delete()
+        db.query(ChargingSession).filter(ChargingSession.station_id == STATION_ID).delete()
+        db.query(StationConnector).filter(StationConnector.station_id == STATION_ID).delete()
+        db.query(BootLog).filter(BootLog.station_id == STATION_ID).delete()
+        db.query(AuthorizationToken).filter(AuthorizationToken.token == ID_TAG).delete()
+        db.query(Renter).filter(Renter.id == renter.id).delete()
+        db.query(ChargingStation).filter(ChargingStation.id == STATION_ID).delete()
+        db.commit()
+        db.close()
@@ -0,0 +1,58 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy import bindparam, text
+from app.models import ChargingStation, OcppMessageLog
+from app.services.log_partitions import LogPartitionManager, DEFAULT_PARTITION, partition_name
+
+STATION_ID = "PART-CP-1"
+TODAY = date(2031, 5, 20)
+
+def _add_log(db, at: datetime):
+    log = OcppMessageLog(station_id=STATION_ID, message_type="CALL", action="Heartbeat", direction="Incoming", payload={}, timestamp=at)
+    db.add(log)
+    db.flush()
+    return log
+
+def _partition_of(db, log) -> str:
+    return db.execute(
+        text("SELECT tableoid::regclass::text FROM ocpp_message_logs WHERE id = :id"), {"id": log.id}
+    ).scalar()
+
+def test_ensure_partitions_moves_rows_out_of_default(db_session):
+    db_session.add(ChargingStation(id=STATION_ID))
+    db_session.flush()
+    manager = LogPartitionManager(retention_days=30, ahead_days=2)
+    assert manager.is_partitioned(db_session)
+
+    # Nothing covers this day yet, so the default partition catches it
+    log = _add_log(db_session, datetime(2031, 5, 21, 8, 30))
+    assert _partition_of(db_session, log) == DEFAULT_PARTITION
+
+    created = manager.ensure_partitions(db_session, TODAY)
+    assert created == [partition_name(TODAY + timedelta(days=offset)) for offset in range(3)]
+    assert _partition_of(db_session, log) == partition_name(date(2031, 5, 21))
+
+    # Running again finds nothing to do
+    assert manager.ensure_partitions(db_session, TODAY) == []
+
+def test_drop_expired_drops_whole_partitions(db_session):
+    db_session.add(ChargingStation(id=STATION_ID))
+    db_session.flush()
+    manager = LogPartitionManager(retention_days=10, ahead_days=0)
+    old_day, kept_day = TODAY - timedelta(days=11), TODAY - timedelta(days=10)
+    manager.create_partition(db_session, old_day)
+    manager.create_partition(db_session, kept_day)
+    old = _add_log(db_session, datetime.combine(old_day, datetime.min.time()))
+    kept = _add_log(db_session, datetime.combine(kept_day, datetime.min.time()))
+    straggler = _add_log(db_session, datetime(2031, 1, 1))
+    old_id, kept_id, straggler_id = old.id, kept.id, straggler.id
+    db_session.expunge_all()
+
+    assert manager.drop_expired(db_session, TODAY) == [partition_name(old_day)]
+    assert set(manager.partitions(db_session)) >= {kept_day}
+    assert old_day not in manager.partitions(db_session)
+
+    remaining = set(db_session.execute(
+        text("SELECT id FROM ocpp_message_logs WHERE id IN :ids").bindparams(bindparam("ids", expanding=True)),
+        {"ids": [old_id, kept_id, straggler_id]},
+    ).scalars())
+    assert remaining == {kept_id}
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+from app.models import ChargingStation, ChargingSession, MeterReading, MeterReadingArchive
+from app.services.meter_ingest import parse_meter_values, MeterReadingWriter
+from app.services.meter_store import MeterStore
+
+STATION_ID = "ARCHIVE-CP"
+TRANSACTION_ID = 1_950_000_001
+START = datetime(2026, 2, 1, 8, 0)
+
+def _frame(ts: datetime, energy: int) -> list:
+    return [{
+        "timestamp": ts.isoformat(),
+        "sampled_value": [
+            {"value": str(energy), "measurand": "Energy.Active.Import.Register", "unit": "Wh"},
+            {"value": "230.5", "measurand": "Voltage", "unit": "V", "phase": "L1-N"},
+        ],
+    }]
+
+def _seed(db):
+    db.add(ChargingStation(id=STATION_ID))
+    db.add(ChargingSession(
+        transaction_id=TRANSACTION_ID, station_id=STATION_ID, start_time=START,
+        end_time=START + timedelta(hours=1), meter_start=0,
+    ))
+    db.flush()
+    writer = MeterReadingWriter(coalesce_interval=0)
+    for minute in range(0, 60, 10):
+        writer.write(parse_meter_values(TRANSACTION_ID, _frame(START + timedelta(minutes=minute), minute * 100)), db)
+
+def _as_dict(series_list):
+    return {(s.measurand, s.phase): (s.timestamps(), list(s.values)) for s in series_list}
+
+def test_archive_keeps_every_reading(db_session):
+    _seed(db_session)
+    store = MeterStore(archive_after_hours=24)
+    before = _as_dict(store.series(db_session, TRANSACTION_ID))
+    assert len(before[("Energy.Active.Import.Register", None)][1]) == 6
+
+    # Not closed long enough yet
+    assert store.archive_closed(db_session, now=START + timedelta(hours=2)) == 0
+    assert store.archive_closed(db_session, now=START + timedelta(days=2)) >= 1
+
+    assert db_session.query(MeterReading).filter(MeterReading.transaction_id == TRANSACTION_ID).count() == 0
+    archives = db_session.query(MeterReadingArchive).filter(MeterReadingArchive.transaction_id == TRANSACTION_ID).all()
+    assert sorted(a.sample_count for a in archives) == [6, 6]
+    assert _as_dict(store.series(db_session, TRANSACTION_ID)) == before
+
+def test_late_readings_merge_into_the_archive(db_session):
+    _seed(db_session)
+    store = MeterStore(archive_after_hours=24)
+    store.archive_session(db_session, TRANSACTION_ID)
+
+    # Queued by the station while offline, delivered after the session was archived
+    late = START + timedelta(minutes=25)
+    MeterReadingWriter(coalesce_interval=0).write(parse_meter_values(TRANSACTION_ID, _frame(late, 2500)), db_session)
+
+    for _ in range(2): # Merged on read, then folded into the archive
+        energy = _as_dict(store.series(db_session, TRANSACTION_ID))[("Energy.Active.Import.Register", None)]
+        assert energy[1] == [0.0, 1000.0, 2000.0, 2500.0, 3000.0, 4000.0, 5000.0]
+        assert energy[0] == sorted(energy[0])
+        store.archive_session(db_session, TRANSACTION_ID)
@@ -0,0 +1,251 @@
+"""
+Query-plan regression suite.
+
+Seeds Postgres at fleet scale inside a transaction that is rolled back
+afterwards, runs the router/service read paths, captures every SELECT they
+issue and EXPLAINs it. A sequential scan over one of the large tables fails
+the test: it means a query lost its index (or never had one) and will get
+slower as the history grows.
+"""
+import json
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event, insert, text
+from starlette.testclient import TestClient
+from app.main import app
+from app.database import SessionLocal, engine
+from app.services.meter_series import meter_series
+from app.services.energy_rollups import energy_rollups
+from app.models import ChargingStation, StationConnector, ChargingStationStatus, AuthorizationToken, Renter, Invoice
+
+STATIONS = 2000
+SESSIONS_PER_STATION = 20
+READINGS_PER_SESSION = 5
+LOGS_PER_STATION = 100
+
+# Tables that grow with traffic; small lookup tables may be scanned
+LARGE_TABLES = {"ocpp_message_logs", "meter_readings", "charging_sessions", "station_connectors", "energy_rollups_station_daily"}
+
+PREFIX = "PLAN-CP-"
+FIRST_TRANSACTION_ID = 1_900_000_000
+START = datetime(2026, 1, 1)
+
+def station_id(i: int) -> str:
+    return f"{PREFIX}{i:05d}"
+
+@pytest.fixture(scope="module")
+def seeded():
+    connection = engine.connect()
+    transaction = connection.begin()
+    db = SessionLocal(bind=connection)
+
+    renter = Renter(name="Plan Renter", contact_email="plan@example.com")
+    db.add(renter)
+    db.flush()
+    db.add(AuthorizationToken(token="PLAN-TAG", renter_id=renter.id))
+    db.execute(insert(ChargingStation), [{"id": station_id(i), "is_online": i % 2 == 0} for i in range(STATIONS)])
+    db.execute(insert(StationConnector), [
+        {"station_id": station_id(i), "connector_id": c, "status": ChargingStationStatus.Available}
+        for i in range(STATIONS) for c in (1, 2)
+    ])
+    db.flush()
+
+    params = {
+        "prefix": PREFIX, "stations": STATIONS, "per_station": SESSIONS_PER_STATION,
+        "first_tx": FIRST_TRANSACTION_ID, "start": START,
+    }
+    # Sessions an hour apart per station; the newest one on every fourth station is still open
+    db.execute(text("""
+        INSERT INTO charging_sessions (transaction_id, station_id, connector_id, token_id, start_time, end_time, meter_start, meter_stop, total_energy_kwh)
+        SELECT :first_tx + s * :per_station + k,
+               :prefix || lpad(s::text, 5, '0'),
+               1,
+               'PLAN-TAG',
+               :start + (k || ' hours')::interval,
+               CASE WHEN k = :per_station - 1 AND s % 4 = 0 THEN NULL ELSE :start + (k || ' hours 30 minutes')::interval END,
+               0, 5000, 5.0
+        FROM generate_series(0, :stations - 1) AS s, generate_series(0, :per_station - 1) AS k
+    """), params)
+    energy = ("Energy.Active.Import.Register", "Wh", None, None)
+    db.execute(text("""
+        INSERT INTO meter_readings (transaction_id, timestamp, value, series_id)
+        SELECT transaction_id, start_time + (r || ' minutes')::interval, r * 1000, :series_id
+        FROM charging_sessions, generate_series(1, :readings) AS r
+        WHERE station_id LIKE :prefix || '%'
+    """), {"readings": READINGS_PER_SESSION, "prefix": PREFIX, "series_id": meter_series.ids_for(db, [energy])[energy]})
+    db.execute(text("""
+        INSERT INTO ocpp_message_logs (station_id, message_type, action, direction, payload, timestamp)
+        SELECT :prefix || lpad(s::text, 5, '0'), 'CALL',
+               CASE WHEN n % 2 = 0 THEN 'Heartbeat' ELSE 'MeterValues' END,
+               'Incoming', '{}'::json, :start + (n || ' minutes')::interval
+        FROM generate_series(0, :stations - 1) AS s, generate_series(0, :logs - 1) AS n
+    """), {**params, "logs": LOGS_PER_STATION})
+
+    # A year of monthly invoices, each owning a slice of the closed sessions
+    invoices = [
+        Invoice(renter_id=renter.id, period_start=START, period_end=START + timedelta(days=30), amount_due=1.0)
+        for _ in range(12)
+    ]
+    db.add_all(invoices)
+    db.flush()
+    db.execute(text("""
+        UPDATE charging_sessions SET invoice_id = :first_invoice + (transaction_id % 12)
+        WHERE station_id LIKE :prefix || '%' AND end_time IS NOT NULL AND transaction_id % 3 = 0
+    """), {"first_invoice": invoices[0].id, "prefix": PREFIX})
+
+    energy_rollups.rebuild(db, START.date(), START.date())
+
+    for table in sorted(LARGE_TABLES | {
+        "charging_stations", "authorization_tokens", "renters", "invoices", "parking_spots", "meter_series",
+        "energy_rollups_renter_daily",
+    }):
+        db.execute(text(f"ANALYZE {table}"))
+
+    yield db, connection, {"renter": renter, "invoice_id": invoices[0].id}
+
+    db.close()
+    transaction.rollback()
+    connection.close()
+
+@pytest.fixture(scope="module")
+def client(seeded):
+    from app.routers.admin import get_db as admin_get_db
+    from app.database import get_db as app_get_db
+    from app.routers.billing import get_db as billing_get_db
+    db, _, _ = seeded
+    for dependency in (admin_get_db, app_get_db, billing_get_db):
+        app.dependency_overrides[dependency] = lambda: db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+def capture_selects(connection, action) -> list:
+    statements = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(connection, "before_cursor_execute", listener)
+    try:
+        action()
+    finally:
+        event.remove(connection, "before_cursor_execute", listener)
+    return statements
+
+def seq_scans(plan: dict) -> list:
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+def _cursor_after_first_page(client):
+    response = client.get(f"/api/admin/chargers/{station_id(7)}/logs", params={"limit": 10})
+    return response.headers["X-Next-Cursor"]
+
+CASES = {
+    "admin: charger overview (DB path)": (
+        lambda client, db, ctx: client.get("/api/admin/chargers"),
+        # Every connector of every charger is on the page
+        {"station_connectors"},
+    ),
+    "admin: charger detail (DB path)": (
+        lambda client, db, ctx: client.get(f"/api/admin/chargers/{station_id(0)}"),
+        set(),
+    ),
+    "admin: charger session history": (
+        lambda client, db, ctx: client.get(f"/api/admin/chargers/{station_id(3)}/sessions"),
+        set(),
+    ),
+    "admin: charger logs, latest page": (
+        lambda client, db, ctx: client.get(f"/api/admin/chargers/{station_id(5)}/logs"),
+        set(),
+    ),
+    "admin: charger logs, one day filtered by action": (
+        lambda client, db, ctx: client.get(
+            f"/api/admin/chargers/{station_id(5)}/logs", params={"date": "2026-01-01", "action": "Heartbeat"}
+        ),
+        set(),
+    ),
+    "admin: charger logs, next page": (
+        lambda client, db, ctx: client.get(
+            f"/api/admin/chargers/{station_id(7)}/logs", params={"limit": 10, "cursor": _cursor_after_first_page(client)}
+        ),
+        set(),
+    ),
+    "admin: charger log export": (
+        lambda client, db, ctx: client.get(f"/api/admin/chargers/{station_id(9)}/logs/export", params={"format": "csv"}),
+        set(),
+    ),
+    "admin: session meter readings": (
+        lambda client, db, ctx: client.get(f"/api/admin/sessions/{FIRST_TRANSACTION_ID + 42}/readings"),
+        set(),
+    ),
+    "admin: energy report of a station by day": (
+        lambda client, db, ctx: client.get("/api/admin/reports/energy", params={
+            "start": "2026-01-01", "end": "2026-01-31", "station_id": station_id(11), "group_by": "day",
+        }),
+        set(),
+    ),
+    "billing: invoice details": (
+        lambda client, db, ctx: client.get(f"/api/billing/invoices/{ctx['invoice_id']}/details"),
+        set(),
+    ),
+    "billing: unbilled sessions of a renter": (
+        lambda client, db, ctx: _unbilled_sessions(db, ctx["renter"]),
+        set(),
+    ),
+    "billing: bulk run, nothing due yet": (
+        lambda client, db, ctx: _bulk_unbilled(db),
+        set(),
+    ),
+    "fleet read model: rebuild": (
+        lambda client, db, ctx: _fleet_rebuild(db),
+        {"station_connectors"},
+    ),
+    "prepaid engine: load an open session": (
+        lambda client, db, ctx: _prepaid_load(db),
+        set(),
+    ),
+}
+
+def _unbilled_sessions(db, renter):
+    from app.services.billing_service import calculate_and_generate_invoice, get_billing_settings
+    # A period ending before any session: runs the query, generates nothing
+    assert calculate_and_generate_invoice(db, renter, START - timedelta(days=1), get_billing_settings(db)) is None
+
+def _bulk_unbilled(db):
+    from app.services.billing_engine import billing_engine
+    assert billing_engine.unbilled(db, START - timedelta(days=1)) == []
+
+def _fleet_rebuild(db):
+    from app.services.fleet_state import FleetState
+    FleetState().rebuild(db)
+
+def _prepaid_load(db):
+    from app.services.prepaid_engine import PrepaidEngine
+    PrepaidEngine().load(db, FIRST_TRANSACTION_ID + SESSIONS_PER_STATION - 1)
+
+@pytest.mark.parametrize("name", list(CASES))
+def test_query_plan_uses_indexes(name, seeded, client):
+    db, connection, ctx = seeded
+    action, allowed = CASES[name]
+
+    def run():
+        response = action(client, db, ctx)
+        if response is not None:
+            assert response.status_code == 200, response.text
+
+    statements = capture_selects(connection, run)
+    assert statements, f"{name}: no queries captured"
+
+    offenders = []
+    for statement, parameters in statements:
+        plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        scanned = {table for table in seq_scans(plan[0]["Plan"]) if table in LARGE_TABLES - allowed}
+        if scanned:
+            offenders.append(f"Seq Scan on {sorted(scanned)}:\n{statement}")
+    assert not offenders, f"{name}:\n" + "\n\n".join(offenders)
@@ -0,0 +1,38 @@
+import asyncio
+from datetime import datetime, timezone
+from app.database import SessionLocal
+from app.models import ChargingStation, AuthorizationToken, AuthorizationStatus, ChargingSession
+from app.services.transactions import transaction_service
+
+STATION_ID = "CS-TXID-LOAD"
+ID_TAG = "TXID-LOAD-TAG"
+STARTS = 2000
+
+def test_simultaneous_start_transactions_get_unique_ids():
+    # start_transaction commits through its own sessions, so seed and clean up outside db_session
+    db = SessionLocal()
+    db.add(ChargingStation(id=STATION_ID))
+    db.add(AuthorizationToken(token=ID_TAG, status=AuthorizationStatus.Accepted))
+    db.commit()
+
+    async def fire():
+        timestamp = datetime.now(timezone.utc).isoformat()
+        return await asyncio.gather(*[
+            transaction_service.start_transaction(STATION_ID, 1, ID_TAG, 0, timestamp)
+            for _ in range(STARTS)
+        ])
+
+    try:
+        responses = asyncio.run(fire())
+
+        assert [r["id_tag_info"]["status"] for r in responses] == ["Accepted"] * STARTS
+        ids = [r["transaction_id"] for r in responses]
+        assert len(set(ids)) == STARTS
+        assert all(0 < i <= 2147483647 for i in ids)
+        assert db.query(ChargingSession).filter(ChargingSession.station_id == STATION_ID).count() == STARTS
+    finally:
+        db.query(ChargingSession).filter(ChargingSession.station_id == STATION_ID).delete()
+        db.query(AuthorizationToken).filter(AuthorizationToken.token == ID_TAG).delete()
+        db.query(ChargingStation).filter(ChargingStation.id == STATION_ID).delete()
+        db.commit()
+        db.close()
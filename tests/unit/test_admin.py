@@ -75,6 +75,84 @@ def test_get_charger_logs(client, db_session, auth_headers):
     assert len(data) == 1
     assert data[0]["action"] == "BootNotification"
 
+def _seed_logs(db_session, station_id, count):
+    from app.models import OcppMessageLog
+    from datetime import datetime, timedelta
+
+    db_session.add(ChargingStation(id=station_id, is_online=True))
+    start = datetime(2026, 3, 1, 10, 0)
+    for i in range(count):
+        db_session.add(OcppMessageLog(
+            station_id=station_id,
+            message_type="CALL",
+            action="Heartbeat" if i % 2 else "MeterValues",
+            direction="Incoming",
+            payload={"i": i},
+            # Three rows share each timestamp, so pages must break ties on id
+            timestamp=start + timedelta(seconds=i // 3),
+        ))
+    db_session.commit()
+
+def test_get_charger_logs_keyset_pagination(client, db_session, auth_headers):
+    _seed_logs(db_session, "CP_LOG_PAGES", 50)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 7, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/admin/chargers/CP_LOG_PAGES/logs", params=params, headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        seen += [(item["timestamp"], item["id"]) for item in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert len(seen) == 50
+    assert seen == sorted(seen, reverse=True)
+
+    response = client.get(
+        "/api/admin/chargers/CP_LOG_PAGES/logs",
+        params={"date": "2026-03-01", "action": "Heartbeat", "limit": 1000},
+        headers=auth_headers,
+    )
+    assert len(response.json()) == 25
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get("/api/admin/chargers/CP_LOG_PAGES/logs", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_export_charger_logs(client, db_session, auth_headers):
+    import csv
+    import io
+    import json
+
+    _seed_logs(db_session, "CP_LOG_EXPORT", 30)
+
+    response = client.get(
+        "/api/admin/chargers/CP_LOG_EXPORT/logs/export",
+        params={"since": "2026-03-01T10:00:02", "until": "2026-03-01T10:00:05"},
+        headers=auth_headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    # Seconds 2, 3 and 4, three rows each, oldest first
+    assert [row["payload"]["i"] for row in rows] == list(range(6, 15))
+
+    response = client.get(
+        "/api/admin/chargers/CP_LOG_EXPORT/logs/export",
+        params={"format": "csv", "action": "MeterValues"},
+        headers=auth_headers,
+    )
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 15
+    assert json.loads(rows[0]["payload"]) == {"i": 0}
+
+def _series_id(db_session, measurand, unit=None, phase=None, context=None):
+    from app.services.meter_series import meter_series
+    key = (measurand, unit, phase, context)
+    return meter_series.ids_for(db_session, [key])[key]
+
 def test_get_session_readings(client, db_session, auth_headers):
     from app.models import MeterReading, ChargingSession, AuthorizationToken, Renter, ChargingStation
     from datetime import datetime
@@ -103,8 +181,8 @@ def test_get_session_readings(client, db_session, auth_headers):
     reading = MeterReading(
         transaction_id=999,
         timestamp=datetime.utcnow(),
-        measurand="Energy.Active.Import.Register",
-        value="1000"
+        series_id=_series_id(db_session, "Energy.Active.Import.Register", "Wh"),
+        value=1000.0
     )
     db_session.add(reading)
     db_session.commit()
@@ -114,6 +192,41 @@ def test_get_session_readings(client, db_session, auth_headers):
     data = response.json()
     assert len(data) == 1
     assert data[0]["value"] == 1000.0
+    assert data[0]["measurand"] == "Energy.Active.Import.Register"
+    assert data[0]["unit"] == "Wh"
+
+def test_get_session_readings_downsamples_long_series(client, db_session, auth_headers):
+    from app.models import ChargingSession, ChargingStation
+    from app.services.meter_ingest import parse_meter_values, MeterReadingWriter
+    from datetime import datetime, timedelta
+
+    db_session.add(ChargingStation(id="CP_DOWNSAMPLE", is_online=True))
+    db_session.add(ChargingSession(transaction_id=998, station_id="CP_DOWNSAMPLE", start_time=datetime(2026, 1, 1), meter_start=0))
+    db_session.commit()
+    frames = [
+        {
+            "timestamp": (datetime(2026, 1, 1) + timedelta(seconds=10 * i)).isoformat(),
+            "sampled_value": [
+                {"value": str(i * 10), "unit": "Wh"},
+                {"value": "7400" if i == 777 else "3700", "measurand": "Power.Active.Import", "unit": "W", "phase": "L1"},
+            ],
+        }
+        for i in range(2000)
+    ]
+    MeterReadingWriter(coalesce_interval=0).write(parse_meter_values(998, frames), db_session)
+
+    response = client.get("/api/admin/sessions/998/readings", params={"max_points": 100}, headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    power = [r for r in data if r["measurand"] == "Power.Active.Import"]
+    assert len(power) <= 100 and len(data) <= 200
+    assert max(r["value"] for r in power) == 7400.0
+    assert [r["timestamp"] for r in data] == sorted(r["timestamp"] for r in data)
+
+    response = client.get(
+        "/api/admin/sessions/998/readings", params={"measurand": "Power.Active.Import", "phase": "L1", "full": True}, headers=auth_headers
+    )
+    assert len(response.json()) == 2000
 
 def test_get_charger_detail(client, db_session, auth_headers):
     station = ChargingStation(id="CP2", is_online=False, model="TestModel2")
@@ -172,3 +285,103 @@ def test_delete_auth_token_with_sessions(client, db_session, auth_headers):
     db_session.refresh(session)
     assert session.token_id is None
 
+
+def _seed_dashboard_fleet(db_session, prefix, count, first_transaction_id):
+    from app.models import ChargingSession, MeterReading, AuthorizationToken, Renter
+    from datetime import datetime, timedelta
+
+    renter = Renter(name=f"{prefix} Renter", contact_email="fleet@example.com")
+    db_session.add(renter)
+    db_session.commit()
+    db_session.add(AuthorizationToken(token=f"{prefix}-TAG", renter_id=renter.id))
+
+    start = datetime.utcnow()
+    energy = _series_id(db_session, "Energy.Active.Import.Register", "Wh")
+    voltage = _series_id(db_session, "Voltage", "V", "L1-N")
+    for i in range(count):
+        station_id = f"{prefix}-{i}"
+        db_session.add(ChargingStation(id=station_id, is_online=True))
+        db_session.add(StationConnector(station_id=station_id, connector_id=1, status=ChargingStationStatus.Charging))
+        db_session.add(ParkingSpot(label=f"{prefix}-{i}", charging_station_id=station_id))
+        transaction_id = first_transaction_id + i
+        db_session.add(ChargingSession(
+            transaction_id=transaction_id, station_id=station_id, token_id=f"{prefix}-TAG",
+            start_time=start, meter_start=1000
+        ))
+        for k in range(5):
+            db_session.add(MeterReading(
+                transaction_id=transaction_id, timestamp=start + timedelta(minutes=k),
+                series_id=energy, value=1000 + k * 100
+            ))
+            db_session.add(MeterReading(
+                transaction_id=transaction_id, timestamp=start + timedelta(minutes=k),
+                series_id=voltage, value=230
+            ))
+    db_session.commit()
+
+def test_get_chargers_query_count_is_constant(db_session):
+    from sqlalchemy import event
+    from app.services.dashboard_service import dashboard_service
+
+    def count_queries():
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db_session.bind, "before_cursor_execute", listener)
+        try:
+            items = dashboard_service.get_chargers(db_session)
+        finally:
+            event.remove(db_session.bind, "before_cursor_execute", listener)
+        return items, len(statements)
+
+    _seed_dashboard_fleet(db_session, "QC-SMALL", 2, 880000)
+    _, small = count_queries()
+    _seed_dashboard_fleet(db_session, "QC-LARGE", 30, 881000)
+    items, large = count_queries()
+
+    assert small == large
+    assert large <= 3
+
+    item = next(i for i in items if i.id == "QC-LARGE-7")
+    assert item.parking_spot_label == "QC-LARGE-7"
+    assert item.active_session.renter_name == "QC-LARGE Renter"
+    # Latest phase-less energy register (1400 Wh) minus meter_start, voltage samples ignored
+    assert item.active_session.energy_consumed == 400
+
+def test_fleet_state_serves_charger_endpoints(client, db_session, auth_headers):
+    from app.services.dashboard_service import dashboard_service
+    from app.services.fleet_state import fleet_state
+
+    _seed_dashboard_fleet(db_session, "FS", 3, 882000)
+    station_ids = ["FS-0", "FS-1", "FS-2"]
+    fleet_state.rebuild(db_session)
+    try:
+        assert fleet_state.diff(db_session, station_ids) == []
+
+        response = client.get("/api/admin/chargers", headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        served = {item["id"]: item for item in response.json() if item["id"] in station_ids}
+        from_db = {item.id: item.model_dump(mode="json") for item in dashboard_service.get_chargers(db_session) if item.id in station_ids}
+        assert served == from_db
+
+        # Moving FS-1's parking spot to FS-0 changes both stations
+        spot_id = served["FS-1"]["parking_spot_id"]
+        response = client.put("/api/admin/chargers/FS-0", json={"parking_spot_id": spot_id, "vendor": "NewVendor"}, headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert fleet_state.diff(db_session, station_ids) == []
+
+        detail = client.get("/api/admin/chargers/FS-1", headers=auth_headers).json()
+        assert detail["parking_spot_label"] is None
+        detail = client.get("/api/admin/chargers/FS-0", headers=auth_headers).json()
+        assert detail["parking_spot_label"] == "FS-1"
+        assert detail["vendor"] == "NewVendor"
+
+        # Renaming the spot reaches the station it is linked to
+        response = client.put(f"/api/admin/parking-spots/{spot_id}", json={"label": "FS-RENAMED"}, headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert fleet_state.diff(db_session, station_ids) == []
+
+        response = client.get("/api/admin/chargers/FS-MISSING", headers=auth_headers)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+    finally:
+        # Seeded rows are rolled back with db_session; later tests expect the DB fallback
+        fleet_state.reset()
@@ -0,0 +1,24 @@
+import asyncio
+from app.services.background_tasks import BackgroundTaskSupervisor
+
+def test_failures_are_counted_and_drain_waits():
+    async def scenario():
+        supervisor = BackgroundTaskSupervisor()
+        done = []
+
+        async def ok():
+            await asyncio.sleep(0.01)
+            done.append(1)
+
+        async def boom():
+            raise RuntimeError("db down")
+
+        supervisor.spawn(ok())
+        supervisor.spawn(boom())
+        await supervisor.drain(timeout=1)
+        await asyncio.sleep(0) # let done callbacks run
+        return supervisor.get_stats(), done
+
+    stats, done = asyncio.run(scenario())
+    assert done == [1]
+    assert stats == {"running": 0, "spawned": 2, "failed": 1}
@@ -0,0 +1,73 @@
+from app.models import BillingMode, BillingPeriodicity, BillingSettings
+from app.services import billing_service
+from app.services.billing_settings_cache import BillingSettingsCache, _NOT_CONFIGURED
+
+def _settings(price_per_kwh: float) -> BillingSettings:
+    return BillingSettings(
+        company_name="Garage AG", iban="CH6209000000000000000", address="Parking Street 1, 1000 City",
+        periodicity=BillingPeriodicity.Monthly, price_per_kwh=price_per_kwh, billing_mode=BillingMode.Postpaid,
+    )
+
+class _FakeDB:
+    """Just enough of a Session for the settings row: query().first(), add, commit, refresh."""
+
+    def __init__(self, row=None, on_read=None):
+        self.row = row
+        self.on_read = on_read
+        self.reads = 0
+
+    def query(self, model):
+        return self
+
+    def first(self):
+        self.reads += 1
+        if self.on_read:
+            self.on_read()
+        return self.row
+
+    def add(self, row):
+        self.row = row
+
+    def commit(self):
+        pass
+
+    def refresh(self, row):
+        pass
+
+def test_publish_bumps_the_version_and_replaces_the_snapshot():
+    cache = BillingSettingsCache()
+    first = cache.publish(_settings(0.30))
+    second = cache.publish(_settings(0.45))
+
+    assert second.version == first.version + 1
+    assert cache.get() is second
+    assert second.price_per_kwh == 0.45
+    assert first.price_per_kwh == 0.30 # Readers holding the old snapshot keep consistent values
+
+def test_load_keeps_a_snapshot_published_while_reading():
+    cache = BillingSettingsCache()
+    published = []
+    # The admin saves new settings while a reader is still fetching the old row
+    db = _FakeDB(row=_settings(0.30), on_read=lambda: published.append(cache.publish(_settings(0.45))))
+
+    snapshot = cache.get(db)
+    assert snapshot is published[0]
+    assert snapshot.price_per_kwh == 0.45
+    assert cache.get(db) is snapshot
+    assert db.reads == 1
+
+def test_not_configured_is_cached_until_the_row_is_created(monkeypatch):
+    cache = BillingSettingsCache()
+    monkeypatch.setattr(billing_service, "billing_settings_cache", cache)
+    db = _FakeDB()
+
+    assert cache.get(db) is None
+    assert cache.get(db) is None
+    assert cache._snapshot is _NOT_CONFIGURED
+    assert db.reads == 1
+
+    billing_service.get_billing_settings(db)
+    snapshot = cache.get(db)
+    assert snapshot is not None
+    assert snapshot.price_per_kwh == 0.30
+    assert snapshot.company_name == "My Parking Garage"
@@ -0,0 +1,46 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app import database
+from app.database import run_db
+
+def _call(*args, **kwargs):
+    return threading.current_thread().name, args, kwargs
+
+def test_run_db_inline_without_a_pool(monkeypatch):
+    # DB_THREADPOOL_SIZE=0
+    monkeypatch.setattr(database, "_db_executor", None)
+
+    async def main():
+        return threading.current_thread().name, await run_db(_call, 1, 2, key="value")
+
+    loop_thread, (thread, args, kwargs) = asyncio.run(main())
+    assert thread == loop_thread
+    assert (args, kwargs) == ((1, 2), {"key": "value"})
+
+def test_run_db_on_the_db_threads(monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
+    monkeypatch.setattr(database, "_db_executor", executor)
+    try:
+        thread, args, kwargs = asyncio.run(run_db(_call, 1, 2, key="value"))
+    finally:
+        executor.shutdown()
+    assert thread.startswith("db_")
+    assert (args, kwargs) == ((1, 2), {"key": "value"})
+
+def test_session_scope_closes_only_sessions_it_opened(monkeypatch):
+    closed = []
+
+    class _Session:
+        def close(self):
+            closed.append(self)
+
+    monkeypatch.setattr(database, "SessionLocal", _Session)
+    own = _Session()
+    with database.session_scope(own) as db:
+        assert db is own
+    assert closed == []
+
+    with database.session_scope() as db:
+        assert isinstance(db, _Session)
+    assert closed == [db]
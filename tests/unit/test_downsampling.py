@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+from app.services.downsampling import minmax_indices
+
+def test_short_series_are_returned_whole():
+    assert minmax_indices(np.array([3.0, 1.0, 2.0]), 10).tolist() == [0, 1, 2]
+
+def test_bounded_and_keeps_spikes():
+    values = np.sin(np.linspace(0, 20, 50_000))
+    values[12_345] = 50.0
+    values[40_000] = -50.0
+    keep = minmax_indices(values, 200)
+
+    assert len(keep) <= 200
+    assert keep[0] == 0 and keep[-1] == len(values) - 1
+    assert np.all(np.diff(keep) > 0)
+    assert 12_345 in keep and 40_000 in keep
+
+def test_flat_series_picks_one_point_per_bucket():
+    keep = minmax_indices(np.full(1000, 7.0), 20)
+    assert len(keep) <= 20
+    assert keep[0] == 0 and keep[-1] == 999
+
+def test_max_points_must_leave_room_for_a_bucket():
+    with pytest.raises(ValueError):
+        minmax_indices(np.zeros(10), 3)
@@ -0,0 +1,22 @@
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from app.services.energy_rollups import energy_rollups, _session_day, _as_date
+
+def test_sessions_count_on_their_utc_start_day():
+    assert _session_day(datetime(2026, 3, 1, 23, 30)) == date(2026, 3, 1)
+    # 00:30 in UTC+2 is still the previous day in UTC
+    assert _session_day(datetime(2026, 3, 2, 0, 30, tzinfo=timezone(timedelta(hours=2)))) == date(2026, 3, 1)
+
+def test_sqlite_dates_come_back_as_dates():
+    assert _as_date("2026-03-01") == date(2026, 3, 1)
+    assert _as_date(date(2026, 3, 1)) == date(2026, 3, 1)
+
+@pytest.mark.parametrize("kwargs", [
+    {"group_by": "week"},
+    {"station_id": "CP-1", "renter_id": 1},
+    {"station_id": "CP-1", "group_by": "renter"},
+    {"renter_id": 1, "group_by": "station"},
+])
+def test_usage_rejects_invalid_queries_before_touching_the_db(kwargs):
+    with pytest.raises(ValueError):
+        energy_rollups.usage(None, date(2026, 3, 1), date(2026, 3, 31), **kwargs)
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta, timezone
+from app.models import ChargingStationStatus
+from app.services.fleet_state import FleetState, SessionView
+
+T0 = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+def make_state():
+    state = FleetState()
+    # Stands in for rebuild() against an empty DB
+    state.ready = True
+    state.station_booted("CP1", "Vendor", "Model", "1.0")
+    state.set_connector_status("CP1", 1, "Available")
+    state.set_connector_status("CP1", 2, "Available")
+    return state
+
+def test_updates_are_ignored_until_built():
+    state = FleetState()
+    state.station_booted("CP1", "Vendor", "Model", "1.0")
+    assert state.dashboard_items() == []
+    assert state.detail("CP1") is None
+
+def test_boot_and_status_notifications():
+    state = make_state()
+    state.set_connector_status("CP1", 1, "Charging")
+    # Status for a station the model doesn't know is dropped, like the DB upsert fails
+    state.set_connector_status("CP-UNKNOWN", 1, "Charging")
+
+    [item] = state.dashboard_items()
+    assert item.id == "CP1"
+    assert item.is_online is True
+    assert [(c.connector_id, c.status) for c in item.connectors] == [
+        (1, ChargingStationStatus.Charging), (2, ChargingStationStatus.Available)
+    ]
+    assert state.has_unknown_connector_status("CP1") is False
+    assert state.has_unknown_connector_status("CP-UNKNOWN") is True
+
+def test_offline_sets_connectors_unknown():
+    state = make_state()
+    state.set_offline(["CP1"])
+
+    detail = state.detail("CP1")
+    assert detail.is_online is False
+    assert {c.status for c in detail.connectors} == {ChargingStationStatus.Unknown}
+    assert state.has_unknown_connector_status("CP1") is True
+
+    state.set_online("CP1")
+    assert state.detail("CP1").is_online is True
+
+def test_session_lifecycle_and_latest_energy():
+    state = make_state()
+    state.session_started("CP1", SessionView(transaction_id=7, connector_id=2, start_time=T0, meter_start=1000, renter_name="Alice"))
+
+    state.record_energy(7, T0 + timedelta(minutes=2), 1500.0)
+    # A late frame with an older sample doesn't move the reading back
+    state.record_energy(7, T0 + timedelta(minutes=1), 1200.0)
+    # Readings for transactions the model doesn't know are ignored
+    state.record_energy(99, T0, 5000.0)
+
+    [item] = state.dashboard_items()
+    assert item.active_session.transaction_id == 7
+    assert item.active_session.renter_name == "Alice"
+    assert item.active_session.energy_consumed == 500
+
+    detail = state.detail("CP1")
+    assert {c.connector_id: c.current_transaction_id for c in detail.connectors} == {1: None, 2: 7}
+
+    state.session_stopped(7)
+    assert state.dashboard_items()[0].active_session is None
+    assert all(c.current_transaction_id is None for c in state.detail("CP1").connectors)
+
+def test_dashboard_shows_newest_session():
+    state = make_state()
+    state.session_started("CP1", SessionView(transaction_id=1, connector_id=1, start_time=T0, meter_start=0))
+    # Naive (as read back from the DB) and aware timestamps compare as UTC
+    state.session_started("CP1", SessionView(transaction_id=2, connector_id=2, start_time=datetime(2026, 1, 1, 12, 5), meter_start=0))
+
+    assert state.dashboard_items()[0].active_session.transaction_id == 2
+
+def test_remove_station_forgets_its_sessions():
+    state = make_state()
+    state.session_started("CP1", SessionView(transaction_id=7, connector_id=1, start_time=T0, meter_start=0))
+    state.remove_station("CP1")
+
+    assert state.detail("CP1") is None
+    state.record_energy(7, T0, 100.0)
+    assert state.dashboard_items() == []
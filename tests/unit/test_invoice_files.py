@@ -0,0 +1,77 @@
+import asyncio
+import io
+import os
+import zipfile
+from datetime import datetime, timedelta
+from email.utils import formatdate
+from app.services.billing_service import InvoiceDocument
+from app.services.invoice_files import InvoiceFileService, not_modified
+
+START = datetime(2026, 1, 1, 8, 0)
+
+def test_not_modified_by_etag():
+    etag = '"abc"'
+    assert not_modified({"if-none-match": '"abc"'}, etag, 0)
+    assert not_modified({"if-none-match": '"x", W/"abc"'}, etag, 0)
+    assert not_modified({"if-none-match": "*"}, etag, 0)
+    assert not not_modified({"if-none-match": '"x"'}, etag, 0)
+    # If-None-Match wins over a matching If-Modified-Since
+    assert not not_modified({"if-none-match": '"x"', "if-modified-since": formatdate(100, usegmt=True)}, etag, 100)
+    assert not not_modified({}, etag, 0)
+
+def test_not_modified_by_date():
+    mtime = 1_700_000_000.75
+    assert not_modified({"if-modified-since": formatdate(int(mtime), usegmt=True)}, '"abc"', mtime)
+    assert not not_modified({"if-modified-since": formatdate(mtime - 1, usegmt=True)}, '"abc"', mtime)
+    assert not not_modified({"if-modified-since": "yesterday"}, '"abc"', mtime)
+
+def test_etag_follows_the_content(tmp_path):
+    files = InvoiceFileService(etag_cache_size=1)
+    path = tmp_path / "invoice.pdf"
+    path.write_bytes(b"%PDF one")
+    etag = files.etag(str(path), os.stat(path))
+    assert etag.startswith('"') and etag.endswith('"')
+    assert files.etag(str(path), os.stat(path)) == etag
+
+    path.write_bytes(b"%PDF two")
+    os.utime(path, ns=(0, 10**9))
+    assert files.etag(str(path), os.stat(path)) != etag
+    assert len(files._etags) == 1
+
+def test_regenerated_invoice_keeps_the_billed_price():
+    document = InvoiceDocument(
+        invoice_id=1, renter_name="Jane Doe", period_start=START, period_end=START + timedelta(days=31), amount_due=6.0,
+        sessions=((START, START + timedelta(hours=1), 10.0), (START, None, 2.0)),
+        company_name="Garage AG", iban="CH6209000000000000000", address="Parking Street 1, 1000 City", price_per_kwh=0.9,
+    )
+    assert InvoiceFileService._as_billed(document).price_per_kwh == 0.5
+    empty = InvoiceDocument(**{**document.__dict__, "sessions": ()})
+    assert InvoiceFileService._as_billed(empty) == empty
+
+def test_archive_is_streamed_per_invoice(tmp_path):
+    paths = {}
+    for invoice_id in (1, 2, 3):
+        paths[invoice_id] = tmp_path / f"invoice_{invoice_id}.pdf"
+        paths[invoice_id].write_bytes(os.urandom(200_000))
+
+    files = InvoiceFileService()
+
+    async def ensure(invoice_id, db=None):
+        if invoice_id == 4:
+            raise RuntimeError("render failed")
+        return str(paths[invoice_id]) if invoice_id in paths else None
+
+    files.ensure = ensure
+
+    async def collect():
+        return [chunk async for chunk in files.archive([1, 2, 3, 4, 5])]
+
+    chunks = asyncio.run(collect())
+    # One piece per invoice file plus the central directory, none near the size of the whole
+    assert len(chunks) >= 4
+    assert max(len(chunk) for chunk in chunks) < 2 * 200_000
+
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    assert archive.namelist() == ["invoice_1.pdf", "invoice_2.pdf", "invoice_3.pdf", "MISSING.txt"]
+    assert archive.read("invoice_2.pdf") == paths[2].read_bytes()
+    assert archive.read("MISSING.txt").decode().splitlines() == ["4: render failed", "5: invoice not found"]
@@ -0,0 +1,70 @@
+import asyncio
+from datetime import datetime
+import pytest
+from app.services import invoice_jobs as jobs_module
+from app.services.invoice_jobs import InvoiceJobQueue
+
+PERIOD_END = datetime(2026, 2, 1)
+
+class FakeRun:
+    def __init__(self, invoice_ids=(), error=None):
+        self.invoice_ids = list(invoice_ids)
+        self.error = error
+        self.calls = []
+
+    async def run(self, period_end, settings, renter_ids=None, db=None, on_invoiced=None, on_rendered=None):
+        self.calls.append((period_end, renter_ids))
+        if self.error:
+            raise self.error
+        on_invoiced(self.invoice_ids)
+        for invoice_id in self.invoice_ids:
+            await asyncio.sleep(0)
+            on_rendered(invoice_id)
+        return self.invoice_ids
+
+@pytest.fixture(autouse=True)
+def no_db(monkeypatch):
+    monkeypatch.setattr(jobs_module, "load_billing_settings", lambda db=None: object())
+
+def test_job_reports_the_invoices_it_created():
+    run = FakeRun(invoice_ids=[11, 12])
+    queue = InvoiceJobQueue(run=run)
+    job = queue.submit(PERIOD_END, renter_id=3)
+    assert job.status == "queued" and queue.get(job.id) is job
+
+    asyncio.run(queue.process(job))
+    assert run.calls == [(PERIOD_END, [3])]
+    assert (job.status, job.invoice_ids, job.rendered) == ("done", [11, 12], 2)
+    assert job.finished_at is not None
+
+def test_failed_job_keeps_the_error():
+    queue = InvoiceJobQueue(run=FakeRun(error=ValueError("Billing settings not configured")))
+    job = queue.submit(PERIOD_END)
+    asyncio.run(queue.process(job))
+    assert (job.status, job.error) == ("failed", "Billing settings not configured")
+
+def test_workers_pick_up_jobs_submitted_before_start():
+    run = FakeRun(invoice_ids=[1])
+    queue = InvoiceJobQueue(run=run, workers=2)
+
+    async def scenario():
+        early = queue.submit(PERIOD_END)
+        queue.start()
+        late = queue.submit(PERIOD_END, renter_id=5)
+        for _ in range(20):
+            await asyncio.sleep(0)
+        await queue.stop()
+        return early, late
+
+    early, late = asyncio.run(scenario())
+    assert early.status == late.status == "done"
+    assert sorted(run.calls, key=str) == [(PERIOD_END, None), (PERIOD_END, [5])]
+
+def test_only_recent_finished_jobs_are_kept():
+    queue = InvoiceJobQueue(run=FakeRun(), history_size=2)
+    finished = [queue.submit(PERIOD_END) for _ in range(3)]
+    waiting = queue.submit(PERIOD_END)
+    for job in finished:
+        asyncio.run(queue.process(job))
+    assert queue.get(finished[0].id) is None
+    assert [job.id for job in queue.jobs()] == [waiting.id, finished[2].id, finished[1].id]
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import pickle
+import re
+import pytest
+from datetime import datetime, timedelta
+from app.models import BillingMode, BillingPeriodicity, ChargingSession, Invoice, Renter
+from app.services import billing_service
+from app.services.billing_service import InvoiceDocument, _merge_qr_modules, qr_bill_svg
+from app.services.billing_settings_cache import BillingSettingsSnapshot
+from app.services.invoice_renderer import InvoiceRenderer
+
+START = datetime(2026, 1, 1, 8, 0)
+SETTINGS = BillingSettingsSnapshot(
+    version=1, company_name="Garage AG", iban="CH6209000000000000000", address="Parking Street 1, 1000 City",
+    periodicity=BillingPeriodicity.Monthly, price_per_kwh=0.5, billing_mode=BillingMode.Postpaid,
+)
+
+def _document() -> InvoiceDocument:
+    invoice = Invoice(id=7, period_start=START, period_end=START + timedelta(days=31), amount_due=7.5)
+    invoice.renter = Renter(name="Jane Doe")
+    invoice.sessions = [
+        ChargingSession(start_time=START, end_time=START + timedelta(hours=1), total_energy_kwh=10.0),
+        ChargingSession(start_time=START + timedelta(days=1), end_time=None, total_energy_kwh=None),
+    ]
+    return InvoiceDocument.from_invoice(invoice, SETTINGS)
+
+def test_document_is_plain_data():
+    document = _document()
+    assert document.sessions[1] == (START + timedelta(days=1), None, 0)
+    assert pickle.loads(pickle.dumps(document)) == document
+
+def test_renders_in_a_worker_process(tmp_path, monkeypatch):
+    # Spawned workers import billing_service afresh and read INVOICES_DIR from the environment
+    monkeypatch.setenv("INVOICES_DIR", str(tmp_path))
+    renderer = InvoiceRenderer(workers=1)
+    try:
+        path = asyncio.run(renderer.render(_document()))
+    finally:
+        renderer.shutdown()
+    assert path == str(tmp_path / "invoice_7_Jane_Doe_202601.pdf")
+    assert (tmp_path / "invoice_7_Jane_Doe_202601.pdf").read_bytes().startswith(b"%PDF")
+
+def _modules(path_data: str) -> set:
+    covered = set()
+    for x, y, right, bottom in re.findall(r"M(\d+),(\d+)H(\d+)V(\d+)H\d+z", path_data):
+        covered.update((col, row) for col in range(int(x), int(right)) for row in range(int(y), int(bottom)))
+    return covered
+
+def test_merged_qr_path_covers_the_same_modules():
+    # Rows 0 and 2 with runs and gaps, as qrcode draws them: one square per module
+    squares = [(0, 0), (1, 0), (2, 0), (4, 0), (1, 2), (2, 2), (5, 2)]
+    path_data = "".join(f"M{x},{y}H{x + 1}V{y + 1}H{x}z" for x, y in squares)
+    merged = _merge_qr_modules(path_data)
+    assert merged == "M0,0H3V1H0zM4,0H5V1H4zM1,2H3V3H1zM5,2H6V3H5z"
+    assert _modules(merged) == _modules(path_data) == set(squares)
+
+def test_qr_bill_is_rendered_without_temp_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(billing_service, "INVOICES_DIR", str(tmp_path))
+    svg = qr_bill_svg(_document())
+    path_data = re.search(r'<path d="(M\d+,\d+H[^"]*)"', svg).group(1)
+    assert len(_modules(path_data)) > len(re.findall("M", path_data)) # runs, not single modules
+
+    path = billing_service.render_invoice_pdf(_document())
+    assert os.listdir(tmp_path) == ["invoice_7_Jane_Doe_202601.pdf"]
+    assert open(path, "rb").read().startswith(b"%PDF")
+
+def test_failed_write_leaves_no_temp_file(tmp_path, monkeypatch):
+    def replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(billing_service.os, "replace", replace)
+    path = tmp_path / "invoice.pdf"
+    with pytest.raises(OSError):
+        billing_service._write_atomically(str(path), b"%PDF")
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,46 @@
+import asyncio
+from app.services.last_seen_tracker import LastSeenTracker
+
+def test_touches_are_coalesced_into_one_flush():
+    tracker = LastSeenTracker(flush_interval=60)
+    writes = []
+    tracker._write = lambda rows: writes.append(rows)
+
+    for _ in range(50):
+        tracker.touch("CP1")
+    tracker.touch("CP2", heartbeat=True)
+
+    asyncio.run(tracker.flush())
+
+    assert len(writes) == 1
+    rows = {row[0]: row for row in writes[0]}
+    assert set(rows) == {"CP1", "CP2"}
+    assert rows["CP1"][2] is None # No heartbeat seen for CP1
+    assert rows["CP2"][2] is not None
+
+    # Nothing dirty -> no write
+    asyncio.run(tracker.flush())
+    assert len(writes) == 1
+    assert tracker.get_last_seen("CP1") is not None
+
+def test_failed_flush_is_retried():
+    tracker = LastSeenTracker(flush_interval=60)
+
+    def failing_write(rows):
+        raise RuntimeError("db down")
+
+    tracker._write = failing_write
+    tracker.touch("CP1")
+    asyncio.run(tracker.flush())
+
+    writes = []
+    tracker._write = lambda rows: writes.append(rows)
+    asyncio.run(tracker.flush())
+    assert [row[0] for row in writes[0]] == ["CP1"]
+
+def test_forget_drops_pending_state():
+    tracker = LastSeenTracker(flush_interval=60)
+    tracker.touch("CP1", heartbeat=True)
+    tracker.forget("CP1")
+    assert tracker.get_last_seen("CP1") is None
+    assert tracker.get_last_heartbeat("CP1") is None
@@ -0,0 +1,15 @@
+from app.services.latency_histogram import LatencyHistogram
+
+def test_histogram_percentiles_use_bucket_bounds():
+    histogram = LatencyHistogram(bounds_ms=(1, 10, 100))
+    for _ in range(98):
+        histogram.record("Heartbeat", 0.0005)
+    histogram.record("Heartbeat", 0.050)
+    histogram.record("Heartbeat", 0.400)
+
+    stats = histogram.snapshot()["Heartbeat"]
+    assert stats["count"] == 100
+    assert stats["p50_ms"] == 1
+    assert stats["p99_ms"] == 100
+    assert stats["max_ms"] == 400.0
+    assert stats["buckets"] == {"le_1ms": 98, "le_10ms": 0, "le_100ms": 1, "overflow": 1}
@@ -0,0 +1,48 @@
+import asyncio
+from app.services.live_feed import LiveFeed, Subscriber
+
+def test_updates_for_the_same_key_coalesce():
+    async def scenario():
+        subscriber = Subscriber(max_pending=10)
+        subscriber.push(("CP1", "connector", 1), {"status": "Preparing"})
+        subscriber.push(("CP2", "connector", 1), {"status": "Available"})
+        subscriber.push(("CP1", "connector", 1), {"status": "Charging"})
+        return subscriber.drain(), subscriber.coalesced
+
+    deltas, coalesced = asyncio.run(scenario())
+    assert deltas == [{"status": "Available"}, {"status": "Charging"}]
+    assert coalesced == 1
+
+def test_slow_subscriber_is_switched_to_resync():
+    async def scenario():
+        subscriber = Subscriber(max_pending=2)
+        for i in range(3):
+            subscriber.push((f"CP{i}", "online"), {"is_online": True})
+        return subscriber
+
+    subscriber = asyncio.run(scenario())
+    assert subscriber.resync is True
+    assert subscriber.pending == {}
+
+def test_meter_values_become_energy_deltas():
+    async def scenario():
+        feed = LiveFeed(max_pending=100, min_interval=0, keepalive=1)
+        subscriber = Subscriber(max_pending=100)
+        feed._subscribers.add(subscriber)
+
+        feed._on_transaction_started("CP1", 1, 77, meter_start=1000)
+        feed._on_meter_values("CP1", 1, 77, [{
+            "timestamp": "2026-01-01T10:00:00Z",
+            "sampled_value": [
+                {"value": "230", "measurand": "Voltage", "phase": "L1-N"},
+                {"value": "1750", "measurand": "Energy.Active.Import.Register", "unit": "Wh"},
+            ],
+        }])
+        feed._on_transaction_stopped("CP1", 77)
+        return subscriber.drain()
+
+    deltas = asyncio.run(scenario())
+    assert {"type": "energy", "charger_id": "CP1", "transaction_id": 77, "energy_consumed": 750} in deltas
+    # The stop replaced the "session started" delta for the same charger
+    assert {"type": "session", "charger_id": "CP1", "active_session": None} in deltas
+    assert len(deltas) == 2
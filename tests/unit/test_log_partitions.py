@@ -0,0 +1,37 @@
+from datetime import date
+from unittest.mock import MagicMock
+from app.services.log_partitions import LogPartitionManager, partition_name, partition_day
+
+def test_partition_name_round_trips():
+    day = date(2026, 3, 9)
+    assert partition_name(day) == "ocpp_message_logs_p20260309"
+    assert partition_day(partition_name(day)) == day
+
+def test_partition_day_ignores_other_tables():
+    assert partition_day("ocpp_message_logs_default") is None
+    assert partition_day("ocpp_message_logs_p2026") is None
+    assert partition_day("meter_readings_p20260309") is None
+
+def test_maintain_is_a_no_op_off_postgres():
+    db = MagicMock()
+    db.bind.dialect.name = "sqlite"
+    assert LogPartitionManager().maintain(db, today=date(2026, 3, 9)) == {"created": [], "dropped": []}
+    db.execute.assert_not_called()
+
+def test_drop_expired_keeps_everything_without_retention():
+    db = MagicMock()
+    assert LogPartitionManager(retention_days=0).drop_expired(db, date(2026, 3, 9)) == []
+    db.execute.assert_not_called()
+
+def test_failed_straggler_delete_keeps_the_drops(monkeypatch):
+    old = date(2026, 1, 1)
+    monkeypatch.setattr(LogPartitionManager, "partitions", staticmethod(lambda db: {old: partition_name(old)}))
+    db = MagicMock()
+
+    def execute(statement, *args):
+        if str(statement).startswith("DELETE"):
+            raise RuntimeError("canceling statement due to lock timeout")
+
+    db.execute.side_effect = execute
+    assert LogPartitionManager(retention_days=30).drop_expired(db, date(2026, 3, 9)) == [partition_name(old)]
+    db.rollback.assert_called_once()
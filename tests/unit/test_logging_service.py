@@ -0,0 +1,76 @@
+import asyncio
+from app.services.logging_service import LoggingService
+
+def _make_service(policy, max_queue_size=3, batch_size=2, sample_rate=2):
+    service = LoggingService(
+        max_queue_size=max_queue_size,
+        batch_size=batch_size,
+        flush_interval=0.01,
+        overflow_policy=policy,
+        sample_rate=sample_rate,
+    )
+    written = []
+
+    def fake_write(rows):
+        written.append(list(rows))
+        return len(rows)
+
+    service._write_batch = fake_write
+    return service, written
+
+async def _log(service, n):
+    for i in range(n):
+        await service.log_message("CP1", "Incoming", "CALL", f"Action{i}", {"i": i})
+
+def test_drop_oldest_keeps_newest_rows():
+    service, written = _make_service("drop_oldest")
+
+    async def run():
+        await _log(service, 5)
+        assert service.get_stats()["queue_depth"] == 3
+        await service.flush()
+
+    asyncio.run(run())
+    actions = [row["action"] for batch in written for row in batch]
+    assert actions == ["Action2", "Action3", "Action4"]
+    stats = service.get_stats()
+    assert stats["dropped"] == 2
+    assert stats["flushed"] == 3
+    assert stats["flush_count"] == 2 # batch_size=2 -> 2 + 1
+
+def test_sample_keeps_one_in_n_on_overflow():
+    service, written = _make_service("sample", sample_rate=2)
+
+    async def run():
+        await _log(service, 7) # 3 fit, 4 overflow -> 2 sampled in, 2 dropped outright
+        await service.flush()
+
+    asyncio.run(run())
+    actions = [row["action"] for batch in written for row in batch]
+    assert len(actions) == 3
+    assert actions[-1] == "Action6"
+    assert service.get_stats()["dropped"] == 4
+
+def test_block_without_flusher_writes_through():
+    service, written = _make_service("block")
+
+    async def run():
+        await _log(service, 5)
+        await service.flush()
+
+    asyncio.run(run())
+    actions = [row["action"] for batch in written for row in batch]
+    assert actions == [f"Action{i}" for i in range(5)]
+    assert service.get_stats()["dropped"] == 0
+
+def test_background_flusher_drains_on_stop():
+    service, written = _make_service("block", max_queue_size=100, batch_size=50)
+
+    async def run():
+        service.start()
+        await _log(service, 10)
+        await service.stop()
+
+    asyncio.run(run())
+    assert sum(len(batch) for batch in written) == 10
+    assert service.get_stats()["queue_depth"] == 0
@@ -0,0 +1,54 @@
+from datetime import datetime, timezone
+from app.services.meter_ingest import parse_meter_values, MeterReadingWriter, _copy_escape
+
+PAYLOAD = [
+    {
+        "timestamp": "2026-01-01T10:00:00Z",
+        "sampled_value": [
+            {"value": "230.0", "measurand": "Voltage", "unit": "V", "phase": "L1-N"},
+            {"value": "1500", "unit": "Wh"}, # measurand defaults to the energy register
+            {"value": "1510", "unit": "Wh", "phase": "L1"},
+        ],
+    },
+    {
+        "timestamp": "2026-01-01T10:00:10Z",
+        "sampled_value": [{"value": "1600", "measurand": "Energy.Active.Import.Register", "unit": "Wh"}],
+    },
+]
+
+def test_parse_flattens_to_columns():
+    columns = parse_meter_values(42, PAYLOAD)
+
+    assert len(columns) == 4
+    assert columns.transaction_id == [42] * 4
+    assert columns.measurand[1] == "Energy.Active.Import.Register"
+    assert columns.phase == ["L1-N", None, "L1", None]
+    assert columns.timestamp[3] == datetime(2026, 1, 1, 10, 0, 10, tzinfo=timezone.utc)
+    assert columns.rows()[0]["value"] == 230.0
+    assert columns.series_keys()[0] == ("Voltage", "V", "L1-N", None)
+
+def test_parse_drops_values_that_are_not_numbers():
+    columns = parse_meter_values(42, [{
+        "timestamp": "2026-01-01T10:00:00Z",
+        "sampled_value": [{"value": "n/a"}, {"value": "NaN"}, {"value": " 12.5 "}],
+    }])
+    assert columns.value == [12.5]
+
+def test_latest_float_ignores_phase_values():
+    columns = parse_meter_values(42, PAYLOAD)
+    assert columns.latest_float() == 1600.0
+
+def test_copy_escaping():
+    assert _copy_escape(None) == "\\N"
+    assert _copy_escape("a\tb\\c\n") == "a\\tb\\\\c\\n"
+    assert _copy_escape(datetime(2026, 1, 1, 11, 0, tzinfo=timezone.utc)) == "2026-01-01 11:00:00"
+
+def test_coalesced_writer_flushes_at_batch_size():
+    writer = MeterReadingWriter(coalesce_interval=60, max_batch_rows=5)
+    batches = []
+    writer.write = lambda columns, db=None: batches.append(len(columns))
+
+    writer.submit(parse_meter_values(1, PAYLOAD)) # 4 rows, buffered
+    assert batches == []
+    writer.submit(parse_meter_values(2, PAYLOAD)) # 8 rows >= 5 -> written together
+    assert batches == [8]
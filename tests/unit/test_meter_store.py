@@ -0,0 +1,22 @@
+from array import array
+from datetime import datetime
+from app.services.meter_store import (
+    EPOCH, ReadingSeries, _to_micros, pack_timestamps, unpack_timestamps, pack_values, unpack_values,
+)
+
+def test_timestamps_round_trip_through_deltas():
+    micros = [_to_micros(datetime(2026, 1, 1, 10, 0, s)) for s in (0, 10, 20, 30)] + [_to_micros(datetime(2026, 1, 1, 10, 0, 40, 500))]
+    data = pack_timestamps(micros)
+    assert len(data) == 8 * len(micros)
+    assert list(unpack_timestamps(data)) == micros
+
+def test_values_round_trip_exactly():
+    values = [0.0, 230.1, -16.25, 1e9 + 0.5]
+    assert list(unpack_values(pack_values(values))) == values
+
+def test_reading_series_decodes_timestamps():
+    ts = datetime(2026, 3, 9, 12, 30, 15, 250)
+    series = ReadingSeries("Voltage", "V", "L1-N", None, array("q", [_to_micros(ts)]), array("d", [230.0]))
+    assert series.timestamps() == [ts]
+    assert len(series) == 1
+    assert _to_micros(EPOCH) == 0
@@ -0,0 +1,17 @@
+import pytest
+from datetime import datetime
+from app.services.ocpp_log_query import OcppLogFilter, encode_cursor, decode_cursor, InvalidCursor
+
+def test_cursor_round_trip():
+    timestamp = datetime(2026, 3, 1, 10, 0, 0, 123456)
+    assert decode_cursor(encode_cursor(timestamp, 42)) == (timestamp, 42)
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "MjAyNi0wMy0wMQ"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+def test_day_range():
+    assert OcppLogFilter.day_range("2026-03-01") == (datetime(2026, 3, 1), datetime(2026, 3, 2))
+    with pytest.raises(ValueError):
+        OcppLogFilter.day_range("yesterday")
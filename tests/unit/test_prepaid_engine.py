@@ -0,0 +1,51 @@
+from app.services.prepaid_engine import PrepaidEngine
+
+def test_stop_is_requested_once():
+    engine = PrepaidEngine()
+    engine.open(1, renter_id=7, meter_start_wh=1000, balance_kwh=2.0)
+
+    assert engine.evaluate(1, 2500) is False
+    assert engine.evaluate(1, 3000) is True
+    # Later frames while the charger is stopping don't send another RemoteStop
+    assert engine.evaluate(1, 3100) is False
+    assert engine.evaluate(1, 3200) is False
+
+def test_rearm_after_rejected_stop():
+    engine = PrepaidEngine()
+    engine.open(1, renter_id=7, meter_start_wh=0, balance_kwh=1.0)
+    assert engine.evaluate(1, 1000) is True
+    engine.rearm(1)
+    assert engine.evaluate(1, 1100) is True
+
+def test_sessions_share_renter_balance():
+    engine = PrepaidEngine()
+    engine.open(1, renter_id=7, meter_start_wh=0, balance_kwh=3.0)
+    engine.open(2, renter_id=7, meter_start_wh=5000, balance_kwh=3.0)
+
+    assert engine.evaluate(1, 2000) is False
+    assert engine.evaluate(2, 6000) is True # 2 + 1 kWh in flight
+
+def test_topup_rearms_and_raises_limit():
+    engine = PrepaidEngine()
+    engine.open(1, renter_id=7, meter_start_wh=0, balance_kwh=1.0)
+    assert engine.evaluate(1, 1000) is True
+
+    engine.set_balance(7, 5.0)
+    assert engine.evaluate(1, 4000) is False
+    assert engine.evaluate(1, 5000) is True
+
+def test_close_reconciles_balance_of_remaining_sessions():
+    engine = PrepaidEngine()
+    engine.open(1, renter_id=7, meter_start_wh=0, balance_kwh=3.0)
+    engine.open(2, renter_id=7, meter_start_wh=0, balance_kwh=3.0)
+    engine.evaluate(1, 2000)
+
+    # StopTransaction committed the 2 kWh deduction
+    engine.close(1, balance_kwh=1.0)
+    assert not engine.is_tracked(1)
+    assert engine.evaluate(2, 500) is False
+    assert engine.evaluate(2, 1000) is True
+
+def test_unknown_transaction_is_ignored():
+    engine = PrepaidEngine()
+    assert engine.evaluate(99, 1_000_000) is False
@@ -0,0 +1,35 @@
+from unittest.mock import MagicMock
+from app.models import ChargingStation
+from app.services.station_cache import StationCache, StationMeta
+
+def _db_returning(station):
+    db = MagicMock()
+    db.query.return_value.filter.return_value.first.return_value = station
+    return db
+
+def test_hit_needs_no_query():
+    cache = StationCache()
+    db = _db_returning(ChargingStation(id="CP1", kiosk_mode=True, vendor="V", model="M"))
+
+    first = cache.get("CP1", db)
+    second = cache.get("CP1", db)
+
+    assert first == second == StationMeta(id="CP1", kiosk_mode=True, vendor="V", model="M")
+    assert db.query.call_count == 1
+
+def test_missing_station_is_negatively_cached():
+    cache = StationCache()
+    db = _db_returning(None)
+
+    assert cache.get("NOPE", db) is None
+    assert not cache.exists("NOPE", db)
+    assert db.query.call_count == 1
+
+def test_invalidate_forces_reload():
+    cache = StationCache()
+    cache.put(StationMeta(id="CP1", kiosk_mode=False))
+    cache.invalidate("CP1")
+
+    db = _db_returning(ChargingStation(id="CP1", kiosk_mode=True))
+    assert cache.get("CP1", db).kiosk_mode is True
+    assert db.query.call_count == 1
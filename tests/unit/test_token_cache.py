@@ -0,0 +1,40 @@
+import asyncio
+from app.models import AuthorizationStatus
+from app.services.token_cache import TokenCache, TokenInfo
+
+def test_positive_and_negative_entries():
+    cache = TokenCache(ttl=60, negative_ttl=60, flush_interval=60)
+    info = TokenInfo(token="TAG1", status=AuthorizationStatus.Accepted)
+
+    assert cache.lookup("TAG1") == (False, None)
+    cache.store("TAG1", info)
+    cache.store("NOPE", None)
+
+    assert cache.lookup("TAG1") == (True, info)
+    assert cache.lookup("NOPE") == (True, None)
+
+def test_entries_expire():
+    cache = TokenCache(ttl=-1, negative_ttl=-1, flush_interval=60)
+    cache.store("TAG1", TokenInfo(token="TAG1", status=AuthorizationStatus.Accepted))
+    assert cache.lookup("TAG1") == (False, None)
+
+def test_invalidate_discards_racing_store():
+    cache = TokenCache(ttl=60, negative_ttl=60, flush_interval=60)
+    generation = cache.generation
+    # Admin blocks the tag while an Authorize is still reading the old row
+    cache.invalidate("TAG1")
+    cache.store("TAG1", TokenInfo(token="TAG1", status=AuthorizationStatus.Accepted), generation)
+    assert cache.lookup("TAG1") == (False, None)
+
+def test_unknown_tags_are_deduplicated_and_batched():
+    cache = TokenCache(ttl=60, negative_ttl=60, flush_interval=60)
+    writes = []
+    cache._write_unknown = lambda tags: writes.append(tags)
+
+    assert cache.record_unknown("BAD1") is True
+    assert cache.record_unknown("BAD1") is False
+    cache.record_unknown("BAD2")
+    asyncio.run(cache.flush())
+    asyncio.run(cache.flush())
+
+    assert writes == [["BAD1", "BAD2"]]
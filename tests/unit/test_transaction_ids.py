@@ -0,0 +1,53 @@
+import threading
+from app.services.transaction_ids import TransactionIdAllocator
+
+class FakeSequenceSession:
+    """Stands in for a Session whose only query is nextval() on a sequence incrementing by block_size."""
+
+    def __init__(self, block_size, start=1):
+        self.value = start - block_size
+        self.block_size = block_size
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def execute(self, stmt):
+        with self._lock:
+            self.calls += 1
+            self.value += self.block_size
+            value = self.value
+        return type("Result", (), {"scalar_one": lambda _self: value})()
+
+def test_one_round_trip_per_block():
+    db = FakeSequenceSession(block_size=10, start=500)
+    allocator = TransactionIdAllocator(block_size=10)
+
+    ids = [allocator.allocate(db) for _ in range(25)]
+
+    assert ids == list(range(500, 525))
+    assert db.calls == 3
+
+def test_processes_never_share_ids():
+    db = FakeSequenceSession(block_size=10)
+    first, second = TransactionIdAllocator(block_size=10), TransactionIdAllocator(block_size=10)
+
+    ids = [allocator.allocate(db) for _ in range(15) for allocator in (first, second)]
+
+    assert len(set(ids)) == len(ids)
+
+def test_concurrent_allocation_is_collision_free():
+    db = FakeSequenceSession(block_size=100)
+    allocator = TransactionIdAllocator(block_size=100)
+    results = []
+
+    def worker():
+        ids = [allocator.allocate(db) for _ in range(500)]
+        results.extend(ids)
+
+    threads = [threading.Thread(target=worker) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(results) == 10000
+    assert len(set(results)) == 10000